@@ -10,8 +10,20 @@ import sys
 
 from aiogram import Bot, Dispatcher
 
-from akinator.bot.handlers import router, set_game_data, set_repository
+from akinator.bot.executor import LoopLagMonitor
+from akinator.bot.handlers import (
+    get_engine_executor, get_session_store, router, set_feedback_sink, set_game_data,
+    set_repository, set_session_store,
+)
+from akinator.config import (
+    LOOP_LAG_INTERVAL, SESSION_FLUSH_INTERVAL, SESSION_MEMORY_TTL, SESSION_STORE, SESSION_TTL,
+)
+from akinator.db.feedback_sink import FeedbackSink
 from akinator.db.repository import Repository
+from akinator.db.snapshot import CatalogueSnapshot, default_snapshot_path, load_catalogue
+from akinator.db.session_store import (
+    PersistentSessionStore, RedisSessionBackend, SessionStore, SQLiteSessionBackend,
+)
 
 logging.basicConfig(
     level=logging.INFO,
@@ -22,21 +34,26 @@ logger = logging.getLogger("akinator")
 DB_PATH = os.environ.get("AKINATOR_DB_PATH", "data/akinator.db")
 # Pre-built database shipped with the repo (backup)
 BUNDLED_DB = os.path.join(os.path.dirname(__file__), "data", "akinator.db")
-
-
-async def load_game_data(repo: Repository) -> None:
-    """Load entities with attributes into memory for the game engine."""
-    entities = await repo.get_all_entities()
-    attributes = await repo.get_all_attributes()
-
-    # Batch-load all entity attributes in one query
-    all_attrs = await repo.get_all_entity_attributes()
-    for entity in entities:
-        if entity.id in all_attrs:
-            entity.attributes = all_attrs[entity.id]
-
-    await set_game_data(entities, attributes, repo)
-    logger.info("Loaded %d entities, %d attributes", len(entities), len(attributes))
+SESSION_STORE_KIND = os.environ.get("AKINATOR_SESSION_STORE", SESSION_STORE)
+SESSION_DB_PATH = os.environ.get("AKINATOR_SESSION_DB", "data/sessions.db")
+# Binary catalogue snapshot, mapped at startup while it matches the database
+SNAPSHOT_PATH = os.environ.get("AKINATOR_SNAPSHOT_PATH", default_snapshot_path(DB_PATH))
+
+
+async def load_game_data(repo: Repository, snapshot_path: str | None = None) -> CatalogueSnapshot:
+    """Load the catalogue for the game engine.
+
+    From the snapshot file at `snapshot_path` if it is current, else from
+    SQLite in one read transaction (rewriting the snapshot file).
+    """
+    snapshot = await load_catalogue(repo, snapshot_path)
+    if snapshot.entities:
+        await set_game_data(
+            snapshot.entities, snapshot.attributes, repo,
+            knowledge_base=snapshot.knowledge_base, aliases=snapshot.aliases,
+        )
+    logger.info("Loaded %s", snapshot.report())
+    return snapshot
 
 
 def _ensure_database() -> None:
@@ -54,12 +71,39 @@ def _ensure_database() -> None:
             entity_count = conn.execute("SELECT COUNT(*) FROM entities").fetchone()[0]
         logger.info("Bundled DB: %d entities, %d attributes", entity_count, attr_count)
 
+        # A WAL left by an unclean shutdown belongs to the old file; never replay it onto the copy
+        for suffix in ("-wal", "-shm"):
+            if os.path.exists(DB_PATH + suffix):
+                os.remove(DB_PATH + suffix)
         shutil.copy2(BUNDLED_DB, DB_PATH)
         logger.info("Copied bundled database to %s", DB_PATH)
     else:
         logger.error("BUNDLED_DB not found at %s!", BUNDLED_DB)
 
 
+def _create_session_store() -> SessionStore:
+    """Session store selected by AKINATOR_SESSION_STORE (memory / sqlite / redis).
+
+    "memory" keeps the handlers' default in-memory store.
+    """
+    if SESSION_STORE_KIND == "sqlite":
+        os.makedirs(os.path.dirname(SESSION_DB_PATH) or ".", exist_ok=True)
+        backend = SQLiteSessionBackend(SESSION_DB_PATH)
+    elif SESSION_STORE_KIND == "redis":
+        try:
+            import redis
+        except ImportError:
+            logger.warning("redis package not installed; keeping sessions in memory")
+            return get_session_store()
+        backend = RedisSessionBackend(redis.Redis.from_url(os.environ.get("REDIS_URL", "redis://localhost:6379/0")))
+    else:
+        return get_session_store()
+    logger.info("Session store: %s", SESSION_STORE_KIND)
+    return PersistentSessionStore(
+        backend, ttl=SESSION_TTL, flush_interval=SESSION_FLUSH_INTERVAL, memory_ttl=SESSION_MEMORY_TTL,
+    )
+
+
 async def main() -> None:
     token = os.environ.get("BOT_TOKEN") or os.environ.get("TELEGRAM_BOT_TOKEN")
     if not token:
@@ -72,24 +116,45 @@ async def main() -> None:
     repo = Repository(DB_PATH)
     await repo.init_db()
 
-    entity_count = len(await repo.get_all_entities())
-    if entity_count == 0:
+    snapshot = await load_game_data(repo, SNAPSHOT_PATH)
+    if not snapshot.entities:
         logger.warning(
             "Database is empty! Run: python -m akinator.generate_db to populate."
         )
-    else:
-        await load_game_data(repo)
 
     # Keep repo open for runtime learning
     set_repository(repo)
+    feedback_sink = FeedbackSink(repo)
+    set_feedback_sink(feedback_sink)
+    feedback_sink.start()
 
     # Start bot
     bot = Bot(token=token)
     dp = Dispatcher()
     dp.include_router(router)
 
+    session_store = _create_session_store()
+    set_session_store(session_store)
+    session_store.start()
+
+    lag_monitor = LoopLagMonitor(interval=LOOP_LAG_INTERVAL)
+    lag_monitor.start()
+
     logger.info("Starting Akinator 2.0 bot...")
-    await dp.start_polling(bot)
+    try:
+        # Stops polling on SIGINT / SIGTERM, so the cleanup below runs on shutdown
+        await dp.start_polling(bot, handle_signals=True)
+    finally:
+        await lag_monitor.stop()
+        await session_store.close()
+        # Queued feedback is written before the database closes
+        await feedback_sink.close()
+        logger.info(
+            "Feedback: %d records written in %d batches, %d dropped",
+            feedback_sink.written, feedback_sink.batches, feedback_sink.dropped,
+        )
+        await repo.close()
+        get_engine_executor().shutdown()
 
 
 if __name__ == "__main__":
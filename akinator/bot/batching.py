@@ -0,0 +1,93 @@
+"""Micro-batching — group requests that arrive close together into one call."""
+
+from __future__ import annotations
+
+import asyncio
+import inspect
+from typing import Awaitable, Callable, Generic, TypeVar, Union
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+
+class MicroBatcher(Generic[T, R]):
+    """Collects submit() calls for up to `window` seconds, then runs them as one batch.
+
+    `process` maps a list of items to a list of results in the same order;
+    it may be a coroutine function (e.g. one handing the batch to an
+    EngineExecutor), in which case the batch resolves when it completes. A batch is flushed when the window closes or `max_size` items are
+    waiting, whichever comes first. An exception from `process` is raised
+    in every caller of that batch.
+    """
+
+    def __init__(
+        self,
+        process: Callable[[list[T]], Union[list[R], Awaitable[list[R]]]],
+        window: float,
+        max_size: int,
+    ) -> None:
+        self.process = process
+        self.window = window
+        self.max_size = max_size
+        self.batches = 0
+        self.items = 0
+        self._pending: list[tuple[T, asyncio.Future[R]]] = []
+        self._timer: asyncio.TimerHandle | None = None
+        self._tasks: set[asyncio.Task] = set()
+
+    async def submit(self, item: T) -> R:
+        loop = asyncio.get_running_loop()
+        future: asyncio.Future[R] = loop.create_future()
+        self._pending.append((item, future))
+        if len(self._pending) >= self.max_size:
+            self.flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.window, self.flush)
+        return await future
+
+    def flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, []
+        if not batch:
+            return
+
+        self.batches += 1
+        self.items += len(batch)
+        try:
+            results = self.process([item for item, _ in batch])
+        except Exception as e:
+            self._resolve(batch, error=e)
+            return
+        if inspect.isawaitable(results):
+            task = asyncio.ensure_future(self._await(batch, results))
+            # Keep a reference until done so the task isn't garbage-collected
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+        else:
+            self._resolve(batch, results=results)
+
+    async def _await(self, batch: list[tuple[T, asyncio.Future[R]]], results: Awaitable[list[R]]) -> None:
+        try:
+            self._resolve(batch, results=await results)
+        except Exception as e:
+            self._resolve(batch, error=e)
+
+    @staticmethod
+    def _resolve(
+        batch: list[tuple[T, asyncio.Future[R]]],
+        results: list[R] | None = None,
+        error: Exception | None = None,
+    ) -> None:
+        for i, (_, future) in enumerate(batch):
+            if future.done():
+                continue
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(results[i])
+
+    @property
+    def mean_batch_size(self) -> float:
+        return self.items / self.batches if self.batches else 0.0
@@ -0,0 +1,154 @@
+"""Engine Executor — run scoring / selection jobs off the event loop."""
+
+from __future__ import annotations
+
+import asyncio
+import concurrent.futures
+import functools
+import logging
+from typing import Any, Callable, TypeVar
+
+logger = logging.getLogger(__name__)
+
+R = TypeVar("R")
+
+
+class EngineExecutor:
+    """Thread or process pool that async handlers submit engine jobs to.
+
+    NumPy releases the GIL inside its kernels, so a thread pool already keeps
+    the polling loop responsive; a process pool also isolates pure-Python
+    work but pickles every job's arguments and result, so jobs must return
+    what they change instead of mutating their arguments. Large shared state
+    (the knowledge base) goes to each worker process once, through
+    set_initializer(), rather than with every job.
+
+    At most `max_pending` jobs are queued or running; further callers wait
+    for a slot (back-pressure). `timeout` bounds the whole wait, slot
+    included, and raises asyncio.TimeoutError. A timed-out job still
+    finishes in its worker and only then gives its slot back.
+    """
+
+    def __init__(
+        self,
+        kind: str = "thread",
+        max_workers: int = 4,
+        max_pending: int = 32,
+        timeout: float | None = 10.0,
+    ) -> None:
+        if kind not in ("thread", "process"):
+            raise ValueError(f"Unknown executor kind: {kind!r}")
+        self.kind = kind
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self.timeout = timeout
+        self.waiting = 0  # callers blocked on a free slot
+        self.in_flight = 0  # jobs queued in or running on the pool
+        self.completed = 0
+        self.timeouts = 0
+        self._pool: concurrent.futures.Executor | None = None
+        self._initializer: tuple[Callable[..., None], tuple] | None = None
+        # asyncio primitives belong to one loop; recreated if the loop changes
+        self._slots: tuple[asyncio.AbstractEventLoop, asyncio.Semaphore] | None = None
+
+    def _get_pool(self) -> concurrent.futures.Executor:
+        if self._pool is None:
+            if self.kind == "process":
+                initializer, initargs = self._initializer or (None, ())
+                self._pool = concurrent.futures.ProcessPoolExecutor(
+                    self.max_workers, initializer=initializer, initargs=initargs,
+                )
+            else:
+                self._pool = concurrent.futures.ThreadPoolExecutor(
+                    self.max_workers, thread_name_prefix="engine",
+                )
+        return self._pool
+
+    def set_initializer(self, initializer: Callable[..., None], *initargs: Any) -> None:
+        """Run `initializer(*initargs)` in every worker process before its first job.
+
+        A running process pool is retired (its jobs still finish), so the
+        next job starts workers with the new state. Threads share this
+        process's memory, so thread pools ignore it.
+        """
+        self._initializer = (initializer, initargs)
+        if self.kind == "process" and self._pool is not None:
+            self._pool.shutdown(wait=False)
+            self._pool = None
+
+    def _get_slots(self, loop: asyncio.AbstractEventLoop) -> asyncio.Semaphore:
+        if self._slots is None or self._slots[0] is not loop:
+            self._slots = (loop, asyncio.Semaphore(self.max_pending))
+        return self._slots[1]
+
+    async def run(self, fn: Callable[..., R], *args: Any) -> R:
+        loop = asyncio.get_running_loop()
+        try:
+            return await asyncio.wait_for(self._run(loop, fn, args), self.timeout)
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            raise
+
+    async def _run(self, loop: asyncio.AbstractEventLoop, fn: Callable[..., R], args: tuple) -> R:
+        slots = self._get_slots(loop)
+        self.waiting += 1
+        try:
+            await slots.acquire()
+        finally:
+            self.waiting -= 1
+        self.in_flight += 1
+        future = loop.run_in_executor(self._get_pool(), functools.partial(fn, *args))
+        future.add_done_callback(functools.partial(self._job_done, slots))
+        # Shielded so a timeout leaves the job (and its slot) running to completion
+        return await asyncio.shield(future)
+
+    def _job_done(self, slots: asyncio.Semaphore, future: asyncio.Future) -> None:
+        self.in_flight -= 1
+        self.completed += 1
+        slots.release()
+        if not future.cancelled() and future.exception() is not None:
+            # Retrieved here so abandoned (timed-out) jobs don't log "never retrieved"
+            logger.debug("Engine job failed: %r", future.exception())
+
+    def shutdown(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+
+class LoopLagMonitor:
+    """Measures how late the event loop wakes a sleeping task.
+
+    Lag is the delay beyond `interval`; a loop blocked by synchronous work
+    shows up here long before users notice stalled callbacks.
+    """
+
+    def __init__(self, interval: float = 0.5, warn_after: float = 0.1) -> None:
+        self.interval = interval
+        self.warn_after = warn_after
+        self.last_lag = 0.0
+        self.max_lag = 0.0
+        self._task: asyncio.Task | None = None
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            start = loop.time()
+            await asyncio.sleep(self.interval)
+            self.last_lag = max(loop.time() - start - self.interval, 0.0)
+            self.max_lag = max(self.max_lag, self.last_lag)
+            if self.last_lag > self.warn_after:
+                logger.warning("Event loop lag %.0f ms", self.last_lag * 1000)
@@ -2,42 +2,94 @@
 
 from __future__ import annotations
 
+import asyncio
+import copy
 import logging
+import weakref
+from collections.abc import Mapping
 
 from aiogram import F, Router
 from aiogram.filters import Command
 from aiogram.types import CallbackQuery, Message
 
+from akinator.bot.batching import MicroBatcher
+from akinator.bot.executor import EngineExecutor
 from akinator.bot.keyboards import answer_keyboard, guess_keyboard, hint_keyboard, new_game_keyboard
-from akinator.config import GUESS_THRESHOLD, TOP_K_DISPLAY
+from akinator.config import (
+    ENGINE_EXECUTOR,
+    ENGINE_JOB_TIMEOUT,
+    ENGINE_MAX_PENDING,
+    ENGINE_WORKERS,
+    GUESS_THRESHOLD,
+    OPENING_BOOK_DEPTH,
+    PATH_CACHE_ENTRIES,
+    PATH_CACHE_MAX_BYTES,
+    SELECT_BATCH_MAX,
+    SELECT_BATCH_WINDOW_MS,
+    SESSION_MAX_LIVE,
+    SESSION_SWEEP_INTERVAL,
+    SESSION_TTL,
+    TOP_K_DISPLAY,
+)
 from akinator.db.models import Answer, Attribute, Entity, GameMode, GameSession
+from akinator.engine.knowledge_base import KnowledgeBase
+from akinator.engine.opening_book import OpeningBook
+from akinator.engine.path_cache import PathCache
 from akinator.engine.scoring import ScoringEngine
-from akinator.engine.session import GameSessionManager
+from akinator.engine.session import GameSessionManager, uniform_prior
 from akinator.engine.question_policy import QuestionPolicy
 
+from akinator.db.feedback_sink import FeedbackRecord, FeedbackSink
 from akinator.db.repository import Repository
+from akinator.db.session_store import MemorySessionStore, SessionStore
 
 logger = logging.getLogger(__name__)
 
 router = Router()
 
 # --- Global state (in-memory for MVP single instance) ---
-_session_store: dict[int, GameSession] = {}
+_session_store: SessionStore = MemorySessionStore(
+    ttl=SESSION_TTL, max_sessions=SESSION_MAX_LIVE, sweep_interval=SESSION_SWEEP_INTERVAL,
+)
 _entities: list[Entity] = []
 _attributes: list[Attribute] = []
+_knowledge_base = KnowledgeBase.build([], [], {})
 _entity_names: dict[int, str] = {}  # Default names (fallback)
 _entity_names_ru: dict[int, str] = {}  # Russian localized names
 _entity_names_en: dict[int, str] = {}  # English localized names
-_scoring_engine = ScoringEngine()
-_question_policy = QuestionPolicy()
+# Catalogue index for O(1) lookups in callbacks; entity rows are _knowledge_base.row_of.
+# Updated together with _entities / _knowledge_base, with no await in between.
+_entity_by_id: dict[int, Entity] = {}
+_attribute_by_id: dict[int, Attribute] = {}
+_attribute_by_key: dict[str, Attribute] = {}
+_scoring_engine = ScoringEngine(log_space=True)
+_question_policy = QuestionPolicy(path_cache=PathCache(PATH_CACHE_ENTRIES, PATH_CACHE_MAX_BYTES))
 _session_manager = GameSessionManager(_scoring_engine, _question_policy)
+_engine_executor = EngineExecutor(
+    kind=ENGINE_EXECUTOR,
+    max_workers=ENGINE_WORKERS,
+    max_pending=ENGINE_MAX_PENDING,
+    timeout=ENGINE_JOB_TIMEOUT,
+)
 _repo: Repository | None = None
+# Write-behind queue for feedback of finished games (set at startup)
+_feedback_sink: FeedbackSink | None = None
+# First questions for uniform-prior games; rebuilt whenever the knowledge base changes
+_opening_book: OpeningBook | None = None
+# Background rebuild after learning; requests made while it runs coalesce into one more pass
+_opening_book_task: asyncio.Task | None = None
+_opening_book_stale = False
 
 
-def get_session_store() -> dict[int, GameSession]:
+def get_session_store() -> SessionStore:
     return _session_store
 
 
+def set_session_store(store: SessionStore) -> None:
+    global _session_store
+    _session_store = store
+
+
 def get_entities() -> list[Entity]:
     return _entities
 
@@ -46,6 +98,83 @@ def get_attributes() -> list[Attribute]:
     return _attributes
 
 
+def get_knowledge_base() -> KnowledgeBase:
+    return _knowledge_base
+
+
+def get_entity(entity_id: int) -> Entity | None:
+    return _entity_by_id.get(entity_id)
+
+
+def get_attribute(attribute_id: int) -> Attribute | None:
+    return _attribute_by_id.get(attribute_id)
+
+
+def get_engine_executor() -> EngineExecutor:
+    return _engine_executor
+
+
+# --- Engine jobs (module-level so a process pool can pickle them) ---
+# Jobs read the game data from this module's globals; worker processes get
+# them once per knowledge base through _install_game_data.
+
+def _install_game_data(knowledge_base: KnowledgeBase, attributes: list[Attribute]) -> None:
+    """Pool initializer: the game data engine jobs read in a worker process."""
+    global _knowledge_base
+    _knowledge_base = knowledge_base
+    _attributes[:] = attributes
+
+
+def _detached(session: GameSession) -> GameSession:
+    """Copy of the session the engine can update without touching the original.
+
+    Lists are copied and the weight arrays shared read-only, so the scoring
+    engine copies them before changing them (as it does for shared priors).
+    A job that fails or times out, and may still be running in its thread,
+    then only ever changes a copy nobody keeps.
+    """
+    detached = copy.copy(session)
+    detached.asked_attributes = list(session.asked_attributes)
+    detached.history = list(session.history)
+    for name in ("_weight_array", "_log_weights"):
+        array = getattr(session, name)
+        if array is not None and array.flags.writeable:
+            view = array.view()
+            view.flags.writeable = False
+            setattr(detached, name, view)
+    if session.blocked_columns is not None:
+        detached.blocked_columns = session.blocked_columns.copy()
+    return detached
+
+
+def _answer_job(session: GameSession, attr: Attribute, answer: Answer) -> GameSession:
+    """Answer the session's pending question; returns an updated copy of the session."""
+    session = _detached(session)
+    # Remove from asked (process_answer will re-add)
+    session.asked_attributes.pop()
+    _session_manager.process_answer(session, _knowledge_base, attr, answer)
+    return session
+
+
+def _select_job(sessions: list[GameSession]) -> list[str | None]:
+    return _question_policy.select_batch(sessions, _knowledge_base, _attributes)
+
+
+def _opening_book_job() -> OpeningBook:
+    return OpeningBook.build(
+        _knowledge_base, list(_attributes), _session_manager,
+        _knowledge_base.entity_ids, OPENING_BOOK_DEPTH,
+    )
+
+
+# Sessions waiting for their next question at the same moment are scored together
+_question_batcher: MicroBatcher[GameSession, str | None] = MicroBatcher(
+    lambda sessions: _engine_executor.run(_select_job, sessions),
+    window=SELECT_BATCH_WINDOW_MS / 1000,
+    max_size=SELECT_BATCH_MAX,
+)
+
+
 def get_entity_names(ids: list[int] | None = None) -> dict[int, str]:
     if ids is None:
         return _entity_names
@@ -62,18 +191,83 @@ def get_localized_entity_name(entity_id: int, lang: str = "en") -> str:
     return _entity_names.get(entity_id, f"#{entity_id}")
 
 
+def _publish_game_data() -> None:
+    """Hand the current knowledge base to the engine's worker processes, if any."""
+    _engine_executor.set_initializer(_install_game_data, _knowledge_base, list(_attributes))
+
+
+async def _rebuild_opening_book() -> None:
+    """Recompute the opening book for the current knowledge base, off the event loop."""
+    global _opening_book
+    try:
+        book = await _engine_executor.run(_opening_book_job)
+        # A slower build for an older knowledge base must not replace a newer book
+        if book.version == _knowledge_base.version:
+            _opening_book = book
+    except Exception:
+        # Games still work without it, just with a full selection for every question
+        logger.exception("Failed to build the opening book")
+
+
 def set_repository(repo: Repository) -> None:
     """Called at startup to set the database repository for runtime learning."""
     global _repo
     _repo = repo
 
 
-async def set_game_data(entities: list[Entity], attributes: list[Attribute], repo: Repository | None = None) -> None:
-    """Called at startup to load game data into memory."""
+def get_feedback_sink() -> FeedbackSink | None:
+    return _feedback_sink
+
+
+def set_feedback_sink(sink: FeedbackSink | None) -> None:
+    global _feedback_sink
+    _feedback_sink = sink
+
+
+def _schedule_opening_book_rebuild() -> None:
+    """Rebuild the opening book in the background, without delaying the caller.
+
+    Until it finishes, the old book misses on the version check and games
+    fall back to full selection.
+    """
+    global _opening_book_task, _opening_book_stale
+    _opening_book_stale = True
+    if _opening_book_task is None or _opening_book_task.done():
+        _opening_book_task = asyncio.create_task(_rebuild_stale_opening_book())
+
+
+async def _rebuild_stale_opening_book() -> None:
+    global _opening_book_stale
+    while _opening_book_stale:
+        _opening_book_stale = False
+        await _rebuild_opening_book()
+
+
+async def set_game_data(
+    entities: list[Entity],
+    attributes: list[Attribute],
+    repo: Repository | None = None,
+    knowledge_base: KnowledgeBase | None = None,
+    aliases: Mapping[int, list[tuple[str, str]]] | None = None,
+) -> None:
+    """Called at startup to load game data into memory.
+
+    Without a prebuilt knowledge base, one is built from the entities' attribute dicts.
+    Localized names come from `aliases` ({entity_id: [(alias, language)]}),
+    or are bulk-loaded from `repo` when it is not given.
+    """
+    global _knowledge_base
+    _knowledge_base = knowledge_base or KnowledgeBase.from_entities(entities, attributes)
     _entities.clear()
     _entities.extend(entities)
     _attributes.clear()
     _attributes.extend(attributes)
+    _entity_by_id.clear()
+    _entity_by_id.update((e.id, e) for e in entities)
+    _attribute_by_id.clear()
+    _attribute_by_id.update((a.id, a) for a in attributes)
+    _attribute_by_key.clear()
+    _attribute_by_key.update((a.key, a) for a in attributes)
     _entity_names.clear()
     _entity_names_ru.clear()
     _entity_names_en.clear()
@@ -84,16 +278,27 @@ async def set_game_data(entities: list[Entity], attributes: list[Attribute], rep
         _entity_names_en[e.id] = e.name
         _entity_names_ru[e.id] = e.name
 
-    # Load localized names from aliases if repository is available
-    if repo:
+    # Load localized names from aliases (one bulk query) if repository is available
+    if aliases is None and repo:
+        aliases = await repo.get_all_aliases()
+    if aliases:
         for e in entities:
-            aliases = await repo.get_aliases(e.id)
-            for alias, lang in aliases:
+            for alias, lang in aliases.get(e.id, ()):
                 if lang == "ru":
                     _entity_names_ru[e.id] = alias
                 elif lang == "en":
                     _entity_names_en[e.id] = alias
 
+    _publish_game_data()
+    await _rebuild_opening_book()
+
+
+async def _load_session(store: Mapping[int, GameSession], user_id: int) -> GameSession | None:
+    """The user's session; a SessionStore loads one missing from memory off the event loop."""
+    if isinstance(store, SessionStore):
+        return await store.aget(user_id)
+    return store.get(user_id)
+
 
 def _get_lang(session: GameSession | None, message_or_callback=None) -> str:
     if session:
@@ -106,10 +311,29 @@ def _attr_question(attr: Attribute, lang: str) -> str:
 
 
 def _find_attr_by_key(key: str) -> Attribute | None:
-    for a in _attributes:
-        if a.key == key:
-            return a
-    return None
+    return _attribute_by_key.get(key)
+
+
+# One engine update at a time per user; a lock lives while a handler holds it
+_user_locks: weakref.WeakValueDictionary[int, asyncio.Lock] = weakref.WeakValueDictionary()
+
+
+def _user_lock(user_id: int) -> asyncio.Lock:
+    lock = _user_locks.get(user_id)
+    if lock is None:
+        lock = _user_locks[user_id] = asyncio.Lock()
+    return lock
+
+
+def _busy_text(lang: str) -> str:
+    if lang == "ru":
+        return "Я сейчас перегружен, попробуйте ещё раз."
+    return "I'm busy right now, please try again."
+
+
+def _log_engine_failure(user_id: int) -> None:
+    """Log why an engine job for this user failed (called from an except block)."""
+    logger.exception("Engine job failed for user %d", user_id)
 
 
 async def _handle_stale_session(callback: CallbackQuery) -> bool:
@@ -119,7 +343,7 @@ async def _handle_stale_session(callback: CallbackQuery) -> bool:
     """
     store = get_session_store()
     user_id = callback.from_user.id
-    session = store.get(user_id)
+    session = await _load_session(store, user_id)
     if session is not None:
         return False
 
@@ -165,7 +389,8 @@ async def handle_start(message: Message) -> None:
 async def handle_new(message: Message) -> None:
     store = get_session_store()
     user_id = message.from_user.id
-    lang = store[user_id].language if user_id in store else "ru"
+    previous = await _load_session(store, user_id)
+    lang = previous.language if previous else "ru"
     session = _session_manager.create_session(user_id=user_id, language=lang)
     store[user_id] = session
 
@@ -186,7 +411,7 @@ async def handle_new(message: Message) -> None:
 async def handle_top(message: Message) -> None:
     store = get_session_store()
     user_id = message.from_user.id
-    session = store.get(user_id)
+    session = await _load_session(store, user_id)
     if session is None:
         await message.answer("No game in progress. Use /new to start!")
         return
@@ -207,7 +432,7 @@ async def handle_top(message: Message) -> None:
 async def handle_why(message: Message) -> None:
     store = get_session_store()
     user_id = message.from_user.id
-    session = store.get(user_id)
+    session = await _load_session(store, user_id)
     if session is None:
         await message.answer("No game in progress. Use /new to start!")
         return
@@ -238,11 +463,12 @@ async def handle_why(message: Message) -> None:
 async def handle_giveup(message: Message) -> None:
     store = get_session_store()
     user_id = message.from_user.id
-    session = store.get(user_id)
+    session = await _load_session(store, user_id)
     if session is None:
         await message.answer("No game in progress. Use /new to start!")
         return
     session.mode = GameMode.LEARNING
+    store[user_id] = session
     lang = _get_lang(session)
     if lang == "ru":
         await message.answer("Сдаюсь! Кого вы загадали?")
@@ -254,7 +480,7 @@ async def handle_giveup(message: Message) -> None:
 async def handle_lang(message: Message) -> None:
     store = get_session_store()
     user_id = message.from_user.id
-    session = store.get(user_id)
+    session = await _load_session(store, user_id)
 
     parts = message.text.split()
     lang = parts[1] if len(parts) > 1 else "ru"
@@ -263,6 +489,7 @@ async def handle_lang(message: Message) -> None:
 
     if session is not None:
         session.language = lang
+        store[user_id] = session
 
     await message.answer(f"Language set to: {lang}")
 
@@ -285,24 +512,41 @@ async def handle_help(message: Message) -> None:
 
 @router.callback_query(F.data.startswith("hint:"))
 async def handle_hint_callback(callback: CallbackQuery) -> None:
+    async with _user_lock(callback.from_user.id):
+        await _hint_callback(callback)
+
+
+async def _hint_callback(callback: CallbackQuery) -> None:
     if await _handle_stale_session(callback):
         return
     store = get_session_store()
     user_id = callback.from_user.id
-    session = store.get(user_id)
+    session = await _load_session(store, user_id)
 
     action = callback.data.split(":")[1]
     lang = _get_lang(session)
 
     if action == "skip":
-        # Init all candidates with uniform weights
-        all_ids = [e.id for e in _entities]
-        _session_manager.init_candidates(session, all_ids)
+        # Init all candidates with uniform weights (shared until the first answer)
+        started = _detached(session)
+        _session_manager.init_candidates(
+            started, _knowledge_base.entity_ids, prior=uniform_prior(_knowledge_base),
+        )
+        try:
+            best_key = await _next_question_key(started)
+        except Exception:
+            # The hint keyboard stays, so the user can simply tap again
+            _log_engine_failure(user_id)
+            await callback.answer(_busy_text(lang))
+            return
+        attr = _pose_question(started, best_key)
+        store[user_id] = started
         await callback.answer()
-        await _ask_next_question(callback.message, session)
+        await _send_question(callback.message, started, attr)
     else:
         # Ask for hint text
         session.mode = GameMode.WAITING_HINT
+        store[user_id] = session
         if lang == "ru":
             await callback.message.edit_text("Опишите персонажа одной фразой (без имени):")
         else:
@@ -331,48 +575,65 @@ def _answer_label(answer: Answer, lang: str) -> str:
 
 @router.callback_query(F.data.startswith("answer:"))
 async def handle_answer_callback(callback: CallbackQuery) -> None:
+    # A second tap waits here, then finds its question already answered
+    async with _user_lock(callback.from_user.id):
+        await _answer_callback(callback)
+
+
+async def _answer_callback(callback: CallbackQuery) -> None:
     if await _handle_stale_session(callback):
         return
     store = get_session_store()
     user_id = callback.from_user.id
-    session = store.get(user_id)
+    session = await _load_session(store, user_id)
+    if session.mode == GameMode.FINISHED:
+        await callback.answer()
+        return
 
-    answer_key = callback.data.split(":")[1]
+    # "answer:<answer>[:<attribute id>]"; older keyboards carry no attribute id
+    _, answer_key, *question_id = callback.data.split(":")
     answer = Answer(answer_key)
     lang = _get_lang(session)
 
-    # Find the last asked attribute
-    if session.asked_attributes:
-        last_attr_id = session.asked_attributes[-1]
-        attr = None
-        for a in _attributes:
-            if a.id == last_attr_id:
-                attr = a
-                break
+    # The pending question: asked, but not yet in the history
+    pending = len(session.asked_attributes) > len(session.history)
+    attr = get_attribute(session.asked_attributes[-1]) if pending else None
+    if attr is None or (question_id and question_id[0] != str(attr.id)):
+        # A button of a question that is already answered
+        await callback.answer()
+        return
+
+    # Answer, then pick the next move, on a copy; the session only changes if both succeed
+    try:
+        updated = await _engine_executor.run(_answer_job, session, attr, answer)
+        guess = _session_manager.should_guess(updated)
+        best_key = None if guess else await _next_question_key(updated)
+    except Exception:
+        # The question and its buttons stay as they were, so the user can tap again
+        _log_engine_failure(user_id)
+        await callback.answer(_busy_text(lang))
+        return
+    session = updated
+    if guess:
+        session.mode = GameMode.GUESSING
     else:
-        attr = None
-
-    # If we have the attribute, process the answer
-    if attr:
-        # Remove from asked (process_answer will re-add)
-        session.asked_attributes.pop()
-        _session_manager.process_answer(session, _entities, attr, answer)
-
-        # Show selected answer by editing the message
-        q_text = _attr_question(attr, lang)
-        answer_label = _answer_label(answer, lang)
-        q_num = session.question_count
-        if lang == "ru":
-            marked_text = f"Вопрос {q_num}/20:\n{q_text}\n\n✓ Ваш ответ: **{answer_label}**"
-        else:
-            marked_text = f"Question {q_num}/20:\n{q_text}\n\n✓ Your answer: **{answer_label}**"
-        await callback.message.edit_text(marked_text)
+        next_attr = _pose_question(session, best_key)
+    # Every change is made; later awaits may let the store flush
+    store[user_id] = session
+
+    # Show selected answer by editing the message
+    q_text = _attr_question(attr, lang)
+    answer_label = _answer_label(answer, lang)
+    q_num = session.question_count
+    if lang == "ru":
+        marked_text = f"Вопрос {q_num}/20:\n{q_text}\n\n✓ Ваш ответ: **{answer_label}**"
+    else:
+        marked_text = f"Question {q_num}/20:\n{q_text}\n\n✓ Your answer: **{answer_label}**"
+    await callback.message.edit_text(marked_text)
 
     await callback.answer()
 
-    # Check if we should guess
-    if _session_manager.should_guess(session):
-        session.mode = GameMode.GUESSING
+    if guess:
         candidate_id = _session_manager.get_guess_candidate(session)
         name = get_localized_entity_name(candidate_id, lang)
         _, max_w = _scoring_engine.max_prob(session)
@@ -383,43 +644,48 @@ async def handle_answer_callback(callback: CallbackQuery) -> None:
             text = f"I think it's **{name}**! ({max_w:.0%} confident)"
         await callback.message.edit_text(text, reply_markup=guess_keyboard(lang))
     else:
-        await _ask_next_question(callback.message, session)
+        await _send_question(callback.message, session, next_attr)
+
+
+def _session_feedback(session: GameSession, entity_id: int, lang: str) -> list[FeedbackRecord]:
+    """Feedback records for all questions asked in this session."""
+    if entity_id not in _knowledge_base.row_of:
+        return []
+    records = []
+    for qa in session.history:
+        attr = _attribute_by_key.get(qa.attribute_key)
+        if attr is None:
+            continue
+        records.append(FeedbackRecord(
+            entity_id=entity_id,
+            attribute_id=attr.id,
+            user_answer=qa.answer.value,
+            expected_value=_knowledge_base.value(entity_id, qa.attribute_key),
+            language=lang,
+        ))
+    return records
 
 
 async def _track_session_feedback(
     session: GameSession, entity_id: int, lang: str
 ) -> None:
-    """Track user feedback for all questions asked in this session."""
-    if _repo is None:
-        return
+    """Track user feedback for all questions asked in this session.
 
-    # Get the entity with attributes
-    entities_with_attrs = [e for e in _entities if e.id == entity_id]
-    if not entities_with_attrs:
+    Queued on the feedback sink when there is one, so the reply doesn't
+    wait on the database; otherwise written in one transaction.
+    """
+    records = _session_feedback(session, entity_id, lang)
+    if not records:
         return
-
-    entity = entities_with_attrs[0]
-    attr_key_to_id = {a.key: a.id for a in _attributes}
-
-    # Track each question/answer pair
-    for qa in session.history:
-        if qa.attribute_key not in attr_key_to_id:
-            continue
-
-        attribute_id = attr_key_to_id[qa.attribute_key]
-        expected_value = entity.attributes.get(qa.attribute_key, 0.5)
-        user_answer = qa.answer.value
-
-        try:
-            await _repo.track_feedback(
-                entity_id=entity_id,
-                attribute_id=attribute_id,
-                user_answer=user_answer,
-                expected_value=expected_value,
-                language=lang,
-            )
-        except Exception as e:
-            logger.warning("Failed to track feedback: %s", e)
+    if _feedback_sink is not None:
+        _feedback_sink.submit(records)
+        return
+    if _repo is None:
+        return
+    try:
+        await _repo.track_feedback_bulk(records)
+    except Exception as e:
+        logger.warning("Failed to track feedback: %s", e)
 
 
 @router.callback_query(F.data.startswith("guess:"))
@@ -428,7 +694,11 @@ async def handle_guess_callback(callback: CallbackQuery) -> None:
         return
     store = get_session_store()
     user_id = callback.from_user.id
-    session = store.get(user_id)
+    session = await _load_session(store, user_id)
+    if session.mode == GameMode.FINISHED:
+        # Button from a finished game (its candidates may be compacted away)
+        await callback.answer()
+        return
 
     action = callback.data.split(":")[1]
     lang = _get_lang(session)
@@ -439,6 +709,7 @@ async def handle_guess_callback(callback: CallbackQuery) -> None:
         await _track_session_feedback(session, guessed_id, lang)
 
         _session_manager.handle_guess_response(session, correct=True)
+        store[user_id] = session
         q_count = session.question_count
         if lang == "ru":
             text = f"Угадал за {q_count} вопросов!"
@@ -447,20 +718,18 @@ async def handle_guess_callback(callback: CallbackQuery) -> None:
         await callback.message.edit_text(text, reply_markup=new_game_keyboard(lang))
     else:
         second = _session_manager.handle_guess_response(session, correct=False)
-        if session.mode == GameMode.GUESSING and second is not None:
+        if session.mode != GameMode.GUESSING or second is None:
+            # No second guess: ask who it was
+            session.mode = GameMode.LEARNING
+        store[user_id] = session
+        if session.mode == GameMode.GUESSING:
             name = get_localized_entity_name(second, lang)
             if lang == "ru":
                 text = f"Тогда может это **{name}**?"
             else:
                 text = f"Then maybe it's **{name}**?"
             await callback.message.edit_text(text, reply_markup=guess_keyboard(lang))
-        elif session.mode == GameMode.LEARNING:
-            if lang == "ru":
-                await callback.message.edit_text("Сдаюсь! Кого вы загадали? Напишите имя:")
-            else:
-                await callback.message.edit_text("I give up! Who were you thinking of? Type the name:")
         else:
-            session.mode = GameMode.LEARNING
             if lang == "ru":
                 await callback.message.edit_text("Сдаюсь! Кого вы загадали? Напишите имя:")
             else:
@@ -474,7 +743,8 @@ async def handle_new_game_callback(callback: CallbackQuery) -> None:
     # Create a new game directly (works even after redeploy)
     store = get_session_store()
     user_id = callback.from_user.id
-    lang = store[user_id].language if user_id in store else "ru"
+    previous = await _load_session(store, user_id)
+    lang = previous.language if previous else "ru"
     session = _session_manager.create_session(user_id=user_id, language=lang)
     store[user_id] = session
 
@@ -497,9 +767,14 @@ async def handle_new_game_callback(callback: CallbackQuery) -> None:
 
 @router.message()
 async def handle_text(message: Message) -> None:
+    async with _user_lock(message.from_user.id):
+        await _text_message(message)
+
+
+async def _text_message(message: Message) -> None:
     store = get_session_store()
     user_id = message.from_user.id
-    session = store.get(user_id)
+    session = await _load_session(store, user_id)
 
     if session is None:
         await message.answer("Use /new to start a game!")
@@ -509,21 +784,33 @@ async def handle_text(message: Message) -> None:
 
     if session.mode == GameMode.WAITING_HINT:
         # Process hint — for MVP just init all candidates (embedding search requires LLM)
-        session.hint_text = message.text
-        all_ids = [e.id for e in _entities]
-        _session_manager.init_candidates(session, all_ids)
+        started = _detached(session)
+        started.hint_text = message.text
+        _session_manager.init_candidates(
+            started, _knowledge_base.entity_ids, prior=uniform_prior(_knowledge_base),
+        )
+        try:
+            best_key = await _next_question_key(started)
+        except Exception:
+            # Still waiting for the hint, so the user can send it again
+            _log_engine_failure(user_id)
+            await message.answer(_busy_text(lang))
+            return
+        attr = _pose_question(started, best_key)
+        store[user_id] = started
 
         if lang == "ru":
             await message.answer("Принял! Начинаем.")
         else:
             await message.answer("Got it! Let's begin.")
-        await _ask_next_question(message, session)
+        await _send_question(message, started, attr)
 
     elif session.mode == GameMode.LEARNING:
         # Save new entity to database from user answers
         entity_name = message.text.strip()
         saved = await _learn_new_entity(entity_name, session, lang)
         _session_manager.finish_learning(session)
+        store[user_id] = session
         if saved:
             if lang == "ru":
                 text = f"Спасибо! Я запомнил **{entity_name}** и буду угадывать в следующий раз."
@@ -547,14 +834,33 @@ async def handle_text(message: Message) -> None:
 # Helper
 # ──────────────────────────────────────────────
 
-async def _ask_next_question(message: Message, session: GameSession) -> None:
-    """Select next attribute and send question."""
-    lang = _get_lang(session)
-    best_key = _question_policy.select(session, _entities, _attributes)
-
+async def _next_question_key(session: GameSession) -> str | None:
+    """Select the next attribute: from the opening book, else a batched selection."""
+    best_key = _opening_book.lookup(session, _knowledge_base) if _opening_book else None
     if best_key is None:
+        best_key = await _question_batcher.submit(session)
+    return best_key
+
+
+def _pose_question(session: GameSession, best_key: str | None) -> Attribute | None:
+    """Record the selected question as asked; None forces a guess instead.
+
+    Runs before the session is stored back, so the change is flushed with it.
+    """
+    attr = _find_attr_by_key(best_key) if best_key is not None else None
+    if attr is None:
         # No more attributes to ask — force guess
         session.mode = GameMode.GUESSING
+        return None
+    # Track that we've "asked" this attribute (will be finalized in process_answer)
+    session.asked_attributes.append(attr.id)
+    return attr
+
+
+async def _send_question(message: Message, session: GameSession, attr: Attribute | None) -> None:
+    """Send the question _pose_question recorded, or a forced guess when there is none."""
+    lang = _get_lang(session)
+    if attr is None:
         candidate_id = _session_manager.get_guess_candidate(session)
         name = get_localized_entity_name(candidate_id, lang)
         if lang == "ru":
@@ -564,13 +870,6 @@ async def _ask_next_question(message: Message, session: GameSession) -> None:
         await message.answer(text, reply_markup=guess_keyboard(lang))
         return
 
-    attr = _find_attr_by_key(best_key)
-    if attr is None:
-        return
-
-    # Track that we've "asked" this attribute (will be finalized in process_answer)
-    session.asked_attributes.append(attr.id)
-
     q_num = session.question_count + 1
     q_text = _attr_question(attr, lang)
 
@@ -579,18 +878,19 @@ async def _ask_next_question(message: Message, session: GameSession) -> None:
     else:
         header = f"Question {q_num}/20:"
 
-    await message.answer(f"{header}\n{q_text}", reply_markup=answer_keyboard(lang))
+    await message.answer(f"{header}\n{q_text}", reply_markup=answer_keyboard(lang, attr.id))
 
 
 async def _learn_new_entity(
     name: str, session: GameSession, lang: str,
 ) -> bool:
-    """Save a new entity to DB and add to in-memory lists.
+    """Save a new entity to DB and add to in-memory lists and knowledge base.
 
     Infer attribute values from the session's QA history.
     If an entity with the same name already exists, update its attributes.
     Returns True if saved successfully.
     """
+    global _knowledge_base
     if _repo is None:
         return False
 
@@ -607,52 +907,52 @@ async def _learn_new_entity(
         for qa in session.history:
             attrs[qa.attribute_key] = answer_to_value[qa.answer]
 
-        attr_key_to_id = {a.key: a.id for a in _attributes}
-
         # Check if entity already exists (duplicate detection)
         existing = await _repo.find_entity_by_name(name)
         if existing is not None:
             # Update existing entity's attributes with new answers
-            for key, value in attrs.items():
-                if key in attr_key_to_id:
-                    await _repo.set_entity_attribute(existing.id, attr_key_to_id[key], value)
-            # Update in-memory entity
-            for e in _entities:
-                if e.id == existing.id:
-                    e.attributes.update(attrs)
-                    break
+            await _repo.set_entity_attributes_bulk(
+                (existing.id, _attribute_by_key[key].id, value)
+                for key, value in attrs.items()
+                if key in _attribute_by_key
+            )
+            # Update in-memory knowledge base
+            _knowledge_base = _knowledge_base.with_attributes(existing.id, attrs)
+            _publish_game_data()
+            _schedule_opening_book_rebuild()
             logger.info("Updated existing entity: %s (id=%d) with %d attributes", name, existing.id, len(attrs))
             return True
 
-        # Save new entity to DB
-        eid = await _repo.add_entity(
-            name=name,
-            description=f"Learned from user {session.user_id}",
-            entity_type="character",
-            language=lang,
-        )
-
-        # Save attributes
-        for key, value in attrs.items():
-            if key in attr_key_to_id:
-                await _repo.set_entity_attribute(eid, attr_key_to_id[key], value)
+        # Save new entity and its attributes to DB (one commit)
+        async with _repo.transaction():
+            eid = await _repo.add_entity(
+                name=name,
+                description=f"Learned from user {session.user_id}",
+                entity_type="character",
+                language=lang,
+            )
+            await _repo.set_entity_attributes_bulk(
+                (eid, _attribute_by_key[key].id, value)
+                for key, value in attrs.items()
+                if key in _attribute_by_key
+            )
 
         # Add to in-memory lists so it's available immediately for all users
         new_entity = Entity(
             id=eid, name=name,
             description=f"Learned from user {session.user_id}",
             entity_type="character", language=lang,
-            attributes=attrs,
         )
+        # All in-memory structures change together, before the next await
         _entities.append(new_entity)
+        _entity_by_id[eid] = new_entity
+        _knowledge_base = _knowledge_base.with_attributes(eid, attrs)
         _entity_names[eid] = name
-        # Add to localized name dictionaries
-        if lang == "ru":
-            _entity_names_ru[eid] = name
-            _entity_names_en[eid] = name  # Use same name as fallback for EN
-        else:
-            _entity_names_en[eid] = name
-            _entity_names_ru[eid] = name  # Use same name as fallback for RU
+        # Same name as fallback for the other language
+        _entity_names_ru[eid] = name
+        _entity_names_en[eid] = name
+        _publish_game_data()
+        _schedule_opening_book_rebuild()
 
         logger.info("Learned new entity: %s (id=%d) with %d attributes", name, eid, len(attrs))
         return True
@@ -6,8 +6,8 @@ from aiogram.types import InlineKeyboardButton, InlineKeyboardMarkup
 from aiogram.utils.keyboard import InlineKeyboardBuilder
 
 
-def answer_keyboard(language: str = "ru") -> InlineKeyboardMarkup:
-    """5-button answer keyboard."""
+def answer_keyboard(language: str = "ru", attribute_id: int | None = None) -> InlineKeyboardMarkup:
+    """5-button answer keyboard; buttons carry the question's attribute id when given."""
     if language == "ru":
         labels = [
             ("Да", "answer:yes"),
@@ -24,9 +24,10 @@ def answer_keyboard(language: str = "ru") -> InlineKeyboardMarkup:
             ("Probably no", "answer:probably_no"),
             ("Don't know", "answer:dont_know"),
         ]
+    suffix = f":{attribute_id}" if attribute_id is not None else ""
     builder = InlineKeyboardBuilder()
     for text, data in labels:
-        builder.button(text=text, callback_data=data)
+        builder.button(text=text, callback_data=data + suffix)
     builder.adjust(2, 3)
     return builder.as_markup()
 
@@ -0,0 +1,57 @@
+"""Build the binary catalogue snapshot for a database.
+
+The bot writes one itself whenever it has to load from SQLite; this builds
+it ahead of time (e.g. in a deploy step) and verifies the result.
+
+Usage:
+    python -m akinator.build_snapshot                      # data/akinator.db → data/akinator.snapshot
+    python -m akinator.build_snapshot --db path/to/db [--output path/to/snapshot]
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import sys
+
+from akinator.db.repository import Repository
+from akinator.db.snapshot import (
+    default_snapshot_path, load_snapshot, read_snapshot_file, write_snapshot_file,
+)
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s")
+logger = logging.getLogger("build_snapshot")
+
+
+async def build(db_path: str, output: str) -> int:
+    """Write the snapshot of `db_path` to `output`; returns its size in bytes."""
+    repo = Repository(db_path)
+    await repo.init_db()
+    try:
+        version = await repo.get_catalogue_version()
+        snapshot = await load_snapshot(repo)
+        embeddings = await repo.get_all_embeddings()
+    finally:
+        await repo.close()
+
+    size = write_snapshot_file(output, snapshot, version, embeddings)
+    mapped = read_snapshot_file(output, version, verify=True)
+    logger.info("Snapshot of catalogue %s: %s", version, mapped.report())
+    return size
+
+
+async def main() -> None:
+    args = sys.argv[1:]
+    db_path = args[args.index("--db") + 1] if "--db" in args else "data/akinator.db"
+    output = args[args.index("--output") + 1] if "--output" in args else default_snapshot_path(db_path)
+    if not os.path.exists(db_path):
+        logger.error("Database not found: %s", db_path)
+        sys.exit(1)
+
+    size = await build(db_path, output)
+    logger.info("Done! %s, %.2f MB", output, size / (1024 * 1024))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -9,6 +9,49 @@ EMBEDDING_DIM = 1536
 PRUNE_THRESHOLD = 1e-6
 EPSILON = 0.01
 
+# Question selection requests arriving within this window share one batch
+SELECT_BATCH_WINDOW_MS = 2
+SELECT_BATCH_MAX = 64
+
+# Engine jobs (scoring, selection) run on a worker pool off the event loop
+ENGINE_EXECUTOR = "thread"  # or "process"
+ENGINE_WORKERS = 4
+ENGINE_MAX_PENDING = 32
+ENGINE_JOB_TIMEOUT = 10.0  # seconds
+LOOP_LAG_INTERVAL = 0.5  # seconds between event-loop lag probes
+
+# Questions precomputed for games from the uniform prior (plies of the opening book)
+OPENING_BOOK_DEPTH = 3
+
+# Memoized question choices / candidate states per answer path (LRU)
+PATH_CACHE_ENTRIES = 4096
+PATH_CACHE_MAX_BYTES = 64 * 1024 * 1024
+
+# Game sessions: backend ("memory", "sqlite" or "redis"), idle lifetime, write-behind period
+SESSION_STORE = "memory"
+SESSION_TTL = 24 * 3600  # seconds
+SESSION_FLUSH_INTERVAL = 1.0  # seconds
+# In-memory eviction: idle sessions expire after SESSION_TTL, LRU beyond
+# SESSION_MAX_LIVE, finished games compacted on each sweep
+SESSION_MAX_LIVE = 10_000
+SESSION_SWEEP_INTERVAL = 60.0  # seconds
+SESSION_MEMORY_TTL = 600.0  # persistent stores: idle seconds before a written-back session leaves memory
+
+# SQLite connection profiles (see akinator.db.repository.ConnectionProfile)
+SQLITE_MMAP_SIZE = 256 * 1024 * 1024  # bytes of the database file read through mmap
+SQLITE_CACHE_KB = 64 * 1024  # page cache per connection, bot
+SQLITE_IMPORT_CACHE_KB = 256 * 1024  # page cache per connection, bulk importers
+REPO_READERS = 4  # read-only connections per Repository, besides the writer
+
+# Feedback write-behind: batch size that triggers a write, max delay, and the
+# queue limit past which the oldest records are dropped
+FEEDBACK_BATCH_SIZE = 500
+FEEDBACK_FLUSH_INTERVAL = 2.0  # seconds
+FEEDBACK_MAX_PENDING = 100_000
+# Rows of raw user_feedback kept beside the aggregated counts (oldest rotated
+# out); 0 turns the raw log off
+FEEDBACK_LOG_ROWS = 200_000
+
 ANSWER_WEIGHTS = {
     "yes": 1.0,
     "no": 0.0,
@@ -0,0 +1,126 @@
+"""Feedback Sink — write-behind queue for the answers of finished games."""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+from collections import deque
+from typing import Iterable, NamedTuple
+
+from akinator.config import FEEDBACK_BATCH_SIZE, FEEDBACK_FLUSH_INTERVAL, FEEDBACK_MAX_PENDING
+from akinator.db.repository import Repository
+
+logger = logging.getLogger(__name__)
+
+
+class FeedbackRecord(NamedTuple):
+    """One answered question of a game whose entity is known.
+
+    A tuple in Repository.track_feedback_bulk's column order, so batches go
+    to executemany as they are.
+    """
+
+    entity_id: int
+    attribute_id: int
+    user_answer: str
+    expected_value: float
+    language: str
+
+
+class FeedbackSink:
+    """Buffers feedback records and writes them in batched transactions.
+
+    submit() only appends to the queue, so a handler never waits on the
+    database. A background task (start()) writes the queue once
+    `batch_size` records are pending, or `flush_interval` seconds after
+    records arrive, whichever comes first; close() writes what is left.
+
+    A failed write keeps its records for the next attempt. Past
+    `max_pending` the oldest records are dropped (and counted), so an
+    unreachable database can't exhaust memory.
+    """
+
+    def __init__(
+        self,
+        repo: Repository,
+        batch_size: int = FEEDBACK_BATCH_SIZE,
+        flush_interval: float = FEEDBACK_FLUSH_INTERVAL,
+        max_pending: int = FEEDBACK_MAX_PENDING,
+    ) -> None:
+        self.repo = repo
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.written = 0  # records committed
+        self.batches = 0  # write transactions
+        self.failures = 0  # failed write attempts
+        self.dropped = 0  # records discarded over max_pending
+        self._pending: deque[FeedbackRecord] = deque()
+        self._has_records = asyncio.Event()
+        self._batch_full = asyncio.Event()
+        self._closing = False
+        self._task: asyncio.Task | None = None
+
+    @property
+    def depth(self) -> int:
+        """Records waiting to be written."""
+        return len(self._pending)
+
+    def submit(self, records: Iterable[FeedbackRecord]) -> None:
+        """Queue records (e.g. one finished game's answers) without waiting."""
+        self._pending.extend(records)
+        overflow = len(self._pending) - self.max_pending
+        if overflow > 0:
+            for _ in range(overflow):
+                self._pending.popleft()
+            self.dropped += overflow
+            logger.warning("Feedback queue full; dropped %d oldest records", overflow)
+        if self._pending:
+            self._has_records.set()
+        if len(self._pending) >= self.batch_size:
+            self._batch_full.set()
+
+    async def flush(self) -> bool:
+        """Write every queued record, `batch_size` per transaction; False if a write failed."""
+        while self._pending:
+            batch = [self._pending.popleft() for _ in range(min(self.batch_size, len(self._pending)))]
+            try:
+                await self.repo.track_feedback_bulk(batch)
+            except Exception:
+                # Back at the front, in order, for the next attempt
+                self._pending.extendleft(reversed(batch))
+                self.failures += 1
+                logger.exception("Failed to write %d feedback records", len(batch))
+                return False
+            self.written += len(batch)
+            self.batches += 1
+        self._has_records.clear()
+        self._batch_full.clear()
+        return True
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def _run(self) -> None:
+        while not self._closing:
+            await self._has_records.wait()
+            if len(self._pending) < self.batch_size and not self._closing:
+                # Let the batch fill up, but write within flush_interval regardless
+                try:
+                    await asyncio.wait_for(self._batch_full.wait(), self.flush_interval)
+                except asyncio.TimeoutError:
+                    pass
+            if not await self.flush() and not self._closing:
+                await asyncio.sleep(self.flush_interval)
+
+    async def close(self) -> None:
+        """Stop the background task and write everything still queued."""
+        if self._task is not None:
+            # Let an in-flight write finish rather than cancelling it mid-transaction
+            self._closing = True
+            self._has_records.set()
+            self._batch_full.set()
+            await self._task
+            self._task = None
+        await self.flush()
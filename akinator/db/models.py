@@ -5,6 +5,12 @@ from __future__ import annotations
 from dataclasses import dataclass, field
 from datetime import datetime
 from enum import Enum
+from typing import TYPE_CHECKING
+
+import numpy as np
+
+if TYPE_CHECKING:
+    from akinator.engine.stats import SessionStats
 
 
 class GameMode(Enum):
@@ -54,17 +60,89 @@ class QAPair:
     answer: Answer
 
 
+class _ListView:
+    """Dataclass field that stores a NumPy array but reads back as a plain list.
+
+    Reads return a fresh list (the shape handlers and tests work with), so
+    mutate the backing array rather than the returned list. Assigning a list
+    or array replaces the backing array and clears any cached attribute in
+    `resets`.
+    """
+
+    def __init__(self, array_attr: str, dtype: type, resets: tuple[str, ...] = ()) -> None:
+        self.array_attr = array_attr
+        self.dtype = dtype
+        self.resets = resets
+
+    def __get__(self, obj, objtype=None):
+        if obj is None:
+            return ()  # dataclass default
+        return getattr(obj, self.array_attr).tolist()
+
+    def __set__(self, obj, value) -> None:
+        setattr(obj, self.array_attr, np.array(value, dtype=self.dtype))
+        for attr in self.resets:
+            setattr(obj, attr, None)
+
+
 @dataclass
 class GameSession:
     session_id: str
     user_id: int
     language: str = "ru"
     mode: GameMode = GameMode.WAITING_HINT
-    candidate_ids: list[int] = field(default_factory=list)
-    weights: list[float] = field(default_factory=list)
+    # Engine state behind the list views below; declared first so __init__
+    # sets these defaults before candidate_ids / weights are assigned.
+    # Knowledge-base rows of candidate_array, resolved lazily by the engine.
+    candidate_rows: np.ndarray | None = field(default=None, init=False, repr=False, compare=False)
+    rows_source: np.ndarray | None = field(default=None, init=False, repr=False, compare=False)
+    # Normalized weights and unnormalized log-weights; at most one is stale (None).
+    _weight_array: np.ndarray | None = field(default=None, init=False, repr=False, compare=False)
+    _log_weights: np.ndarray | None = field(default=None, init=False, repr=False, compare=False)
+    # Question-selection statistics for the current weights; cleared whenever they change.
+    stats: SessionStats | None = field(default=None, init=False, repr=False, compare=False)
+    # Attribute columns ruled out by related-attribute rules, folded in from
+    # the first `blocked_count` history entries (see QuestionPolicy.blocked_columns).
+    blocked_columns: np.ndarray | None = field(default=None, init=False, repr=False, compare=False)
+    blocked_source: dict[str, int] | None = field(default=None, init=False, repr=False, compare=False)
+    blocked_count: int = field(default=0, init=False, repr=False, compare=False)
+    candidate_ids: list[int] = _ListView("candidate_array", np.int64, resets=("candidate_rows", "stats"))
+    weights: list[float] = _ListView("weight_array", np.float64)
+    prior: str | None = None  # id of a shared starting prior (see init_candidates)
     asked_attributes: list[int] = field(default_factory=list)
     history: list[QAPair] = field(default_factory=list)
     hint_text: str | None = None
     guess_count: int = 0
     question_count: int = 0
     created_at: datetime = field(default_factory=datetime.now)
+
+    @property
+    def weight_array(self) -> np.ndarray:
+        """Normalized candidate weights, computed from log_weights on first read."""
+        if self._weight_array is None:
+            lw = self._log_weights
+            if len(lw) == 0:
+                self._weight_array = np.empty(0)
+            else:
+                # log-sum-exp, shifted by the max so exp() cannot overflow
+                shift = lw.max()
+                log_norm = shift + np.log(np.exp(lw - shift).sum())
+                self._weight_array = np.exp(lw - log_norm)
+        return self._weight_array
+
+    @weight_array.setter
+    def weight_array(self, value: np.ndarray) -> None:
+        self._weight_array = value
+        self._log_weights = None
+        self.stats = None
+
+    @property
+    def log_weights(self) -> np.ndarray | None:
+        """Unnormalized log-weights when the session is scored in log space, else None."""
+        return self._log_weights
+
+    @log_weights.setter
+    def log_weights(self, value: np.ndarray) -> None:
+        self._log_weights = value
+        self._weight_array = None
+        self.stats = None
@@ -2,10 +2,28 @@
 
 from __future__ import annotations
 
+import asyncio
+import hashlib
+import os
+import time
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import AsyncIterator, Iterable, Sequence
+from urllib.parse import quote
+
 import numpy as np
 import aiosqlite
 
-from akinator.db.models import Attribute, Entity
+from akinator.config import (
+    ANSWER_WEIGHTS,
+    FEEDBACK_LOG_ROWS,
+    REPO_READERS,
+    SQLITE_CACHE_KB,
+    SQLITE_IMPORT_CACHE_KB,
+    SQLITE_MMAP_SIZE,
+)
+from akinator.db.models import Answer, Attribute, Entity
 
 
 _SCHEMA = """
@@ -58,39 +76,326 @@ CREATE TABLE IF NOT EXISTS user_feedback (
     session_language TEXT NOT NULL
 );
 
-CREATE INDEX IF NOT EXISTS idx_feedback_entity ON user_feedback(entity_id);
 CREATE INDEX IF NOT EXISTS idx_feedback_attribute ON user_feedback(attribute_id);
+
+-- version is bumped by the triggers below on every catalogue change; token
+-- identifies the database the counter started in (set by init_db: random when
+-- created empty, else a digest of the existing file, so copies of one database
+-- agree). Snapshot files record both.
+CREATE TABLE IF NOT EXISTS catalogue_meta (
+    id INTEGER PRIMARY KEY CHECK (id = 1),
+    token TEXT NOT NULL,
+    version INTEGER NOT NULL
+);
 """
 
+# Changes that make a catalogue snapshot stale (play counters on entities do not)
+_CATALOGUE_EVENTS = {
+    "entities": ("INSERT", "UPDATE OF name, description, entity_type, language", "DELETE"),
+    "attributes": ("INSERT", "UPDATE", "DELETE"),
+    "entity_attributes": ("INSERT", "UPDATE", "DELETE"),
+    "entity_aliases": ("INSERT", "UPDATE", "DELETE"),
+    "entity_embeddings": ("INSERT", "UPDATE", "DELETE"),
+}
+_SCHEMA += "".join(
+    f"""
+CREATE TRIGGER IF NOT EXISTS catalogue_{table}_{event.split()[0].lower()}
+AFTER {event} ON {table}
+BEGIN UPDATE catalogue_meta SET version = version + 1; END;
+"""
+    for table, events in _CATALOGUE_EVENTS.items()
+    for event in events
+)
+
+# Schema changes applied in order by init_db(), to new and existing
+# databases alike; PRAGMA user_version counts how many have run.
+_MIGRATIONS: tuple[str, ...] = (
+    # 1: indexes for the per-attribute, by-name, alias and feedback lookups
+    """
+    CREATE INDEX IF NOT EXISTS idx_entity_attributes_attribute
+        ON entity_attributes(attribute_id, entity_id, value);
+    CREATE INDEX IF NOT EXISTS idx_entities_name_lower ON entities(lower(name));
+    CREATE INDEX IF NOT EXISTS idx_aliases_entity ON entity_aliases(entity_id);
+    CREATE INDEX IF NOT EXISTS idx_feedback_pair
+        ON user_feedback(entity_id, attribute_id, user_answer);
+    -- Covered by idx_feedback_pair
+    DROP INDEX IF EXISTS idx_feedback_entity;
+    """,
+    # 2: feedback aggregated per (entity, attribute), backfilled from the raw log
+    """
+    CREATE TABLE IF NOT EXISTS feedback_counts (
+        entity_id INTEGER NOT NULL,
+        attribute_id INTEGER NOT NULL,
+        yes INTEGER NOT NULL DEFAULT 0,
+        prob_yes INTEGER NOT NULL DEFAULT 0,
+        dk INTEGER NOT NULL DEFAULT 0,
+        prob_no INTEGER NOT NULL DEFAULT 0,
+        no INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (entity_id, attribute_id)
+    ) WITHOUT ROWID;
+    INSERT OR IGNORE INTO feedback_counts (entity_id, attribute_id, yes, prob_yes, dk, prob_no, no)
+    SELECT entity_id, attribute_id,
+           SUM(lower(user_answer) = 'yes'), SUM(lower(user_answer) = 'probably_yes'),
+           SUM(lower(user_answer) = 'dont_know'), SUM(lower(user_answer) = 'probably_no'),
+           SUM(lower(user_answer) = 'no')
+    FROM user_feedback
+    GROUP BY entity_id, attribute_id;
+    """,
+)
+
+# feedback_counts columns, in the order of the answers they count
+_FEEDBACK_ANSWERS = (Answer.YES, Answer.PROBABLY_YES, Answer.DONT_KNOW, Answer.PROBABLY_NO, Answer.NO)
+_FEEDBACK_COLUMN_OF = {answer.value: i for i, answer in enumerate(_FEEDBACK_ANSWERS)}
+_FEEDBACK_TOTAL = "yes + prob_yes + dk + prob_no + no"
+
+
+def _learned_value(counts: Sequence[int], current_value: float) -> float | None:
+    """Blend of the current value and the mean feedback answer; None below 3 samples."""
+    total = sum(counts)
+    if total < 3:  # Need at least 3 samples
+        return None
+    feedback_avg = sum(
+        ANSWER_WEIGHTS[answer.value] * n for answer, n in zip(_FEEDBACK_ANSWERS, counts)
+    ) / total
+    # Blend current value with feedback (70% feedback, 30% current)
+    # This prevents sudden jumps and maintains some stability
+    return round(0.7 * feedback_avg + 0.3 * current_value, 2)
+
+
+@dataclass(frozen=True)
+class ConnectionProfile:
+    """PRAGMAs applied to every connection a Repository opens.
+
+    journal_mode=WAL is stored in the database file; the rest is per
+    connection.
+    """
+
+    journal_mode: str = "WAL"
+    synchronous: str = "NORMAL"
+    mmap_size: int = SQLITE_MMAP_SIZE
+    cache_kb: int = SQLITE_CACHE_KB
+    temp_store: str = "MEMORY"
+    busy_timeout_ms: int = 5000
+
+    def pragmas(self, read_only: bool = False) -> list[str]:
+        """PRAGMA statements; `read_only` leaves out those only a writer can apply."""
+        writer = [
+            f"PRAGMA journal_mode={self.journal_mode}",
+            f"PRAGMA synchronous={self.synchronous}",
+        ]
+        return ([] if read_only else writer) + [
+            f"PRAGMA mmap_size={self.mmap_size}",
+            # Negative: size in KiB rather than pages
+            f"PRAGMA cache_size={-self.cache_kb}",
+            f"PRAGMA temp_store={self.temp_store}",
+            f"PRAGMA busy_timeout={self.busy_timeout_ms}",
+        ]
 
-class Repository:
 
-    def __init__(self, db_path: str) -> None:
+# The bot: WAL so reads never wait on writes, fsync only at checkpoints
+BOT_PROFILE = ConnectionProfile()
+# Offline builds and imports (generate_db, seed, Wikidata importers): no fsync
+# at all and a bigger cache; an OS crash mid-build means rebuilding
+IMPORT_PROFILE = ConnectionProfile(synchronous="OFF", cache_kb=SQLITE_IMPORT_CACHE_KB)
+
+
+def _file_digest(path: str) -> str:
+    """Digest of a database file's bytes (and its WAL, if any); any edit changes it."""
+    digest = hashlib.blake2b(digest_size=8)
+    for name in (path, path + "-wal"):
+        if os.path.exists(name):
+            with open(name, "rb") as f:
+                while chunk := f.read(1 << 20):
+                    digest.update(chunk)
+    return digest.hexdigest()
+
+
+class WaitStats:
+    """How long callers waited for a connection (pool metrics)."""
+
+    def __init__(self) -> None:
+        self.waiting = 0  # callers blocked right now
+        self.acquired = 0
+        self.total_wait = 0.0  # seconds
+        self.max_wait = 0.0
+
+    @property
+    def mean_wait(self) -> float:
+        return self.total_wait / self.acquired if self.acquired else 0.0
+
+    def record(self, seconds: float) -> None:
+        self.acquired += 1
+        self.total_wait += seconds
+        self.max_wait = max(self.max_wait, seconds)
+
+
+class Repository:
+    """SQLite access through one writer connection and a pool of readers.
+
+    Writes queue (FIFO) for the writer, one transaction() at a time. Reads
+    use up to `readers` read-only connections, which WAL lets run while a
+    write is in progress, so learning and feedback writes never hold up
+    gameplay reads. Inside transaction(), the owning task's reads use the
+    writer and see its uncommitted changes. `read_waits` / `write_waits`
+    measure time spent waiting for a connection. Feedback is counted in
+    feedback_counts; the raw user_feedback log keeps only the newest
+    `feedback_log_rows` rows (0: none).
+    """
+
+    def __init__(
+        self, db_path: str, profile: ConnectionProfile = BOT_PROFILE, readers: int = REPO_READERS,
+        feedback_log_rows: int = FEEDBACK_LOG_ROWS,
+    ) -> None:
         self.db_path = db_path
-        self._db: aiosqlite.Connection | None = None
+        self.profile = profile
+        self.feedback_log_rows = feedback_log_rows
+        # A private in-memory database can't be shared with other connections
+        self.readers = 0 if db_path == ":memory:" else readers
+        self.read_waits = WaitStats()
+        self.write_waits = WaitStats()
+        self._db: aiosqlite.Connection | None = None  # the writer
+        self._write_lock = asyncio.Lock()
+        self._reader_conns: list[aiosqlite.Connection] = []
+        self._idle_readers: asyncio.Queue[aiosqlite.Connection] = asyncio.Queue()
+        self._opening_readers = 0
+        # True in the task (context) that holds this repository's transaction()
+        self._in_transaction: ContextVar[bool] = ContextVar(f"repository_tx_{id(self)}", default=False)
 
     async def _conn(self) -> aiosqlite.Connection:
+        """The writer connection."""
         if self._db is None:
             self._db = await aiosqlite.connect(self.db_path)
             self._db.row_factory = aiosqlite.Row
+            for pragma in self.profile.pragmas():
+                await self._db.execute(pragma)
         return self._db
 
+    async def _open_reader(self) -> aiosqlite.Connection:
+        # The writer goes first: it creates the file and switches it to WAL
+        await self._conn()
+        db = await aiosqlite.connect(f"file:{quote(self.db_path)}?mode=ro", uri=True)
+        db.row_factory = aiosqlite.Row
+        for pragma in self.profile.pragmas(read_only=True):
+            await db.execute(pragma)
+        return db
+
+    @asynccontextmanager
+    async def _read(self) -> AsyncIterator[aiosqlite.Connection]:
+        """A connection for reads: a pooled reader, or the writer inside transaction()."""
+        if self.readers == 0 or self._in_transaction.get():
+            yield await self._conn()
+            return
+        start = time.perf_counter()
+        if self._idle_readers.empty() and len(self._reader_conns) + self._opening_readers < self.readers:
+            self._opening_readers += 1
+            try:
+                db = await self._open_reader()
+            finally:
+                self._opening_readers -= 1
+            self._reader_conns.append(db)
+        else:
+            self.read_waits.waiting += 1
+            try:
+                db = await self._idle_readers.get()
+            finally:
+                self.read_waits.waiting -= 1
+        self.read_waits.record(time.perf_counter() - start)
+        try:
+            yield db
+        finally:
+            self._idle_readers.put_nowait(db)
+
     async def init_db(self) -> None:
         db = await self._conn()
-        await db.executescript(_SCHEMA)
-        await db.commit()
+        async with self._write_lock:
+            cursor = await db.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'catalogue_meta'"
+            )
+            file_token = None
+            if await cursor.fetchone() is None and self.db_path != ":memory:":
+                # Digest the file before the schema changes it
+                file_token = await asyncio.to_thread(_file_digest, self.db_path)
+            await db.executescript(_SCHEMA)
+            cursor = await db.execute("SELECT EXISTS (SELECT 1 FROM entities)")
+            has_content = (await cursor.fetchone())[0]
+            await db.execute(
+                "INSERT INTO catalogue_meta (id, token, version) SELECT 1, ?, 0 "
+                "WHERE NOT EXISTS (SELECT 1 FROM catalogue_meta)",
+                (file_token if has_content and file_token else os.urandom(8).hex(),),
+            )
+            cursor = await db.execute("PRAGMA user_version")
+            applied = (await cursor.fetchone())[0]
+            for version, migration in enumerate(_MIGRATIONS[applied:], start=applied + 1):
+                await db.executescript(migration + f"PRAGMA user_version = {version};")
+            await db.commit()
 
     async def close(self) -> None:
+        for db in self._reader_conns:
+            await db.close()
+        self._reader_conns.clear()
+        self._idle_readers = asyncio.Queue()
         if self._db:
+            # Refresh planner statistics for tables whose indexes were used
+            await self._db.execute("PRAGMA optimize")
             await self._db.close()
             self._db = None
 
-    async def list_tables(self) -> list[str]:
+    async def query_plan(self, sql: str, params: Sequence = ()) -> list[str]:
+        """EXPLAIN QUERY PLAN details for `sql`, one string per plan step."""
+        async with self._read() as db:
+            cursor = await db.execute(f"EXPLAIN QUERY PLAN {sql}", params)
+            return [r[3] for r in await cursor.fetchall()]
+
+    @asynccontextmanager
+    async def transaction(self) -> AsyncIterator[aiosqlite.Connection]:
+        """Group writes into one transaction on the writer, committed (one fsync) on exit.
+
+        Every mutator runs in one, so a block of them commits once; an
+        exception rolls everything back. A nested transaction() in the same
+        task joins the outer one. Other tasks' writes queue until it ends.
+        """
         db = await self._conn()
-        cursor = await db.execute(
-            "SELECT name FROM sqlite_master WHERE type='table' AND name NOT LIKE 'sqlite_%'"
-        )
-        rows = await cursor.fetchall()
+        if self._in_transaction.get():
+            yield db
+            return
+        start = time.perf_counter()
+        self.write_waits.waiting += 1
+        try:
+            await self._write_lock.acquire()
+        finally:
+            self.write_waits.waiting -= 1
+        self.write_waits.record(time.perf_counter() - start)
+        token = self._in_transaction.set(True)
+        try:
+            # Take SQLite's write lock up front rather than upgrading mid-transaction
+            await db.execute("BEGIN IMMEDIATE")
+            try:
+                yield db
+            except BaseException:
+                await db.rollback()
+                raise
+            await db.commit()
+        finally:
+            self._in_transaction.reset(token)
+            self._write_lock.release()
+
+    async def get_catalogue_version(self) -> str:
+        """Stamp that changes on every change to entities, attributes, values, aliases or embeddings.
+
+        "<token>:<counter>", so two databases don't share a stamp just
+        because their counters match.
+        """
+        async with self._read() as db:
+            cursor = await db.execute("SELECT token, version FROM catalogue_meta WHERE id = 1")
+            row = await cursor.fetchone()
+        return f"{row[0]}:{row[1]}" if row else ""
+
+    async def list_tables(self) -> list[str]:
+        async with self._read() as db:
+            cursor = await db.execute(
+                "SELECT name FROM sqlite_master WHERE type='table' AND name NOT LIKE 'sqlite_%'"
+            )
+            rows = await cursor.fetchall()
         return [r[0] for r in rows]
 
     # ---- Entities ----
@@ -98,156 +403,267 @@ class Repository:
     async def add_entity(
         self, name: str, description: str, entity_type: str, language: str,
     ) -> int:
-        db = await self._conn()
-        cursor = await db.execute(
-            "INSERT INTO entities (name, description, entity_type, language) VALUES (?, ?, ?, ?)",
-            (name, description, entity_type, language),
-        )
-        await db.commit()
-        return cursor.lastrowid
+        async with self.transaction() as db:
+            cursor = await db.execute(
+                "INSERT INTO entities (name, description, entity_type, language) VALUES (?, ?, ?, ?)",
+                (name, description, entity_type, language),
+            )
+            return cursor.lastrowid
+
+    async def add_entities_bulk(
+        self, entities: Sequence[tuple[str, str, str, str]],
+    ) -> list[int]:
+        """Insert (name, description, entity_type, language) rows in one transaction; returns their ids.
+
+        The first row gets its id from AUTOINCREMENT and the rest follow it
+        consecutively (the write lock is held throughout), so one
+        executemany inserts them all.
+        """
+        if not entities:
+            return []
+        async with self.transaction() as db:
+            cursor = await db.execute(
+                "INSERT INTO entities (name, description, entity_type, language) VALUES (?, ?, ?, ?)",
+                entities[0],
+            )
+            first = cursor.lastrowid
+            await db.executemany(
+                "INSERT INTO entities (id, name, description, entity_type, language) VALUES (?, ?, ?, ?, ?)",
+                ((first + i, *row) for i, row in enumerate(entities[1:], start=1)),
+            )
+        return list(range(first, first + len(entities)))
 
     async def get_entity(self, entity_id: int, with_attributes: bool = False) -> Entity | None:
-        db = await self._conn()
-        cursor = await db.execute("SELECT * FROM entities WHERE id = ?", (entity_id,))
-        row = await cursor.fetchone()
-        if row is None:
-            return None
-        entity = Entity(
-            id=row["id"], name=row["name"], description=row["description"],
-            entity_type=row["entity_type"], language=row["language"],
-            play_count=row["play_count"],
-            guess_success_count=row["guess_success_count"],
-        )
-        if with_attributes:
-            cursor2 = await db.execute(
-                """SELECT a.key, ea.value
-                   FROM entity_attributes ea
-                   JOIN attributes a ON a.id = ea.attribute_id
-                   WHERE ea.entity_id = ?""",
-                (entity_id,),
+        async with self._read() as db:
+            cursor = await db.execute("SELECT * FROM entities WHERE id = ?", (entity_id,))
+            row = await cursor.fetchone()
+            if row is None:
+                return None
+            entity = Entity(
+                id=row["id"], name=row["name"], description=row["description"],
+                entity_type=row["entity_type"], language=row["language"],
+                play_count=row["play_count"],
+                guess_success_count=row["guess_success_count"],
             )
-            for arow in await cursor2.fetchall():
-                entity.attributes[arow[0]] = arow[1]
-        return entity
+            if with_attributes:
+                cursor2 = await db.execute(
+                    """SELECT a.key, ea.value
+                       FROM entity_attributes ea
+                       JOIN attributes a ON a.id = ea.attribute_id
+                       WHERE ea.entity_id = ?""",
+                    (entity_id,),
+                )
+                for arow in await cursor2.fetchall():
+                    entity.attributes[arow[0]] = arow[1]
+            return entity
 
     async def get_all_entities(self) -> list[Entity]:
-        db = await self._conn()
-        cursor = await db.execute("SELECT * FROM entities")
-        rows = await cursor.fetchall()
-        return [
-            Entity(
-                id=r["id"], name=r["name"], description=r["description"],
-                entity_type=r["entity_type"], language=r["language"],
-                play_count=r["play_count"],
-                guess_success_count=r["guess_success_count"],
-            )
-            for r in rows
-        ]
+        async with self._read() as db:
+            cursor = await db.execute("SELECT * FROM entities")
+            rows = await cursor.fetchall()
+            return [
+                Entity(
+                    id=r["id"], name=r["name"], description=r["description"],
+                    entity_type=r["entity_type"], language=r["language"],
+                    play_count=r["play_count"],
+                    guess_success_count=r["guess_success_count"],
+                )
+                for r in rows
+            ]
 
     async def find_entity_by_name(self, name: str) -> Entity | None:
-        db = await self._conn()
-        cursor = await db.execute(
-            "SELECT * FROM entities WHERE LOWER(name) = LOWER(?)", (name,),
-        )
-        row = await cursor.fetchone()
-        if row is None:
-            return None
-        return Entity(
-            id=row["id"], name=row["name"], description=row["description"],
-            entity_type=row["entity_type"], language=row["language"],
-            play_count=row["play_count"],
-            guess_success_count=row["guess_success_count"],
-        )
+        async with self._read() as db:
+            cursor = await db.execute(
+                # Matches idx_entities_name_lower
+                "SELECT * FROM entities WHERE lower(name) = lower(?)", (name,),
+            )
+            row = await cursor.fetchone()
+            if row is None:
+                return None
+            return Entity(
+                id=row["id"], name=row["name"], description=row["description"],
+                entity_type=row["entity_type"], language=row["language"],
+                play_count=row["play_count"],
+                guess_success_count=row["guess_success_count"],
+            )
 
     async def get_all_entity_attributes(self) -> dict[int, dict[str, float]]:
         """Batch-load all entity attributes in one query."""
-        db = await self._conn()
-        cursor = await db.execute(
-            """SELECT ea.entity_id, a.key, ea.value
-               FROM entity_attributes ea
-               JOIN attributes a ON a.id = ea.attribute_id"""
-        )
-        rows = await cursor.fetchall()
-        result: dict[int, dict[str, float]] = {}
-        for r in rows:
-            eid = r[0]
-            if eid not in result:
-                result[eid] = {}
-            result[eid][r[1]] = r[2]
-        return result
+        async with self._read() as db:
+            cursor = await db.execute(
+                """SELECT ea.entity_id, a.key, ea.value
+                   FROM entity_attributes ea
+                   JOIN attributes a ON a.id = ea.attribute_id"""
+            )
+            rows = await cursor.fetchall()
+            result: dict[int, dict[str, float]] = {}
+            for r in rows:
+                eid = r[0]
+                if eid not in result:
+                    result[eid] = {}
+                result[eid][r[1]] = r[2]
+            return result
+
+    async def get_catalogue(
+        self,
+    ) -> tuple[
+        list[Entity],
+        list[Attribute],
+        tuple[np.ndarray, np.ndarray, np.ndarray],
+        dict[int, list[tuple[str, str]]],
+    ]:
+        """Entities, attributes, attribute values and aliases, read in one transaction.
+
+        Attribute values come back as parallel arrays (entity_id,
+        attribute_id, value) rather than per-entity dicts.
+        """
+        async with self._read() as db:
+            # Deferred transaction: all reads below see the same database state
+            own_transaction = not db.in_transaction
+            if own_transaction:
+                await db.execute("BEGIN")
+            try:
+                cursor = await db.execute(
+                    """SELECT id, name, description, entity_type, language, play_count, guess_success_count
+                       FROM entities ORDER BY id"""
+                )
+                entities = [
+                    Entity(
+                        id=r[0], name=r[1], description=r[2], entity_type=r[3], language=r[4],
+                        play_count=r[5], guess_success_count=r[6],
+                    )
+                    for r in await cursor.fetchall()
+                ]
+                cursor = await db.execute(
+                    "SELECT id, key, question_ru, question_en, category FROM attributes ORDER BY id"
+                )
+                attributes = [
+                    Attribute(id=r[0], key=r[1], question_ru=r[2], question_en=r[3], category=r[4])
+                    for r in await cursor.fetchall()
+                ]
+                cursor = await db.execute("SELECT entity_id, attribute_id, value FROM entity_attributes")
+                # Plain tuples: far cheaper than Row objects for the largest table
+                cursor.row_factory = None
+                # One (n, 3) conversion; ids are exact in float64
+                table = np.array(await cursor.fetchall(), dtype=np.float64).reshape(-1, 3)
+                cells = (
+                    table[:, 0].astype(np.int64),
+                    table[:, 1].astype(np.int64),
+                    table[:, 2].astype(np.float32),
+                )
+                del table
+                cursor = await db.execute(
+                    "SELECT entity_id, alias, language FROM entity_aliases ORDER BY id"
+                )
+                aliases: dict[int, list[tuple[str, str]]] = {}
+                for r in await cursor.fetchall():
+                    aliases.setdefault(r[0], []).append((r[1], r[2]))
+            finally:
+                if own_transaction:
+                    await db.commit()
+            return entities, attributes, cells, aliases
 
     async def increment_play_count(self, entity_id: int) -> None:
-        db = await self._conn()
-        await db.execute(
-            "UPDATE entities SET play_count = play_count + 1 WHERE id = ?",
-            (entity_id,),
-        )
-        await db.commit()
+        async with self.transaction() as db:
+            await db.execute(
+                "UPDATE entities SET play_count = play_count + 1 WHERE id = ?",
+                (entity_id,),
+            )
 
     # ---- Attributes ----
 
     async def add_attribute(
         self, key: str, question_ru: str, question_en: str, category: str,
     ) -> int:
-        db = await self._conn()
-        cursor = await db.execute(
-            "INSERT INTO attributes (key, question_ru, question_en, category) VALUES (?, ?, ?, ?)",
-            (key, question_ru, question_en, category),
-        )
-        await db.commit()
-        return cursor.lastrowid
+        async with self.transaction() as db:
+            cursor = await db.execute(
+                "INSERT INTO attributes (key, question_ru, question_en, category) VALUES (?, ?, ?, ?)",
+                (key, question_ru, question_en, category),
+            )
+            return cursor.lastrowid
 
     async def get_all_attributes(self) -> list[Attribute]:
-        db = await self._conn()
-        cursor = await db.execute("SELECT * FROM attributes")
-        rows = await cursor.fetchall()
-        return [
-            Attribute(id=r["id"], key=r["key"], question_ru=r["question_ru"],
-                      question_en=r["question_en"], category=r["category"])
-            for r in rows
-        ]
+        async with self._read() as db:
+            cursor = await db.execute("SELECT * FROM attributes")
+            rows = await cursor.fetchall()
+            return [
+                Attribute(id=r["id"], key=r["key"], question_ru=r["question_ru"],
+                          question_en=r["question_en"], category=r["category"])
+                for r in rows
+            ]
 
     async def set_entity_attribute(
         self, entity_id: int, attribute_id: int, value: float,
     ) -> None:
-        db = await self._conn()
-        await db.execute(
-            """INSERT INTO entity_attributes (entity_id, attribute_id, value)
-               VALUES (?, ?, ?)
-               ON CONFLICT(entity_id, attribute_id) DO UPDATE SET value = excluded.value""",
-            (entity_id, attribute_id, value),
-        )
-        await db.commit()
+        async with self.transaction() as db:
+            await db.execute(
+                """INSERT INTO entity_attributes (entity_id, attribute_id, value)
+                   VALUES (?, ?, ?)
+                   ON CONFLICT(entity_id, attribute_id) DO UPDATE SET value = excluded.value""",
+                (entity_id, attribute_id, value),
+            )
+
+    async def set_entity_attributes_bulk(self, values: Iterable[tuple[int, int, float]]) -> None:
+        """Upsert (entity_id, attribute_id, value) rows in one transaction."""
+        async with self.transaction() as db:
+            await db.executemany(
+                """INSERT INTO entity_attributes (entity_id, attribute_id, value)
+                   VALUES (?, ?, ?)
+                   ON CONFLICT(entity_id, attribute_id) DO UPDATE SET value = excluded.value""",
+                values,
+            )
 
     async def get_entity_attribute(
         self, entity_id: int, attribute_id: int,
     ) -> float | None:
-        db = await self._conn()
-        cursor = await db.execute(
-            "SELECT value FROM entity_attributes WHERE entity_id = ? AND attribute_id = ?",
-            (entity_id, attribute_id),
-        )
-        row = await cursor.fetchone()
-        return row[0] if row else None
+        async with self._read() as db:
+            cursor = await db.execute(
+                "SELECT value FROM entity_attributes WHERE entity_id = ? AND attribute_id = ?",
+                (entity_id, attribute_id),
+            )
+            row = await cursor.fetchone()
+            return row[0] if row else None
 
     # ---- Aliases ----
 
     async def add_alias(self, entity_id: int, alias: str, language: str) -> None:
-        db = await self._conn()
-        await db.execute(
-            "INSERT INTO entity_aliases (entity_id, alias, language) VALUES (?, ?, ?)",
-            (entity_id, alias, language),
-        )
-        await db.commit()
+        async with self.transaction() as db:
+            await db.execute(
+                "INSERT INTO entity_aliases (entity_id, alias, language) VALUES (?, ?, ?)",
+                (entity_id, alias, language),
+            )
+
+    async def add_aliases_bulk(self, aliases: Iterable[tuple[int, str, str]]) -> None:
+        """Insert (entity_id, alias, language) rows in one transaction."""
+        async with self.transaction() as db:
+            await db.executemany(
+                "INSERT INTO entity_aliases (entity_id, alias, language) VALUES (?, ?, ?)",
+                aliases,
+            )
 
     async def get_aliases(self, entity_id: int) -> list[tuple[str, str]]:
-        db = await self._conn()
-        cursor = await db.execute(
-            "SELECT alias, language FROM entity_aliases WHERE entity_id = ?",
-            (entity_id,),
-        )
-        rows = await cursor.fetchall()
-        return [(r[0], r[1]) for r in rows]
+        async with self._read() as db:
+            cursor = await db.execute(
+                "SELECT alias, language FROM entity_aliases WHERE entity_id = ? ORDER BY id",
+                (entity_id,),
+            )
+            rows = await cursor.fetchall()
+            return [(r[0], r[1]) for r in rows]
+
+    async def get_all_aliases(self) -> dict[int, list[tuple[str, str]]]:
+        """Batch-load all aliases in one query: {entity_id: [(alias, language), ...]}.
+
+        Each entity's aliases keep the order get_aliases() returns them in.
+        """
+        async with self._read() as db:
+            cursor = await db.execute(
+                "SELECT entity_id, alias, language FROM entity_aliases ORDER BY id"
+            )
+            rows = await cursor.fetchall()
+            result: dict[int, list[tuple[str, str]]] = {}
+            for r in rows:
+                result.setdefault(r[0], []).append((r[1], r[2]))
+            return result
 
     async def get_localized_name(self, entity_id: int, language: str = "en") -> str:
         """Get entity name in the specified language.
@@ -272,35 +688,34 @@ class Repository:
     # ---- Embeddings ----
 
     async def set_embedding(self, entity_id: int, embedding: np.ndarray) -> None:
-        db = await self._conn()
-        blob = embedding.astype(np.float32).tobytes()
-        await db.execute(
-            """INSERT INTO entity_embeddings (entity_id, embedding)
-               VALUES (?, ?)
-               ON CONFLICT(entity_id) DO UPDATE SET embedding = excluded.embedding""",
-            (entity_id, blob),
-        )
-        await db.commit()
+        async with self.transaction() as db:
+            blob = embedding.astype(np.float32).tobytes()
+            await db.execute(
+                """INSERT INTO entity_embeddings (entity_id, embedding)
+                   VALUES (?, ?)
+                   ON CONFLICT(entity_id) DO UPDATE SET embedding = excluded.embedding""",
+                (entity_id, blob),
+            )
 
     async def get_embedding(self, entity_id: int) -> np.ndarray | None:
-        db = await self._conn()
-        cursor = await db.execute(
-            "SELECT embedding FROM entity_embeddings WHERE entity_id = ?",
-            (entity_id,),
-        )
-        row = await cursor.fetchone()
-        if row is None:
-            return None
-        return np.frombuffer(row[0], dtype=np.float32).copy()
+        async with self._read() as db:
+            cursor = await db.execute(
+                "SELECT embedding FROM entity_embeddings WHERE entity_id = ?",
+                (entity_id,),
+            )
+            row = await cursor.fetchone()
+            if row is None:
+                return None
+            return np.frombuffer(row[0], dtype=np.float32).copy()
 
     async def get_all_embeddings(self) -> dict[int, np.ndarray]:
-        db = await self._conn()
-        cursor = await db.execute("SELECT entity_id, embedding FROM entity_embeddings")
-        rows = await cursor.fetchall()
-        return {
-            r[0]: np.frombuffer(r[1], dtype=np.float32).copy()
-            for r in rows
-        }
+        async with self._read() as db:
+            cursor = await db.execute("SELECT entity_id, embedding FROM entity_embeddings")
+            rows = await cursor.fetchall()
+            return {
+                r[0]: np.frombuffer(r[1], dtype=np.float32).copy()
+                for r in rows
+            }
 
     # ---- User Feedback (Learning) ----
 
@@ -313,42 +728,74 @@ class Repository:
         language: str = "en",
     ) -> None:
         """Track user answer for learning purposes."""
-        db = await self._conn()
-        await db.execute(
-            """INSERT INTO user_feedback
-               (entity_id, attribute_id, user_answer, expected_value, session_language)
-               VALUES (?, ?, ?, ?, ?)""",
-            (entity_id, attribute_id, user_answer, expected_value, language),
-        )
-        await db.commit()
+        await self.track_feedback_bulk([(entity_id, attribute_id, user_answer, expected_value, language)])
+
+    async def track_feedback_bulk(
+        self, records: Iterable[tuple[int, int, str, float, str]],
+    ) -> None:
+        """Track (entity_id, attribute_id, user_answer, expected_value, language) rows in one transaction.
+
+        Adds to the per-pair counts (one upsert per pair) and appends to the
+        raw log, rotating out its oldest rows.
+        """
+        records = list(records)
+        counts: dict[tuple[int, int], list[int]] = {}
+        for entity_id, attribute_id, user_answer, *_ in records:
+            column = _FEEDBACK_COLUMN_OF.get(user_answer.lower())
+            if column is not None:
+                counts.setdefault((entity_id, attribute_id), [0] * len(_FEEDBACK_ANSWERS))[column] += 1
+        async with self.transaction() as db:
+            await db.executemany(
+                """INSERT INTO feedback_counts (entity_id, attribute_id, yes, prob_yes, dk, prob_no, no)
+                   VALUES (?, ?, ?, ?, ?, ?, ?)
+                   ON CONFLICT(entity_id, attribute_id) DO UPDATE SET
+                       yes = yes + excluded.yes, prob_yes = prob_yes + excluded.prob_yes,
+                       dk = dk + excluded.dk, prob_no = prob_no + excluded.prob_no,
+                       no = no + excluded.no""",
+                ((*pair, *n) for pair, n in counts.items()),
+            )
+            if self.feedback_log_rows <= 0:
+                return
+            await db.executemany(
+                """INSERT INTO user_feedback
+                   (entity_id, attribute_id, user_answer, expected_value, session_language)
+                   VALUES (?, ?, ?, ?, ?)""",
+                records,
+            )
+            # ids only grow (AUTOINCREMENT): a rowid range delete of the oldest
+            await db.execute(
+                "DELETE FROM user_feedback WHERE id <= (SELECT MAX(id) FROM user_feedback) - ?",
+                (self.feedback_log_rows,),
+            )
 
     async def get_feedback_stats(
         self, entity_id: int, attribute_id: int
     ) -> dict[str, int]:
         """Get feedback statistics for an entity-attribute pair.
 
-        Returns count of each answer type (YES, NO, PROBABLY_YES, etc.)
+        Returns count of each answer type given at least once, keyed by
+        Answer value ("yes", "probably_no", ...).
         """
-        db = await self._conn()
-        cursor = await db.execute(
-            """SELECT user_answer, COUNT(*) as count
-               FROM user_feedback
-               WHERE entity_id = ? AND attribute_id = ?
-               GROUP BY user_answer""",
-            (entity_id, attribute_id),
-        )
-        rows = await cursor.fetchall()
-        return {r[0]: r[1] for r in rows}
+        async with self._read() as db:
+            cursor = await db.execute(
+                """SELECT yes, prob_yes, dk, prob_no, no FROM feedback_counts
+                   WHERE entity_id = ? AND attribute_id = ?""",
+                (entity_id, attribute_id),
+            )
+            row = await cursor.fetchone()
+            if row is None:
+                return {}
+            return {answer.value: n for answer, n in zip(_FEEDBACK_ANSWERS, row) if n}
 
     async def get_entity_feedback_count(self, entity_id: int) -> int:
         """Get total number of feedback entries for an entity."""
-        db = await self._conn()
-        cursor = await db.execute(
-            "SELECT COUNT(*) FROM user_feedback WHERE entity_id = ?",
-            (entity_id,),
-        )
-        row = await cursor.fetchone()
-        return row[0] if row else 0
+        async with self._read() as db:
+            cursor = await db.execute(
+                f"SELECT TOTAL({_FEEDBACK_TOTAL}) FROM feedback_counts WHERE entity_id = ?",
+                (entity_id,),
+            )
+            row = await cursor.fetchone()
+            return int(row[0]) if row else 0
 
     async def calculate_learned_value(
         self, entity_id: int, attribute_id: int, current_value: float
@@ -359,68 +806,32 @@ class Repository:
         Requires at least 3 feedback samples to update.
         """
         stats = await self.get_feedback_stats(entity_id, attribute_id)
-        if not stats:
-            return None
-
-        total = sum(stats.values())
-        if total < 3:  # Need at least 3 samples
-            return None
-
-        # Convert answers to values
-        answer_values = {
-            "YES": 1.0,
-            "PROBABLY_YES": 0.75,
-            "DONT_KNOW": 0.5,
-            "PROBABLY_NO": 0.25,
-            "NO": 0.0,
-        }
-
-        # Calculate weighted average from feedback
-        feedback_sum = 0.0
-        for answer, count in stats.items():
-            feedback_sum += answer_values.get(answer, 0.5) * count
-
-        feedback_avg = feedback_sum / total
-
-        # Blend current value with feedback (70% feedback, 30% current)
-        # This prevents sudden jumps and maintains some stability
-        new_value = 0.7 * feedback_avg + 0.3 * current_value
-
-        return round(new_value, 2)
+        return _learned_value([stats.get(a.value, 0) for a in _FEEDBACK_ANSWERS], current_value)
 
     async def apply_learning(self, min_feedback_count: int = 3) -> int:
         """Apply learning from user feedback to entity attributes.
 
-        Updates entity attributes based on accumulated user feedback.
+        One scan of feedback_counts joined to the current values; the
+        changed values are written in one transaction.
         Returns number of attributes updated.
         """
-        db = await self._conn()
-
-        # Get all entity-attribute pairs with enough feedback
-        cursor = await db.execute(
-            """SELECT entity_id, attribute_id, COUNT(*) as feedback_count
-               FROM user_feedback
-               GROUP BY entity_id, attribute_id
-               HAVING feedback_count >= ?""",
-            (min_feedback_count,),
-        )
-        rows = await cursor.fetchall()
-
-        updated_count = 0
-        for entity_id, attribute_id, _ in rows:
-            # Get current value
-            current_value = await self.get_entity_attribute(entity_id, attribute_id)
-            if current_value is None:
-                continue
-
-            # Calculate new value from feedback
-            new_value = await self.calculate_learned_value(
-                entity_id, attribute_id, current_value
+        async with self._read() as db:
+            cursor = await db.execute(
+                f"""SELECT fc.entity_id, fc.attribute_id,
+                          fc.yes, fc.prob_yes, fc.dk, fc.prob_no, fc.no, ea.value
+                   FROM feedback_counts fc
+                   JOIN entity_attributes ea USING (entity_id, attribute_id)
+                   WHERE {_FEEDBACK_TOTAL} >= ?""",
+                (min_feedback_count,),
             )
+            rows = await cursor.fetchall()
 
+        updates = []
+        for entity_id, attribute_id, *counts, current_value in rows:
+            new_value = _learned_value(counts, current_value)
+            # Update if difference is significant (>5%)
             if new_value is not None and abs(new_value - current_value) > 0.05:
-                # Update if difference is significant (>5%)
-                await self.set_entity_attribute(entity_id, attribute_id, new_value)
-                updated_count += 1
-
-        return updated_count
+                updates.append((entity_id, attribute_id, new_value))
+        if updates:
+            await self.set_entity_attributes_bulk(updates)
+        return len(updates)
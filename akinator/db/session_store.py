@@ -0,0 +1,576 @@
+"""Session Store — game sessions keyed by Telegram user id, with pluggable backends."""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import sqlite3
+import struct
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Callable, MutableMapping
+from datetime import datetime
+from typing import Iterator, Protocol
+from urllib.parse import quote
+
+import numpy as np
+
+from akinator.db.models import Answer, GameMode, GameSession, QAPair
+from akinator.db.repository import BOT_PROFILE
+
+logger = logging.getLogger(__name__)
+
+
+# ---------------------------------------------------------------------------
+# Binary session encoding
+# ---------------------------------------------------------------------------
+
+_MAGIC = b"AKS1"
+_MODES = list(GameMode)
+_ANSWERS = list(Answer)
+
+# Flag bits
+_LOG_WEIGHTS = 1  # weights section holds unnormalized log-weights
+_WIDE_IDS = 2  # candidate ids need int64
+
+# magic, user_id, mode, flags, guess_count, question_count, created_at
+_HEADER = struct.Struct("<4sqBBHHd")
+_COUNT = struct.Struct("<I")
+_STR_LEN = struct.Struct("<H")
+_NONE_STR = 0xFFFF
+
+
+def _pack_str(out: bytearray, value: str | None) -> None:
+    if value is None:
+        out += _STR_LEN.pack(_NONE_STR)
+        return
+    data = value.encode("utf-8")[:_NONE_STR - 1]
+    out += _STR_LEN.pack(len(data))
+    out += data
+
+
+def _unpack_str(data: memoryview, pos: int) -> tuple[str | None, int]:
+    (n,) = _STR_LEN.unpack_from(data, pos)
+    pos += _STR_LEN.size
+    if n == _NONE_STR:
+        return None, pos
+    return bytes(data[pos:pos + n]).decode("utf-8"), pos + n
+
+
+def _pack_array(out: bytearray, values: np.ndarray, dtype: type) -> None:
+    out += _COUNT.pack(len(values))
+    out += np.ascontiguousarray(values, dtype=dtype).tobytes()
+
+
+def _unpack_array(data: memoryview, pos: int, dtype: type) -> tuple[np.ndarray, int]:
+    (n,) = _COUNT.unpack_from(data, pos)
+    pos += _COUNT.size
+    size = n * np.dtype(dtype).itemsize
+    # Copy so the session owns a writable array
+    return np.frombuffer(data[pos:pos + size], dtype=dtype).copy(), pos + size
+
+
+def encode_session(session: GameSession) -> bytes:
+    """Pack a session into a compact binary record.
+
+    Candidate ids and weights are stored as raw little-endian arrays, the
+    history as packed attribute ids and answer indices followed by its key /
+    question strings. Engine caches (rows, stats, masks) are not stored;
+    they are rebuilt on first use.
+    """
+    log_weights = session.log_weights
+    ids = session.candidate_array
+    wide = bool(len(ids)) and (ids.max() > np.iinfo(np.int32).max or ids.min() < np.iinfo(np.int32).min)
+    flags = (_LOG_WEIGHTS if log_weights is not None else 0) | (_WIDE_IDS if wide else 0)
+
+    out = bytearray(_HEADER.pack(
+        _MAGIC, session.user_id, _MODES.index(session.mode), flags,
+        session.guess_count, session.question_count, session.created_at.timestamp(),
+    ))
+    for value in (session.session_id, session.language, session.prior, session.hint_text):
+        _pack_str(out, value)
+
+    _pack_array(out, ids, np.int64 if wide else np.int32)
+    _pack_array(out, log_weights if log_weights is not None else session.weight_array, np.float64)
+    _pack_array(out, np.array(session.asked_attributes, dtype=np.int64), np.int32)
+
+    history = session.history
+    _pack_array(out, np.array([-1 if qa.attribute_id is None else qa.attribute_id for qa in history]), np.int32)
+    _pack_array(out, np.array([_ANSWERS.index(qa.answer) for qa in history]), np.uint8)
+    for qa in history:
+        _pack_str(out, qa.attribute_key)
+        _pack_str(out, qa.question_text)
+    return bytes(out)
+
+
+def decode_session(data: bytes) -> GameSession:
+    """Inverse of encode_session(); raises ValueError on a foreign record."""
+    view = memoryview(data)
+    magic, user_id, mode, flags, guess_count, question_count, created_at = _HEADER.unpack_from(view, 0)
+    if magic != _MAGIC:
+        raise ValueError("Not an encoded session")
+    pos = _HEADER.size
+    session_id, pos = _unpack_str(view, pos)
+    language, pos = _unpack_str(view, pos)
+    prior, pos = _unpack_str(view, pos)
+    hint_text, pos = _unpack_str(view, pos)
+
+    ids, pos = _unpack_array(view, pos, np.int64 if flags & _WIDE_IDS else np.int32)
+    weights, pos = _unpack_array(view, pos, np.float64)
+    asked, pos = _unpack_array(view, pos, np.int32)
+    attr_ids, pos = _unpack_array(view, pos, np.int32)
+    answers, pos = _unpack_array(view, pos, np.uint8)
+    history = []
+    for attr_id, answer in zip(attr_ids.tolist(), answers.tolist()):
+        key, pos = _unpack_str(view, pos)
+        text, pos = _unpack_str(view, pos)
+        history.append(QAPair(
+            attribute_id=None if attr_id < 0 else attr_id,
+            attribute_key=key, question_text=text, answer=_ANSWERS[answer],
+        ))
+
+    session = GameSession(
+        session_id=session_id, user_id=user_id, language=language, mode=_MODES[mode],
+        candidate_ids=ids, asked_attributes=asked.tolist(), history=history,
+        hint_text=hint_text, guess_count=guess_count, question_count=question_count,
+        created_at=datetime.fromtimestamp(created_at),
+    )
+    session.prior = prior
+    if flags & _LOG_WEIGHTS:
+        session.log_weights = weights
+    else:
+        session.weight_array = weights
+    return session
+
+
+# ---------------------------------------------------------------------------
+# Compaction and accounting
+# ---------------------------------------------------------------------------
+
+# Rough size of one history entry (QAPair plus its strings)
+_QA_NBYTES = 256
+
+
+def session_nbytes(session: GameSession) -> int:
+    """Approximate memory held by a session: its NumPy buffers plus history.
+
+    Buffers shared with the path cache are counted too, so this is an
+    upper bound.
+    """
+    arrays = [
+        session.candidate_array, session._weight_array, session._log_weights,
+        session.candidate_rows, session.blocked_columns,
+    ]
+    stats = session.stats
+    if stats is not None:
+        arrays += [stats.yes_mass, stats.yes_log_mass, stats.yes_entropy, stats.no_entropy]
+    return sum(a.nbytes for a in arrays if a is not None) + _QA_NBYTES * len(session.history)
+
+
+def compact_session(session: GameSession) -> bool:
+    """Drop the candidate state of a FINISHED session; True if anything was freed.
+
+    What is left (mode, language, counters, history) is all the bot reads
+    once a game is over.
+    """
+    if session.mode != GameMode.FINISHED or len(session.candidate_array) == 0:
+        return False
+    session.candidate_ids = np.empty(0, dtype=np.int64)
+    session.weight_array = np.empty(0)
+    session.blocked_columns = None
+    session.blocked_source = None
+    session.blocked_count = 0
+    return True
+
+
+# ---------------------------------------------------------------------------
+# Stores
+# ---------------------------------------------------------------------------
+
+class SessionStore(MutableMapping[int, GameSession]):
+    """user_id → GameSession mapping used by the bot handlers.
+
+    Handlers mutate the sessions they get in place. Persistent stores
+    therefore treat every session handed out as changed and write it back
+    later (write-behind). A flush may run at any await, so a handler that
+    changes a session after awaiting stores it again (`store[uid] = session`)
+    once its changes are made. start() runs sweep() and flush() every
+    `interval` seconds on the running loop; close() stops that and
+    flushes once more. Code on the event loop reads sessions with aget(),
+    which never blocks the loop on a backend read.
+    """
+
+    def __init__(self, interval: float) -> None:
+        self.interval = interval
+        self.evicted = 0  # sessions dropped from memory (idle or over the cap)
+        self.compacted = 0  # FINISHED sessions reduced to their summary
+        self._sessions: dict[int, GameSession] = {}
+        self._task: asyncio.Task | None = None
+
+    @property
+    def live(self) -> int:
+        """Sessions currently held in memory."""
+        return len(self._sessions)
+
+    @property
+    def nbytes(self) -> int:
+        """Approximate memory held by the sessions in memory (see session_nbytes)."""
+        return sum(session_nbytes(s) for s in self._sessions.values())
+
+    async def aget(self, user_id: int) -> GameSession | None:
+        """get() for the event loop; stores with a backend load misses in a thread."""
+        return self.get(user_id)
+
+    def sweep(self) -> int:
+        """Evict idle sessions and compact finished ones; returns the number evicted."""
+        return 0
+
+    async def flush(self) -> None:
+        """Write pending changes to the backend."""
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                self.sweep()
+                await self.flush()
+            except Exception:
+                logger.exception("Session store maintenance failed")
+
+    async def close(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+
+
+class MemorySessionStore(SessionStore):
+    """Sessions held only in process memory (lost on restart).
+
+    Sessions unused for `ttl` seconds expire, and past `max_sessions` the
+    least recently used one is evicted (None disables either limit).
+    Sweeps also compact FINISHED sessions, so memory tracks active games
+    rather than every user ever seen.
+    """
+
+    def __init__(
+        self,
+        ttl: float | None = None,
+        max_sessions: int | None = None,
+        sweep_interval: float = 60.0,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        super().__init__(sweep_interval)
+        self.ttl = ttl
+        self.max_sessions = max_sessions
+        self._clock = clock
+        # Least recently used first
+        self._sessions: OrderedDict[int, GameSession] = OrderedDict()
+        self._last_used: dict[int, float] = {}
+
+    def _expired(self, user_id: int, now: float) -> bool:
+        return self.ttl is not None and now - self._last_used[user_id] > self.ttl
+
+    def _evict(self, user_id: int) -> None:
+        del self._sessions[user_id]
+        del self._last_used[user_id]
+        self.evicted += 1
+
+    def __getitem__(self, user_id: int) -> GameSession:
+        session = self._sessions[user_id]
+        now = self._clock()
+        if self._expired(user_id, now):
+            self._evict(user_id)
+            raise KeyError(user_id)
+        self._sessions.move_to_end(user_id)
+        self._last_used[user_id] = now
+        return session
+
+    def __setitem__(self, user_id: int, session: GameSession) -> None:
+        self._sessions[user_id] = session
+        self._sessions.move_to_end(user_id)
+        self._last_used[user_id] = self._clock()
+        if self.max_sessions is not None:
+            while len(self._sessions) > self.max_sessions:
+                self._evict(next(iter(self._sessions)))
+
+    def __delitem__(self, user_id: int) -> None:
+        del self._sessions[user_id]
+        del self._last_used[user_id]
+
+    def __iter__(self) -> Iterator[int]:
+        return iter(self._sessions)
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def sweep(self) -> int:
+        now = self._clock()
+        evicted = 0
+        # Ordered by last use, so the expired sessions are a prefix
+        while self._sessions:
+            user_id = next(iter(self._sessions))
+            if not self._expired(user_id, now):
+                break
+            self._evict(user_id)
+            evicted += 1
+        self.compacted += sum(compact_session(s) for s in self._sessions.values())
+        return evicted
+
+
+class SessionBackend(Protocol):
+    """Durable storage of encoded sessions; called from a worker thread."""
+
+    def load(self, user_id: int) -> bytes | None: ...
+
+    def save_many(self, records: dict[int, bytes], ttl: float) -> None: ...
+
+    def delete_many(self, user_ids: list[int]) -> None: ...
+
+    def close(self) -> None: ...
+
+
+class PersistentSessionStore(SessionStore):
+    """Write-behind cache in front of a SessionBackend.
+
+    Sessions live in memory while in use. Sessions that were set or handed
+    out are written back in one batch every `flush_interval` seconds, so a
+    burst of button presses costs one backend write. A session missing
+    from memory (e.g. after a restart) is loaded from the backend, in a
+    thread by aget() and inline (blocking) by the mapping methods; the
+    backend drops sessions idle for longer than `ttl` seconds, and memory
+    drops written-back sessions idle for longer than `memory_ttl`.
+    """
+
+    def __init__(
+        self,
+        backend: SessionBackend,
+        ttl: float = 86400.0,
+        flush_interval: float = 1.0,
+        memory_ttl: float = 600.0,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        super().__init__(flush_interval)
+        self.backend = backend
+        self.ttl = ttl
+        self.memory_ttl = memory_ttl
+        self.writes = 0  # backend batches written
+        self._clock = clock
+        self._last_used: dict[int, float] = {}
+        self._dirty: set[int] = set()
+        self._deleted: set[int] = set()
+
+    def _load(self, user_id: int) -> GameSession | None:
+        session = self._sessions.get(user_id)
+        if session is None and user_id not in self._deleted:
+            data = self.backend.load(user_id)
+            if data is not None:
+                session = self._adopt(user_id, data)
+        if session is not None:
+            self._last_used[user_id] = self._clock()
+        return session
+
+    def _adopt(self, user_id: int, data: bytes) -> GameSession | None:
+        """Decode a backend record into memory."""
+        try:
+            session = decode_session(data)
+        except (ValueError, struct.error, IndexError):
+            logger.warning("Dropping undecodable session for user %d", user_id)
+            return None
+        self._sessions[user_id] = session
+        return session
+
+    async def aget(self, user_id: int) -> GameSession | None:
+        if user_id not in self._sessions and user_id not in self._deleted:
+            data = await asyncio.to_thread(self.backend.load, user_id)
+            # Set or deleted while loading: memory wins
+            if user_id not in self._sessions and user_id not in self._deleted:
+                if data is None or self._adopt(user_id, data) is None:
+                    return None
+        return self.get(user_id)
+
+    def __getitem__(self, user_id: int) -> GameSession:
+        session = self._load(user_id)
+        if session is None:
+            raise KeyError(user_id)
+        # The caller may change it in place
+        self._dirty.add(user_id)
+        return session
+
+    def __setitem__(self, user_id: int, session: GameSession) -> None:
+        self._sessions[user_id] = session
+        self._last_used[user_id] = self._clock()
+        self._dirty.add(user_id)
+        self._deleted.discard(user_id)
+
+    def __delitem__(self, user_id: int) -> None:
+        if self._load(user_id) is None:
+            raise KeyError(user_id)
+        del self._sessions[user_id]
+        del self._last_used[user_id]
+        self._dirty.discard(user_id)
+        self._deleted.add(user_id)
+
+    def __contains__(self, user_id: object) -> bool:
+        return isinstance(user_id, int) and self._load(user_id) is not None
+
+    def __iter__(self) -> Iterator[int]:
+        """Sessions currently held in memory."""
+        return iter(self._sessions)
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def sweep(self) -> int:
+        now = self._clock()
+        idle = [
+            uid for uid, used in self._last_used.items()
+            if now - used > self.memory_ttl and uid not in self._dirty
+        ]
+        for uid in idle:
+            # Already written back; reloaded from the backend if needed again
+            del self._sessions[uid]
+            del self._last_used[uid]
+        self.evicted += len(idle)
+        for uid, session in self._sessions.items():
+            if compact_session(session):
+                self.compacted += 1
+                self._dirty.add(uid)
+        return len(idle)
+
+    async def flush(self) -> None:
+        # Encode on the loop so the snapshot is consistent, write in a thread
+        records = {
+            uid: encode_session(self._sessions[uid]) for uid in self._dirty if uid in self._sessions
+        }
+        deleted = list(self._deleted)
+        self._dirty.clear()
+        self._deleted.clear()
+        if records or deleted:
+            await asyncio.to_thread(self._write, records, deleted)
+
+    def _write(self, records: dict[int, bytes], deleted: list[int]) -> None:
+        if records:
+            self.backend.save_many(records, self.ttl)
+        if deleted:
+            self.backend.delete_many(deleted)
+        self.writes += 1
+
+    async def close(self) -> None:
+        await super().close()
+        self.backend.close()
+
+
+# ---------------------------------------------------------------------------
+# Backends
+# ---------------------------------------------------------------------------
+
+_SESSION_SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    user_id INTEGER PRIMARY KEY,
+    data BLOB NOT NULL,
+    expires_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_sessions_expires ON sessions(expires_at);
+"""
+
+
+class SQLiteSessionBackend:
+    """Sessions in a SQLite table, in WAL mode.
+
+    Loads go through their own read-only connection, so they never wait
+    for the flusher's write transaction (a private ":memory:" database
+    can't be shared, and uses one connection for both).
+    """
+
+    def __init__(self, path: str) -> None:
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        for pragma in BOT_PROFILE.pragmas():
+            self._conn.execute(pragma)
+        self._conn.executescript(_SESSION_SCHEMA)
+        self._lock = threading.Lock()
+        if path == ":memory:":
+            self._reader, self._read_lock = self._conn, self._lock
+        else:
+            self._reader = sqlite3.connect(
+                f"file:{quote(path)}?mode=ro", uri=True, check_same_thread=False, isolation_level=None,
+            )
+            for pragma in BOT_PROFILE.pragmas(read_only=True):
+                self._reader.execute(pragma)
+            self._read_lock = threading.Lock()
+
+    def load(self, user_id: int) -> bytes | None:
+        with self._read_lock:
+            row = self._reader.execute(
+                "SELECT data FROM sessions WHERE user_id = ? AND expires_at > ?",
+                (user_id, time.time()),
+            ).fetchone()
+        return row[0] if row else None
+
+    def save_many(self, records: dict[int, bytes], ttl: float) -> None:
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                self._conn.executemany(
+                    """INSERT INTO sessions (user_id, data, expires_at) VALUES (?, ?, ?)
+                       ON CONFLICT(user_id) DO UPDATE SET
+                           data = excluded.data, expires_at = excluded.expires_at""",
+                    [(uid, data, now + ttl) for uid, data in records.items()],
+                )
+                self._conn.execute("DELETE FROM sessions WHERE expires_at <= ?", (now,))
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def delete_many(self, user_ids: list[int]) -> None:
+        with self._lock:
+            self._conn.executemany("DELETE FROM sessions WHERE user_id = ?", [(u,) for u in user_ids])
+
+    def close(self) -> None:
+        with self._read_lock:
+            self._reader.close()
+        with self._lock:
+            self._conn.close()
+
+
+class RedisSessionBackend:
+    """Sessions as Redis strings with a native expiry.
+
+    `client` is any redis-py compatible client (redis.Redis or a stand-in
+    providing get / delete / pipeline().set(..., ex=) / execute()).
+    """
+
+    def __init__(self, client, prefix: str = "akinator:session:") -> None:
+        self.client = client
+        self.prefix = prefix
+
+    def _key(self, user_id: int) -> str:
+        return f"{self.prefix}{user_id}"
+
+    def load(self, user_id: int) -> bytes | None:
+        return self.client.get(self._key(user_id))
+
+    def save_many(self, records: dict[int, bytes], ttl: float) -> None:
+        pipe = self.client.pipeline()
+        for uid, data in records.items():
+            pipe.set(self._key(uid), data, ex=max(int(ttl), 1))
+        pipe.execute()
+
+    def delete_many(self, user_ids: list[int]) -> None:
+        self.client.delete(*(self._key(u) for u in user_ids))
+
+    def close(self) -> None:
+        close = getattr(self.client, "close", None)
+        if close is not None:
+            close()
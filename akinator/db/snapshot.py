@@ -0,0 +1,327 @@
+"""Catalogue Snapshot — the whole game catalogue, loaded in one read transaction
+or memory-mapped from a binary snapshot file."""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import mmap
+import os
+import struct
+import time
+import zlib
+from dataclasses import dataclass, field
+from typing import Mapping
+
+import numpy as np
+
+from akinator.db.models import Attribute, Entity
+from akinator.db.repository import Repository
+from akinator.engine.knowledge_base import KnowledgeBase
+
+try:
+    import resource
+except ImportError:  # not available on Windows
+    resource = None
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class CatalogueSnapshot:
+    """Everything the bot keeps in memory about the catalogue."""
+
+    entities: list[Entity]
+    attributes: list[Attribute]
+    knowledge_base: KnowledgeBase
+    aliases: dict[int, list[tuple[str, str]]] = field(default_factory=dict)
+    load_seconds: float = 0.0
+    # Bytes held by the knowledge base arrays, and the process's peak RSS after loading
+    kb_nbytes: int = 0
+    peak_rss_bytes: int | None = None
+    # Entity embeddings (only read from snapshot files), row i belongs to embedding_ids[i]
+    embedding_ids: np.ndarray | None = None
+    embeddings: np.ndarray | None = None
+    source: str = "sqlite"  # or "file"
+
+    def report(self) -> str:
+        rss = f", peak RSS {self.peak_rss_bytes / 2**20:.0f} MB" if self.peak_rss_bytes else ""
+        return (
+            f"{len(self.entities)} entities, {len(self.attributes)} attributes "
+            f"from {self.source} in {self.load_seconds:.2f}s; "
+            f"knowledge base {self.kb_nbytes / 2**20:.1f} MB{rss}"
+        )
+
+
+def _peak_rss_bytes() -> int | None:
+    if resource is None:
+        return None
+    # ru_maxrss is in kilobytes on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def _lookup(sorted_keys: np.ndarray, order: np.ndarray, keys: np.ndarray) -> np.ndarray:
+    """Index of each key in the unsorted array behind (sorted_keys, order); -1 if absent."""
+    if len(sorted_keys) == 0:
+        return np.full(len(keys), -1, dtype=np.int64)
+    pos = np.minimum(np.searchsorted(sorted_keys, keys), len(sorted_keys) - 1)
+    return np.where(sorted_keys[pos] == keys, order[pos], -1)
+
+
+async def load_snapshot(repo: Repository) -> CatalogueSnapshot:
+    """Load the catalogue (one read transaction) and build its knowledge base.
+
+    The matrix is filled straight from the value arrays with vectorized
+    id → index lookups, without building per-entity dicts first. Values
+    of unknown entities or attributes are ignored, as in KnowledgeBase.build().
+    """
+    start = time.perf_counter()
+    entities, attributes, (cell_entities, cell_attributes, cell_values), aliases = (
+        await repo.get_catalogue()
+    )
+
+    entity_ids = np.fromiter((e.id for e in entities), dtype=np.int64, count=len(entities))
+    attribute_ids = np.fromiter((a.id for a in attributes), dtype=np.int64, count=len(attributes))
+    entity_order = np.argsort(entity_ids, kind="stable")
+    attribute_order = np.argsort(attribute_ids, kind="stable")
+    rows = _lookup(entity_ids[entity_order], entity_order, cell_entities)
+    cols = _lookup(attribute_ids[attribute_order], attribute_order, cell_attributes)
+    keep = (rows >= 0) & (cols >= 0)
+    knowledge_base = KnowledgeBase.from_cells(
+        entity_ids, (a.key for a in attributes), rows[keep], cols[keep], cell_values[keep],
+    )
+
+    return CatalogueSnapshot(
+        entities=entities,
+        attributes=attributes,
+        knowledge_base=knowledge_base,
+        aliases=aliases,
+        load_seconds=time.perf_counter() - start,
+        kb_nbytes=knowledge_base.nbytes,
+        peak_rss_bytes=_peak_rss_bytes(),
+    )
+
+
+# ---------------------------------------------------------------------------
+# Snapshot files
+# ---------------------------------------------------------------------------
+#
+# Layout: magic, header length and header CRC32 (_PREFIX), a JSON header,
+# then the arrays, each starting on an _ALIGN boundary so it can be mapped
+# in place. The header lists every array's offset, dtype, shape and CRC32,
+# plus the attributes and the catalogue version (Repository.get_catalogue_version)
+# the file was built from. Strings (entity fields and aliases) share one
+# UTF-8 blob indexed by an offsets array.
+
+SNAPSHOT_SCHEMA_VERSION = 1
+_MAGIC = b"AKSNAP\x00\x01"
+_PREFIX = struct.Struct("<8sII")
+_ALIGN = 64
+# String slots per entity in the string table: name, description, entity_type, language
+_ENTITY_STRINGS = 4
+
+
+class SnapshotError(ValueError):
+    """A snapshot file that is unreadable, corrupt or out of date."""
+
+
+def default_snapshot_path(db_path: str) -> str:
+    """Snapshot file kept next to the database: data/akinator.db → data/akinator.snapshot."""
+    return os.path.splitext(db_path)[0] + ".snapshot"
+
+
+def _string_table(strings: list[str]) -> tuple[np.ndarray, np.ndarray]:
+    encoded = [x.encode("utf-8") for x in strings]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(b) for b in encoded], out=offsets[1:])
+    return np.frombuffer(b"".join(encoded), dtype=np.uint8), offsets
+
+
+def write_snapshot_file(
+    path: str,
+    snapshot: CatalogueSnapshot,
+    catalogue_version: str,
+    embeddings: Mapping[int, np.ndarray] | None = None,
+) -> int:
+    """Write `snapshot` to `path` (atomically); returns the file size.
+
+    `catalogue_version` should be read before the snapshot was loaded, so
+    a change racing with the load makes the file stale, never wrong.
+    """
+    kb = snapshot.knowledge_base
+    strings = [
+        text for e in snapshot.entities
+        for text in (e.name, e.description, e.entity_type, e.language)
+    ]
+    alias_ids = []
+    for eid, aliases in snapshot.aliases.items():
+        for alias, lang in aliases:
+            alias_ids.append(eid)
+            strings += (alias, lang)
+    blob, offsets = _string_table(strings)
+
+    arrays: dict[str, np.ndarray] = {
+        "entity_ids": kb.entity_ids,
+        "entity_counts": np.array(
+            [(e.play_count, e.guess_success_count) for e in snapshot.entities], dtype=np.int64,
+        ).reshape(-1, 2),
+        "strings": blob,
+        "string_offsets": offsets,
+        "alias_entity_ids": np.array(alias_ids, dtype=np.int64),
+        "values": kb.values,
+        "known": kb.known,
+        **kb.derived_tables(),
+    }
+    if embeddings:
+        ids = sorted(embeddings)
+        arrays["embedding_ids"] = np.array(ids, dtype=np.int64)
+        arrays["embeddings"] = np.stack([np.asarray(embeddings[i], dtype=np.float32) for i in ids])
+
+    layout = {}
+    offset = 0
+    for name, array in arrays.items():
+        array = arrays[name] = np.ascontiguousarray(array)
+        layout[name] = {
+            "offset": offset, "dtype": array.dtype.str, "shape": list(array.shape),
+            "crc32": zlib.crc32(array.data),
+        }
+        offset += -(-array.nbytes // _ALIGN) * _ALIGN
+    header = json.dumps({
+        "schema_version": SNAPSHOT_SCHEMA_VERSION,
+        "catalogue_version": catalogue_version,
+        "attributes": [[a.id, a.key, a.question_ru, a.question_en, a.category] for a in snapshot.attributes],
+        "arrays": layout,
+    }).encode("utf-8")
+    data_start = -(-(_PREFIX.size + len(header)) // _ALIGN) * _ALIGN
+
+    tmp = f"{path}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(_PREFIX.pack(_MAGIC, len(header), zlib.crc32(header)))
+        f.write(header)
+        for name, array in arrays.items():
+            f.seek(data_start + layout[name]["offset"])
+            f.write(array.data)
+        f.truncate(data_start + offset)
+    os.replace(tmp, path)
+    return data_start + offset
+
+
+def read_snapshot_file(
+    path: str, catalogue_version: str | None = None, verify: bool = False,
+) -> CatalogueSnapshot:
+    """Map a snapshot file; raises SnapshotError if it is invalid or not at `catalogue_version`.
+
+    The numeric arrays are views of the mapping, so only the pages the
+    engine touches are read. `verify` also checks every array's CRC32,
+    which reads the whole file.
+    """
+    start = time.perf_counter()
+    with open(path, "rb") as f:
+        try:
+            buf = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError as exc:  # empty file
+            raise SnapshotError(f"{path}: {exc}") from exc
+    try:
+        magic, header_len, header_crc = _PREFIX.unpack_from(buf, 0)
+        header_bytes = buf[_PREFIX.size:_PREFIX.size + header_len]
+    except struct.error as exc:
+        raise SnapshotError(f"{path}: truncated") from exc
+    if magic != _MAGIC or zlib.crc32(header_bytes) != header_crc:
+        raise SnapshotError(f"{path}: not a snapshot file or corrupt header")
+    header = json.loads(header_bytes)
+    if header["schema_version"] != SNAPSHOT_SCHEMA_VERSION:
+        raise SnapshotError(f"{path}: schema version {header['schema_version']}")
+    if catalogue_version is not None and header["catalogue_version"] != catalogue_version:
+        raise SnapshotError(
+            f"{path}: built from catalogue version {header['catalogue_version']}, "
+            f"database is at {catalogue_version}"
+        )
+
+    data_start = -(-(_PREFIX.size + header_len) // _ALIGN) * _ALIGN
+    arrays = {}
+    for name, spec in header["arrays"].items():
+        dtype = np.dtype(spec["dtype"])
+        count = int(np.prod(spec["shape"]))
+        if data_start + spec["offset"] + count * dtype.itemsize > len(buf):
+            raise SnapshotError(f"{path}: truncated array {name}")
+        array = np.frombuffer(buf, dtype, count, data_start + spec["offset"]).reshape(spec["shape"])
+        if verify and zlib.crc32(array.data) != spec["crc32"]:
+            raise SnapshotError(f"{path}: checksum mismatch in {name}")
+        arrays[name] = array
+
+    attributes = [
+        Attribute(id=i, key=key, question_ru=q_ru, question_en=q_en, category=category)
+        for i, key, q_ru, q_en, category in header["attributes"]
+    ]
+    blob = arrays["strings"].tobytes()
+    offsets = arrays["string_offsets"].tolist()
+    strings = [blob[offsets[i]:offsets[i + 1]].decode("utf-8") for i in range(len(offsets) - 1)]
+
+    ids = arrays["entity_ids"]
+    id_list = ids.tolist()
+    entities = [
+        Entity(
+            id=eid, name=strings[k], description=strings[k + 1],
+            entity_type=strings[k + 2], language=strings[k + 3],
+            play_count=plays, guess_success_count=successes,
+        )
+        for eid, k, (plays, successes) in zip(
+            id_list, range(0, len(id_list) * _ENTITY_STRINGS, _ENTITY_STRINGS),
+            arrays["entity_counts"].tolist(),
+        )
+    ]
+    aliases: dict[int, list[tuple[str, str]]] = {}
+    k = len(id_list) * _ENTITY_STRINGS
+    for eid in arrays["alias_entity_ids"].tolist():
+        aliases.setdefault(eid, []).append((strings[k], strings[k + 1]))
+        k += 2
+
+    keys = [a.key for a in attributes]
+    knowledge_base = KnowledgeBase(
+        entity_ids=ids,
+        attribute_keys=tuple(keys),
+        values=arrays["values"],
+        known=arrays["known"],
+        row_of={eid: i for i, eid in enumerate(id_list)},
+        col_of={key: j for j, key in enumerate(keys)},
+        tables={name: arrays[name] for name in KnowledgeBase.TABLE_NAMES},
+    )
+    return CatalogueSnapshot(
+        entities=entities,
+        attributes=attributes,
+        knowledge_base=knowledge_base,
+        aliases=aliases,
+        load_seconds=time.perf_counter() - start,
+        kb_nbytes=knowledge_base.nbytes,
+        peak_rss_bytes=_peak_rss_bytes(),
+        embedding_ids=arrays.get("embedding_ids"),
+        embeddings=arrays.get("embeddings"),
+        source="file",
+    )
+
+
+async def load_catalogue(repo: Repository, path: str | None, verify: bool = False) -> CatalogueSnapshot:
+    """The catalogue from the snapshot file at `path` if it is current, else from SQLite.
+
+    After falling back to SQLite, a fresh snapshot file is written so the
+    next start can map it.
+    """
+    version = await repo.get_catalogue_version()
+    if path is not None:
+        try:
+            return await asyncio.to_thread(read_snapshot_file, path, version, verify)
+        except FileNotFoundError:
+            logger.info("No catalogue snapshot at %s; loading from SQLite", path)
+        except (SnapshotError, OSError) as exc:
+            logger.info("Catalogue snapshot unusable (%s); loading from SQLite", exc)
+
+    snapshot = await load_snapshot(repo)
+    if path is not None and snapshot.entities:
+        embeddings = await repo.get_all_embeddings()
+        try:
+            size = await asyncio.to_thread(write_snapshot_file, path, snapshot, version, embeddings)
+            logger.info("Wrote catalogue snapshot %s (%.1f MB)", path, size / 2**20)
+        except OSError as exc:
+            logger.warning("Could not write catalogue snapshot %s: %s", path, exc)
+    return snapshot
@@ -0,0 +1,326 @@
+"""Knowledge Base — dense entity × attribute matrix shared by the engines."""
+
+from __future__ import annotations
+
+import itertools
+import os
+from dataclasses import InitVar, dataclass, field
+from typing import Iterable, Mapping, Union
+
+import numpy as np
+
+from akinator.config import EPSILON
+from akinator.db.models import Answer, Attribute, Entity, GameSession
+
+# Value assumed for an attribute the entity has no data for
+DEFAULT_VALUE = 0.5
+
+# Every KnowledgeBase instance gets the next version, so caches keyed on it
+# go stale whenever the data is rebuilt or learned into. The random start keeps
+# them apart across restarts too: persisted sessions carry one in their prior id.
+_versions = itertools.count(int.from_bytes(os.urandom(4), "big") << 16)
+
+
+def answer_likelihood(p: np.ndarray | float, answer: Answer) -> np.ndarray:
+    """Likelihood of `answer` given attribute value(s) p, floored at EPSILON."""
+    if answer == Answer.YES:
+        L = p
+    elif answer == Answer.NO:
+        L = 1.0 - p
+    elif answer == Answer.PROBABLY_YES:
+        L = 0.5 * p + 0.25
+    elif answer == Answer.PROBABLY_NO:
+        L = 0.75 - 0.5 * p
+    else:  # DONT_KNOW
+        return np.ones_like(p)
+    return np.maximum(L, EPSILON)
+
+
+def xlog2x(x: np.ndarray) -> np.ndarray:
+    """x * log2(x) with 0 * log2(0) = 0."""
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(x > 0, x * np.log2(x), 0.0)
+
+
+# Answers with a stored likelihood table (DONT_KNOW is a constant view)
+_TABLE_ANSWERS = tuple(a for a in Answer if a != Answer.DONT_KNOW)
+
+
+def _readonly(a: np.ndarray) -> np.ndarray:
+    a.flags.writeable = False
+    return a
+
+
+@dataclass(frozen=True)
+class KnowledgeBase:
+    """Immutable attribute matrix with id → row and key → column maps.
+
+    `values` and `known` carry one extra trailing row filled with
+    DEFAULT_VALUE / False. Candidate ids that are not in the catalogue map to
+    it, so lookups never need a per-candidate branch.
+
+    `likelihoods` holds one precomputed matrix per Answer, shaped like
+    `values`. DONT_KNOW is a broadcast view of ones and uses no memory.
+    `yes_entropy_terms` / `no_entropy_terms` hold p·log2(p) and
+    (1-p)·log2(1-p) in float64 for the session statistics (see stats.py).
+
+    `version` is unique per instance and increases with every build or
+    with_attributes() call.
+    """
+
+    entity_ids: np.ndarray  # (n,) int64
+    attribute_keys: tuple[str, ...]
+    values: np.ndarray  # (n + 1, m) float32
+    known: np.ndarray  # (n + 1, m) bool — False where the DB has no value
+    row_of: Mapping[int, int]
+    col_of: Mapping[str, int]
+    # entity_ids sorted, with the matching rows, for vectorized id → row lookups
+    _sorted_ids: np.ndarray = field(init=False, repr=False, compare=False)
+    _sorted_rows: np.ndarray = field(init=False, repr=False, compare=False)
+    # rows(entity_ids), shared by every session whose candidates are entity_ids itself
+    _all_rows: np.ndarray = field(init=False, repr=False, compare=False)
+    likelihoods: Mapping[Answer, np.ndarray] = field(init=False, repr=False, compare=False)
+    yes_entropy_terms: np.ndarray = field(init=False, repr=False, compare=False)
+    no_entropy_terms: np.ndarray = field(init=False, repr=False, compare=False)
+    version: int = field(init=False, compare=False)
+    # Precomputed tables (see derived_tables()), e.g. mapped from a snapshot file
+    tables: InitVar[Mapping[str, np.ndarray] | None] = None
+
+    def __post_init__(self, tables: Mapping[str, np.ndarray] | None) -> None:
+        object.__setattr__(self, "version", next(_versions))
+        order = np.argsort(self.entity_ids, kind="stable").astype(np.int32)
+        object.__setattr__(self, "_sorted_ids", _readonly(self.entity_ids[order]))
+        object.__setattr__(self, "_sorted_rows", _readonly(order))
+        # Every id is present, so searchsorted finds it (the first row of a duplicate, as in rows())
+        object.__setattr__(
+            self, "_all_rows", _readonly(order[np.searchsorted(self._sorted_ids, self.entity_ids)]),
+        )
+        if tables is not None:
+            likelihoods = {a: _readonly(tables[f"likelihood_{a.value}"]) for a in _TABLE_ANSWERS}
+            yes_terms = _readonly(tables["yes_entropy_terms"])
+            no_terms = _readonly(tables["no_entropy_terms"])
+        else:
+            likelihoods = {
+                a: _readonly(answer_likelihood(self.values, a).astype(np.float32)) for a in _TABLE_ANSWERS
+            }
+            p = self.values.astype(np.float64)
+            yes_terms = _readonly(xlog2x(p))
+            no_terms = _readonly(xlog2x(1.0 - p))
+        likelihoods[Answer.DONT_KNOW] = np.broadcast_to(np.float32(1.0), self.values.shape)
+        object.__setattr__(self, "likelihoods", likelihoods)
+        object.__setattr__(self, "yes_entropy_terms", yes_terms)
+        object.__setattr__(self, "no_entropy_terms", no_terms)
+
+    # Keys of derived_tables()
+    TABLE_NAMES = (
+        *(f"likelihood_{a.value}" for a in _TABLE_ANSWERS), "yes_entropy_terms", "no_entropy_terms",
+    )
+
+    def derived_tables(self) -> dict[str, np.ndarray]:
+        """The tables computed from `values`, by name; pass back as `tables=` to skip recomputing them."""
+        tables = {f"likelihood_{a.value}": self.likelihoods[a] for a in _TABLE_ANSWERS}
+        tables["yes_entropy_terms"] = self.yes_entropy_terms
+        tables["no_entropy_terms"] = self.no_entropy_terms
+        return tables
+
+    @classmethod
+    def build(
+        cls,
+        entity_ids: Iterable[int],
+        attribute_keys: Iterable[str],
+        attribute_values: Mapping[int, Mapping[str, float]],
+    ) -> KnowledgeBase:
+        """Build from {entity_id: {attribute_key: value}}; keys outside attribute_keys are ignored."""
+        ids = np.fromiter(entity_ids, dtype=np.int64)
+        keys = tuple(attribute_keys)
+        col_of = {k: j for j, k in enumerate(keys)}
+        values = np.full((len(ids) + 1, len(keys)), DEFAULT_VALUE, dtype=np.float32)
+        known = np.zeros((len(ids) + 1, len(keys)), dtype=bool)
+        for i, eid in enumerate(ids.tolist()):
+            for key, value in attribute_values.get(eid, {}).items():
+                j = col_of.get(key)
+                if j is not None:
+                    values[i, j] = value
+                    known[i, j] = True
+        return cls(
+            entity_ids=_readonly(ids),
+            attribute_keys=keys,
+            values=_readonly(values),
+            known=_readonly(known),
+            row_of={eid: i for i, eid in enumerate(ids.tolist())},
+            col_of=col_of,
+        )
+
+    @classmethod
+    def from_cells(
+        cls,
+        entity_ids: np.ndarray,
+        attribute_keys: Iterable[str],
+        rows: np.ndarray,
+        cols: np.ndarray,
+        cell_values: np.ndarray,
+    ) -> KnowledgeBase:
+        """Build from known cells given as parallel (row, column, value) arrays.
+
+        Rows index entity_ids and columns index attribute_keys; a vectorized
+        alternative to build() for loaders that already have the indices.
+        """
+        ids = np.array(entity_ids, dtype=np.int64)
+        keys = tuple(attribute_keys)
+        values = np.full((len(ids) + 1, len(keys)), DEFAULT_VALUE, dtype=np.float32)
+        known = np.zeros((len(ids) + 1, len(keys)), dtype=bool)
+        values[rows, cols] = cell_values
+        known[rows, cols] = True
+        return cls(
+            entity_ids=_readonly(ids),
+            attribute_keys=keys,
+            values=_readonly(values),
+            known=_readonly(known),
+            row_of={eid: i for i, eid in enumerate(ids.tolist())},
+            col_of={k: j for j, k in enumerate(keys)},
+        )
+
+    @classmethod
+    def from_entities(
+        cls, entities: list[Entity], attributes: list[Attribute] | None = None,
+    ) -> KnowledgeBase:
+        """Build from entities' attribute dicts.
+
+        Without `attributes`, the columns are every key seen on any entity.
+        """
+        if attributes is not None:
+            keys = [a.key for a in attributes]
+        else:
+            keys = list(dict.fromkeys(k for e in entities for k in e.attributes))
+        return cls.build(
+            (e.id for e in entities), keys, {e.id: e.attributes for e in entities},
+        )
+
+    @property
+    def n_entities(self) -> int:
+        return len(self.entity_ids)
+
+    @property
+    def n_attributes(self) -> int:
+        return len(self.attribute_keys)
+
+    @property
+    def default_row(self) -> int:
+        return self.n_entities
+
+    @property
+    def nbytes(self) -> int:
+        """Memory held by the matrix and its precomputed tables."""
+        arrays = [self.entity_ids, self.values, self.known, self._sorted_ids, self._sorted_rows,
+                  self._all_rows, *self.derived_tables().values()]
+        return sum(a.nbytes for a in arrays)
+
+    def rows(self, entity_ids: Iterable[int] | np.ndarray) -> np.ndarray:
+        """Row index of each id; unknown ids map to the default row."""
+        if entity_ids is self.entity_ids:
+            return self._all_rows
+        ids = np.asarray(entity_ids, dtype=np.int64)
+        if self.n_entities == 0:
+            return np.full(len(ids), self.default_row, dtype=np.int32)
+        pos = np.minimum(np.searchsorted(self._sorted_ids, ids), self.n_entities - 1)
+        found = self._sorted_ids[pos] == ids
+        return np.where(found, self._sorted_rows[pos], self.default_row).astype(np.int32)
+
+    def column(self, rows: np.ndarray, key: str) -> np.ndarray:
+        """Values of one attribute for the given rows (DEFAULT_VALUE if the key is unknown)."""
+        return self._gather_column(self.values, rows, key, DEFAULT_VALUE)
+
+    def columns(self, rows: np.ndarray, keys: list[str]) -> np.ndarray:
+        """Values of several attributes for the given rows, shape (len(rows), len(keys))."""
+        return self._gather(self.values, rows, keys, DEFAULT_VALUE)
+
+    def likelihood(self, rows: np.ndarray, key: str, answer: Answer) -> np.ndarray:
+        """Likelihood of `answer` for one attribute, gathered from the precomputed table."""
+        default = float(answer_likelihood(DEFAULT_VALUE, answer))
+        return self._gather_column(self.likelihoods[answer], rows, key, default)
+
+    def likelihood_columns(self, rows: np.ndarray, keys: list[str], answer: Answer) -> np.ndarray:
+        """Likelihood of `answer` for several attributes, shape (len(rows), len(keys))."""
+        default = float(answer_likelihood(DEFAULT_VALUE, answer))
+        return self._gather(self.likelihoods[answer], rows, keys, default)
+
+    def _gather_column(self, table: np.ndarray, rows: np.ndarray, key: str, default: float) -> np.ndarray:
+        j = self.col_of.get(key)
+        if j is None:
+            return np.full(len(rows), default)
+        return table[rows, j].astype(np.float64)
+
+    def _gather(self, table: np.ndarray, rows: np.ndarray, keys: list[str], default: float) -> np.ndarray:
+        cols = np.fromiter((self.col_of.get(k, -1) for k in keys), dtype=np.int64, count=len(keys))
+        out = table[np.ix_(rows, np.maximum(cols, 0))].astype(np.float64)
+        out[:, cols < 0] = default
+        return out
+
+    def value(self, entity_id: int, key: str) -> float:
+        i = self.row_of.get(entity_id, self.default_row)
+        j = self.col_of.get(key)
+        if j is None:
+            return DEFAULT_VALUE
+        return float(self.values[i, j])
+
+    def entity_attributes(self, entity_id: int) -> dict[str, float]:
+        """Known attribute values of one entity, in the Entity.attributes shape."""
+        i = self.row_of.get(entity_id)
+        if i is None:
+            return {}
+        return {
+            key: float(self.values[i, j])
+            for j, key in enumerate(self.attribute_keys)
+            if self.known[i, j]
+        }
+
+    def with_attributes(self, entity_id: int, attrs: Mapping[str, float]) -> KnowledgeBase:
+        """Return a copy where `entity_id` has `attrs` set, appending a row for a new entity."""
+        ids = self.entity_ids
+        row_of = dict(self.row_of)
+        values = np.array(self.values)
+        known = np.array(self.known)
+        i = row_of.get(entity_id)
+        if i is None:
+            i = len(ids)
+            ids = np.append(ids, np.int64(entity_id))
+            row_of[entity_id] = i
+            # The old default row becomes the new entity's row; re-add a default row below it
+            values = np.vstack([values, np.full((1, values.shape[1]), DEFAULT_VALUE, dtype=np.float32)])
+            known = np.vstack([known, np.zeros((1, known.shape[1]), dtype=bool)])
+        for key, value in attrs.items():
+            j = self.col_of.get(key)
+            if j is not None:
+                values[i, j] = value
+                known[i, j] = True
+        return KnowledgeBase(
+            entity_ids=_readonly(ids),
+            attribute_keys=self.attribute_keys,
+            values=_readonly(values),
+            known=_readonly(known),
+            row_of=row_of,
+            col_of=self.col_of,
+        )
+
+
+EntitySource = Union[KnowledgeBase, list[Entity]]
+
+
+def candidate_rows(kb: KnowledgeBase, session: GameSession) -> np.ndarray:
+    """Rows of the session's candidates in `kb`, cached on the session.
+
+    The cache is keyed on kb.entity_ids, which with_attributes() only
+    replaces when it appends an entity, so learning an update to an existing
+    entity keeps every session's rows valid.
+    """
+    if session.candidate_rows is None or session.rows_source is not kb.entity_ids:
+        session.candidate_rows = kb.rows(session.candidate_array)
+        session.rows_source = kb.entity_ids
+    return session.candidate_rows
+
+
+def as_knowledge_base(source: EntitySource) -> KnowledgeBase:
+    """Engines accept either a prebuilt KnowledgeBase or a plain entity list."""
+    if isinstance(source, KnowledgeBase):
+        return source
+    return KnowledgeBase.from_entities(source)
@@ -0,0 +1,79 @@
+"""Opening Book — precomputed first questions for games from the uniform prior."""
+
+from __future__ import annotations
+
+from collections.abc import Sequence
+from dataclasses import dataclass, field
+from typing import Optional
+
+import numpy as np
+
+from akinator.db.models import Answer, Attribute, GameSession
+from akinator.engine.knowledge_base import KnowledgeBase
+from akinator.engine.session import GameSessionManager, uniform_prior
+
+# An answer path: the (attribute_key, answer) pairs given so far, in order
+AnswerPath = tuple[tuple[str, Answer], ...]
+
+
+@dataclass
+class OpeningBook:
+    """Next question for every answer path of the first `depth` plies.
+
+    Every game that starts from the uniform prior over the same candidates
+    reaches the same state after the same answers, so the first questions
+    can be computed once per knowledge-base version. Lookups against any
+    other version (after learning or a reload) miss until the book is
+    rebuilt.
+    """
+
+    version: int
+    depth: int
+    prior: str
+    moves: dict[AnswerPath, str] = field(default_factory=dict)
+    hits: int = 0
+    misses: int = 0
+
+    @classmethod
+    def build(
+        cls,
+        kb: KnowledgeBase,
+        attributes: list[Attribute],
+        manager: GameSessionManager,
+        candidate_ids: Sequence[int] | np.ndarray,
+        depth: int,
+    ) -> OpeningBook:
+        """Play out every answer path up to `depth` questions with `manager`'s engines."""
+        book = cls(version=kb.version, depth=depth, prior=uniform_prior(kb))
+        by_key = {a.key: a for a in attributes}
+        frontier: list[AnswerPath] = [()]
+        while frontier:
+            path = frontier.pop()
+            session = GameSession(session_id="opening-book", user_id=0)
+            manager.init_candidates(session, candidate_ids, prior=book.prior)
+            for key, answer in path:
+                manager.process_answer(session, kb, by_key[key], answer)
+            key = manager.question_policy.select(session, kb, attributes)
+            if key is None:
+                continue
+            book.moves[path] = key
+            if len(path) + 1 < depth:
+                frontier.extend(path + ((key, answer),) for answer in Answer)
+        return book
+
+    def lookup(self, session: GameSession, kb: KnowledgeBase) -> Optional[str]:
+        """Book move for the session's answers so far, or None if it is out of book."""
+        move = None
+        if (
+            kb.version == self.version
+            and session.prior == self.prior
+            and len(session.history) < self.depth
+            # No question left unanswered (its id would be in asked_attributes)
+            and len(session.asked_attributes) == len(session.history)
+        ):
+            move = self.moves.get(tuple((qa.attribute_key, qa.answer) for qa in session.history))
+        if move is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return move
@@ -0,0 +1,157 @@
+"""Path Cache — memoized game states and question choices per answer path."""
+
+from __future__ import annotations
+
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Hashable, Optional
+
+import numpy as np
+
+from akinator.db.models import Answer, GameSession
+from akinator.engine.knowledge_base import KnowledgeBase
+from akinator.engine.stats import SessionStats
+
+# (knowledge-base version, prior id, ((attribute_id, answer value), ...))
+PathKey = tuple[int, str, tuple[tuple[int, str], ...]]
+
+
+@dataclass
+class PathEntry:
+    """What is known about the game state reached by one answer path."""
+
+    # Question chosen at this state, and the attribute ids it was chosen from
+    next_key: Optional[str] = None
+    next_for: Optional[Hashable] = None
+    # Candidate state after the path's last answer (weights or log-weights)
+    candidates: Optional[np.ndarray] = None
+    rows: Optional[np.ndarray] = None
+    weights: Optional[np.ndarray] = None
+    log_weights: Optional[np.ndarray] = None
+    stats: Optional[SessionStats] = None
+
+    @property
+    def nbytes(self) -> int:
+        arrays = [self.candidates, self.rows, self.weights, self.log_weights]
+        if self.stats is not None:
+            arrays += [self.stats.yes_mass, self.stats.yes_log_mass,
+                       self.stats.yes_entropy, self.stats.no_entropy]
+        return sum(a.nbytes for a in arrays if a is not None)
+
+
+class PathCache:
+    """LRU map from answer paths to PathEntry, bounded by entry count and bytes.
+
+    Only sessions started from a named prior (GameSession.prior, which also
+    names the starting catalogue, see uniform_prior) are cached: with the
+    same prior, knowledge base and answers they always reach the same state. Keys carry kb.version, so learning makes old entries
+    unreachable; the cache also drops everything when it first sees a new
+    version. Safe to share between executor threads.
+    """
+
+    def __init__(self, max_entries: int = 4096, max_bytes: int = 64 * 1024 * 1024) -> None:
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.nbytes = 0
+        self._entries: OrderedDict[PathKey, PathEntry] = OrderedDict()
+        self._version: int | None = None
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @staticmethod
+    def key(
+        session: GameSession, kb: KnowledgeBase, answer: tuple[int, Answer] | None = None,
+    ) -> PathKey | None:
+        """Key for the session's answers so far (plus `answer`), or None if it can't be cached."""
+        if session.prior is None or len(session.asked_attributes) != len(session.history):
+            return None
+        path = tuple((qa.attribute_id, qa.answer.value) for qa in session.history)
+        if any(attr_id is None for attr_id, _ in path):
+            return None
+        if answer is not None:
+            path += ((answer[0], answer[1].value),)
+        return kb.version, session.prior, path
+
+    def get(self, key: PathKey) -> PathEntry | None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def get_next_key(self, key: PathKey, attributes_id: Hashable) -> str | None:
+        """Cached question for the path, if it was chosen from the same attributes."""
+        entry = self.get(key)
+        if entry is not None and entry.next_key is not None and entry.next_for == attributes_id:
+            self.hits += 1
+            return entry.next_key
+        self.misses += 1
+        return None
+
+    def get_state(self, key: PathKey) -> PathEntry | None:
+        """Cached entry for the path if it holds a candidate state."""
+        entry = self.get(key)
+        if entry is not None and entry.candidates is not None:
+            self.hits += 1
+            return entry
+        self.misses += 1
+        return None
+
+    def put_next_key(self, key: PathKey, attributes_id: Hashable, next_key: str) -> None:
+        self._update(key, next_key=next_key, next_for=attributes_id)
+
+    def put_state(self, key: PathKey, session: GameSession) -> None:
+        """Remember the session's candidate state; weights are copied, since engines update them in place."""
+        log_weights = session.log_weights
+        self._update(
+            key,
+            candidates=session.candidate_array,
+            rows=session.candidate_rows,
+            weights=None if log_weights is not None else session.weight_array.copy(),
+            log_weights=None if log_weights is None else log_weights.copy(),
+            stats=session.stats,
+        )
+
+    def restore(self, entry: PathEntry, session: GameSession, kb: KnowledgeBase) -> None:
+        """Put a cached candidate state on the session (weights copied, the rest shared)."""
+        session.candidate_ids = entry.candidates
+        if entry.rows is not None:
+            session.candidate_rows = entry.rows
+            session.rows_source = kb.entity_ids
+        if entry.log_weights is not None:
+            session.log_weights = entry.log_weights.copy()
+        else:
+            session.weight_array = entry.weights.copy()
+        # Set last: assigning weights clears the stats
+        session.stats = entry.stats
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.nbytes = 0
+
+    def _update(self, key: PathKey, **fields) -> None:
+        with self._lock:
+            if key[0] != self._version:
+                self._entries.clear()
+                self.nbytes = 0
+                self._version = key[0]
+            entry = self._entries.get(key)
+            if entry is None:
+                entry = self._entries[key] = PathEntry()
+            else:
+                self.nbytes -= entry.nbytes
+                self._entries.move_to_end(key)
+            for name, value in fields.items():
+                setattr(entry, name, value)
+            self.nbytes += entry.nbytes
+            while self._entries and (
+                len(self._entries) > self.max_entries or self.nbytes > self.max_bytes
+            ):
+                _, evicted = self._entries.popitem(last=False)
+                self.nbytes -= evicted.nbytes
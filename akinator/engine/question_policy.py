@@ -3,9 +3,29 @@
 from __future__ import annotations
 
 import math
-from typing import Optional
+import time
+from dataclasses import dataclass
+from typing import Callable, Iterable, Mapping, Optional
 
-from akinator.db.models import Answer, Attribute, Entity, GameSession
+import numpy as np
+
+from akinator.db.models import Answer, Attribute, GameSession
+from akinator.engine.knowledge_base import (
+    EntitySource,
+    KnowledgeBase,
+    as_knowledge_base,
+    candidate_rows,
+    xlog2x,
+)
+from akinator.engine.path_cache import PathCache, PathKey
+from akinator.engine.stats import (
+    ColumnSums,
+    SessionStats,
+    grouped_yes_mass,
+    row_summer,
+    session_stats,
+    session_stats_batch,
+)
 
 # Related attribute groups - if user answers one, related ones are skipped or implied
 RELATED_ATTRIBUTES = {
@@ -28,6 +48,16 @@ RELATED_ATTRIBUTES = {
     "born_1940s": ["born_1930s", "born_1950s"],
 }
 
+# Shortlisted attributes scored per batch by the lookahead planner, and the
+# posterior cells (batch × 2 × candidates) one batch may hold; the time budget
+# is checked before each batch.
+_LOOKAHEAD_CHUNK = 4
+_LOOKAHEAD_CELLS = 1 << 17
+
+# Gains closer than this are treated as ties, so the vectorized path picks the
+# first attribute in catalogue order exactly like the scalar loop does.
+_TIE_TOLERANCE = 1e-12
+
 
 def _entropy(weights: list[float]) -> float:
     h = 0.0
@@ -37,15 +67,282 @@ def _entropy(weights: list[float]) -> float:
     return h
 
 
+def _column_entropy(masses: np.ndarray, totals: np.ndarray) -> np.ndarray:
+    """Entropy of every column of `masses` after normalizing by `totals`."""
+    q = masses / np.where(totals > 0, totals, 1.0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        terms = np.where(q > 0, q * np.log2(q), 0.0)
+    return -terms.sum(axis=0)
+
+
+def _binary_gains(
+    entropy: np.ndarray | float,
+    normalizer: np.ndarray | float,
+    yes_mass: np.ndarray,
+    yes_log_mass: np.ndarray,
+    yes_entropy: np.ndarray,
+    no_entropy: np.ndarray,
+) -> np.ndarray:
+    """Expected yes/no information gain from weighted column sums (see SessionStats).
+
+    With a = w @ p the yes-mass, W = sum(w) and B = sum of w * log2 w:
+
+        H_yes = log2(a) - (yes_log_mass + yes_entropy) / a
+        H_no  = log2(W - a) - (B - yes_log_mass + no_entropy) / (W - a)
+
+    Arguments broadcast, so one call scores a batch of weight vectors.
+    """
+    p_yes = yes_mass
+    p_no = 1.0 - p_yes
+    z_no = normalizer - p_yes
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        h_yes = np.where(
+            p_yes > 0,
+            np.log2(p_yes) - (yes_log_mass + yes_entropy) / p_yes,
+            0.0,
+        )
+        h_no = np.where(
+            z_no > 0,
+            np.log2(z_no) - (-entropy - yes_log_mass + no_entropy) / z_no,
+            0.0,
+        )
+
+    gains = np.maximum(entropy - (p_yes * h_yes + p_no * h_no), 0.0)
+    gains[(p_yes < 1e-12) | (p_no < 1e-12)] = 0.0
+    return gains
+
+
+def _info_gains(stats: SessionStats, cols: np.ndarray) -> np.ndarray:
+    """Expected yes/no information gain for the given stats columns (-1 = unknown key)."""
+    if stats.n_candidates <= 1:
+        return np.zeros(len(cols))
+
+    known = cols >= 0
+    cols = np.maximum(cols, 0)
+    gains = _binary_gains(
+        stats.entropy, stats.normalizer, stats.yes_mass[cols], stats.yes_log_mass[cols],
+        stats.yes_entropy[cols], stats.no_entropy[cols],
+    )
+    gains[~known] = 0.0
+    return gains
+
+
+def _info_gains_all_answers(weights: np.ndarray, likelihoods: dict[Answer, np.ndarray]) -> np.ndarray:
+    """Expected information gain over all five answers.
+
+    `likelihoods` maps every answer except DONT_KNOW to a candidates ×
+    attributes block; DONT_KNOW has likelihood 1 and leaves the posterior
+    equal to the prior. P(answer) is proportional to sum_i w_i * L_a(i).
+    """
+    n_attrs = next(iter(likelihoods.values())).shape[1]
+    if len(weights) <= 1:
+        return np.zeros(n_attrs)
+
+    h_current = float(_column_entropy(weights[:, None], np.ones(1))[0])
+    dont_know_mass = weights.sum()
+
+    masses = {a: weights[:, None] * L for a, L in likelihoods.items()}
+    totals = {a: m.sum(axis=0) for a, m in masses.items()}
+    grand_total = dont_know_mass + sum(totals.values())
+
+    expected_h = dont_know_mass / grand_total * h_current
+    for a, m in masses.items():
+        expected_h = expected_h + totals[a] / grand_total * _column_entropy(m, totals[a])
+    return np.maximum(h_current - expected_h, 0.0)
+
+
+@dataclass
+class ApproximationReport:
+    """How much of the candidate set an approximate selection looked at.
+
+    The approximate gain of every attribute is below the exact one by at most
+    `error_bound` bits, so the chosen question is within that of the best.
+    """
+
+    n_candidates: int
+    n_head: int  # candidates scored individually
+    n_buckets: int  # pseudo-candidates standing in for the rest
+    tail_mass: float
+    error_bound: float
+
+
+def _approximate_stats(
+    kb: KnowledgeBase, session: GameSession, coverage: float, n_buckets: int,
+) -> tuple[SessionStats, ApproximationReport]:
+    """Stats over the heaviest candidates covering `coverage` of the mass, plus tail buckets.
+
+    The remaining candidates are split, heaviest first, into up to
+    `n_buckets` groups. Each group acts as one pseudo-candidate carrying its
+    total weight and weighted-mean attribute values, so P(yes) stays exact
+    and only the information about which member of a group it is gets lost:
+    at most min(1, H(group)) bits per unit of group mass.
+    """
+    weights = session.weight_array
+    rows = candidate_rows(kb, session)
+    n = len(weights)
+    order = np.argsort(-weights)
+    sorted_w = weights[order]
+    cumulative = np.cumsum(sorted_w)
+    n_head = min(int(np.searchsorted(cumulative, coverage * cumulative[-1])) + 1, n) if n else 0
+
+    head_w = sorted_w[:n_head]
+    head_w_log = xlog2x(head_w)
+    yes_mass, yes_log_mass, yes_entropy, no_entropy = row_summer(kb, rows[order[:n_head]])(
+        head_w, head_w_log,
+    )
+    entropy = -float(head_w_log.sum())
+    normalizer = float(head_w.sum())
+    tail_w = sorted_w[n_head:]
+    tail_mass = float(tail_w.sum())
+    error_bound = 0.0
+    n_tail_buckets = 0
+    if len(tail_w) and tail_mass > 0:
+        sizes = np.array([len(c) for c in np.array_split(tail_w, min(n_buckets, len(tail_w)))])
+        starts = np.concatenate(([0], np.cumsum(sizes)[:-1]))
+        bucket_w = np.add.reduceat(tail_w, starts)
+        # Bucket sums of w @ P, without a (tail × attributes) block
+        bucket_mass = grouped_yes_mass(
+            kb, rows[order[n_head:]], tail_w, np.repeat(np.arange(len(sizes)), sizes), len(sizes),
+        )
+
+        # Entropy of each bucket's own (renormalized) weights
+        member_mass = np.repeat(bucket_w, sizes)
+        q = np.divide(tail_w, member_mass, out=np.zeros_like(tail_w), where=member_mass > 0)
+        bucket_h = -np.add.reduceat(xlog2x(q), starts)
+        error_bound = float((bucket_w * np.minimum(bucket_h, 1.0)).sum())
+
+        nonzero = bucket_w > 0
+        bucket_w = bucket_w[nonzero]
+        bucket_p = bucket_mass[nonzero] / bucket_w[:, None]
+        bucket_w_log = xlog2x(bucket_w)
+        yes_mass = yes_mass + bucket_w @ bucket_p
+        yes_log_mass = yes_log_mass + bucket_w_log @ bucket_p
+        yes_entropy = yes_entropy + bucket_w @ xlog2x(bucket_p)
+        no_entropy = no_entropy + bucket_w @ xlog2x(1.0 - bucket_p)
+        entropy -= float(bucket_w_log.sum())
+        normalizer += float(bucket_w.sum())
+        n_tail_buckets = len(bucket_w)
+
+    report = ApproximationReport(
+        n_candidates=n, n_head=n_head, n_buckets=n_tail_buckets,
+        tail_mass=tail_mass, error_bound=error_bound,
+    )
+    stats = SessionStats(
+        source=kb.values,
+        n_candidates=n_head + n_tail_buckets,
+        normalizer=normalizer,
+        entropy=entropy,
+        yes_mass=yes_mass,
+        yes_log_mass=yes_log_mass,
+        yes_entropy=yes_entropy,
+        no_entropy=no_entropy,
+    )
+    return stats, report
+
+
+def _two_step_values(
+    weights: np.ndarray,
+    p_first: np.ndarray,
+    sums: Callable[[np.ndarray, np.ndarray], ColumnSums],
+    first_gains: np.ndarray,
+    exclude: np.ndarray,
+) -> np.ndarray:
+    """Two-ply expectimax value of asking each of k first questions, then the best follow-up.
+
+    value(a) = IG(a) + sum over yes/no of P(answer) * max_b IG(b | answer),
+    the information the pair of questions reveals. `p_first` holds the
+    candidates' (k × n) values for the first questions and `sums` is a
+    row_summer() over the follow-up columns; all 2k posteriors are scored in
+    one call to it. `exclude` marks, per first question, the follow-ups
+    that may not come after it.
+    """
+    posteriors = np.concatenate((weights * p_first, weights * (1.0 - p_first)))  # (2k, n)
+    answer_mass = posteriors.sum(axis=1)
+    posteriors /= np.where(answer_mass > 0, answer_mass, 1.0)[:, None]
+
+    w_log_w = xlog2x(posteriors)
+    entropy = -w_log_w.sum(axis=1, keepdims=True)
+    gains = _binary_gains(entropy, 1.0, *sums(posteriors, w_log_w))
+    gains[np.concatenate((exclude, exclude))] = 0.0
+    follow_up = gains.max(axis=1, initial=0.0)
+    follow_up[answer_mass < 1e-12] = 0.0
+
+    k = len(first_gains)
+    return first_gains + answer_mass[:k] * follow_up[:k] + answer_mass[k:] * follow_up[k:]
+
+
+def compile_skip_rules(
+    rules: Mapping[str, Iterable[str]], col_of: Mapping[str, int],
+) -> dict[str, np.ndarray]:
+    """Compile {answered_key: [skipped keys]} into one column mask per answered key.
+
+    Masks are boolean arrays over the knowledge base's columns; skipped keys
+    that have no column are dropped.
+    """
+    masks: dict[str, np.ndarray] = {}
+    for key, related in rules.items():
+        mask = np.zeros(len(col_of), dtype=bool)
+        mask[[col_of[k] for k in related if k in col_of]] = True
+        masks[key] = mask
+    return masks
+
+
+def _attribute_columns(
+    kb: KnowledgeBase, attributes: list[Attribute],
+) -> tuple[np.ndarray, np.ndarray]:
+    """Ids of `attributes` and their knowledge-base columns (-1 where the key has none)."""
+    ids = np.fromiter((a.id for a in attributes), dtype=np.int64, count=len(attributes))
+    cols = np.fromiter(
+        (kb.col_of.get(a.key, -1) for a in attributes), dtype=np.int64, count=len(attributes),
+    )
+    return ids, cols
+
+
+def _best_index(gains: np.ndarray) -> int:
+    return int(np.flatnonzero(gains >= gains.max() - _TIE_TOLERANCE)[0])
+
+
 class QuestionPolicy:
 
+    def __init__(
+        self,
+        vectorized: bool = True,
+        all_answers: bool = False,
+        mass_coverage: float | None = None,
+        remainder_buckets: int = 8,
+        lookahead_width: int = 0,
+        lookahead_budget_ms: float = 20.0,
+        related_attributes: Mapping[str, Iterable[str]] = RELATED_ATTRIBUTES,
+        path_cache: PathCache | None = None,
+    ) -> None:
+        if mass_coverage is not None and all_answers:
+            raise ValueError("mass_coverage is only supported for the yes/no gain")
+        self.vectorized = vectorized
+        # Score questions over all five answers instead of the yes/no split
+        self.all_answers = all_answers
+        # Approximate selection: score only the candidates covering this share
+        # of the probability mass, plus `remainder_buckets` tail groups
+        self.mass_coverage = mass_coverage
+        self.remainder_buckets = remainder_buckets
+        self.last_approximation: ApproximationReport | None = None
+        # Two-step planner: re-rank the top `lookahead_width` greedy attributes
+        # by two-ply expectimax, within a per-call wall-clock budget (0 = greedy)
+        self.lookahead_width = lookahead_width
+        self.lookahead_budget_ms = lookahead_budget_ms
+        self.last_plan_size = 0
+        # Skip rules, compiled per knowledge-base column layout on first use
+        self.related_attributes = related_attributes
+        self._skip_masks: tuple[Mapping[str, int], dict[str, np.ndarray]] | None = None
+        # Memoized choices (and, via GameSessionManager, states) per answer path
+        self.path_cache = path_cache
+
     def compute_info_gain(
         self,
         session: GameSession,
-        entities: list[Entity],
+        entities: EntitySource,
         attribute_key: str,
     ) -> float:
-        entity_map = {e.id: e for e in entities}
         n = len(session.candidate_ids)
         if n <= 1:
             return 0.0
@@ -53,13 +350,8 @@ class QuestionPolicy:
         h_current = _entropy(session.weights)
 
         # For each candidate, get attribute value (default 0.5)
-        p_values = []
-        for cid in session.candidate_ids:
-            entity = entity_map.get(cid)
-            if entity and attribute_key in entity.attributes:
-                p_values.append(entity.attributes[attribute_key])
-            else:
-                p_values.append(0.5)
+        kb = as_knowledge_base(entities)
+        p_values = kb.column(candidate_rows(kb, session), attribute_key).tolist()
 
         # P(yes) = sum(w_i * p_i)
         p_yes = sum(w * p for w, p in zip(session.weights, p_values))
@@ -86,6 +378,54 @@ class QuestionPolicy:
         ig = h_current - expected_h
         return max(ig, 0.0)
 
+    def compute_info_gains(
+        self,
+        session: GameSession,
+        entities: EntitySource,
+        attribute_keys: list[str],
+    ) -> np.ndarray:
+        """Information gain of every key in one candidates × attributes pass.
+
+        Matches `compute_info_gain` key by key, up to float rounding. It
+        reads the session's cached statistics (refreshed by ScoringEngine.update),
+        so it costs O(attributes) once they are in place. With all_answers=True
+        the gain is taken over all five answers instead, using the knowledge
+        base's precomputed likelihood tables.
+        """
+        kb = as_knowledge_base(entities)
+        if self.all_answers:
+            rows = candidate_rows(kb, session)
+            likelihoods = {
+                a: kb.likelihood_columns(rows, attribute_keys, a)
+                for a in Answer if a != Answer.DONT_KNOW
+            }
+            return _info_gains_all_answers(session.weight_array, likelihoods)
+        cols = np.fromiter(
+            (kb.col_of.get(k, -1) for k in attribute_keys), dtype=np.int64, count=len(attribute_keys),
+        )
+        return _info_gains(session_stats(kb, session), cols)
+
+    def compute_info_gains_approx(
+        self,
+        session: GameSession,
+        entities: EntitySource,
+        attribute_keys: list[str],
+    ) -> tuple[np.ndarray, ApproximationReport]:
+        """Yes/no information gain over the top of the candidate mass (see mass_coverage).
+
+        The head and the tail buckets are summed by gathering their rows when
+        they are few, else by scattering onto knowledge-base rows, so no
+        candidates × attributes block is built. Independent of the cached
+        session statistics.
+        """
+        kb = as_knowledge_base(entities)
+        coverage = 1.0 if self.mass_coverage is None else self.mass_coverage
+        stats, report = _approximate_stats(kb, session, coverage, self.remainder_buckets)
+        cols = np.fromiter(
+            (kb.col_of.get(k, -1) for k in attribute_keys), dtype=np.int64, count=len(attribute_keys),
+        )
+        return _info_gains(stats, cols), report
+
     def get_implied_skip_keys(self, session: GameSession, attributes: list[Attribute]) -> set[str]:
         """Get attribute keys that should be skipped based on previous answers.
 
@@ -98,23 +438,215 @@ class QuestionPolicy:
             asked_key = qa.attribute_key
             # Skip related attributes regardless of answer type
             # (if user doesn't know about "books", they probably don't know about "literature" either)
-            if asked_key in RELATED_ATTRIBUTES:
-                skip_keys.update(RELATED_ATTRIBUTES[asked_key])
+            if asked_key in self.related_attributes:
+                skip_keys.update(self.related_attributes[asked_key])
 
         return skip_keys
 
+    def compiled_skip_rules(self, kb: KnowledgeBase) -> dict[str, np.ndarray]:
+        """related_attributes as column masks for `kb`, cached until its columns change."""
+        if self._skip_masks is None or self._skip_masks[0] is not kb.col_of:
+            self._skip_masks = (kb.col_of, compile_skip_rules(self.related_attributes, kb.col_of))
+        return self._skip_masks[1]
+
+    def blocked_columns(self, session: GameSession, kb: KnowledgeBase) -> np.ndarray:
+        """Columns skipped because of related answers (the mask form of get_implied_skip_keys).
+
+        Kept on the session; answers added to the history since the last call
+        are OR-ed in, so each answer is folded in once.
+        """
+        masks = self.compiled_skip_rules(kb)
+        if (
+            session.blocked_columns is None
+            or session.blocked_source is not kb.col_of
+            or session.blocked_count > len(session.history)
+        ):
+            session.blocked_columns = np.zeros(kb.n_attributes, dtype=bool)
+            session.blocked_source = kb.col_of
+            session.blocked_count = 0
+        for qa in session.history[session.blocked_count:]:
+            mask = masks.get(qa.attribute_key)
+            if mask is not None:
+                session.blocked_columns |= mask
+        session.blocked_count = len(session.history)
+        return session.blocked_columns
+
+    def _plan(
+        self,
+        session: GameSession,
+        kb: KnowledgeBase,
+        keys: list[str],
+        gains: np.ndarray,
+    ) -> int:
+        """Index into `keys` of the best two-step opening among the greedy shortlist.
+
+        Shortlisted attributes are scored best-greedy-first in batches (fewer
+        per batch the more candidates there are) until the time budget runs
+        out; the greedy choice stands if it runs out before the first. Ties
+        keep greedy order.
+        """
+        deadline = time.perf_counter() + self.lookahead_budget_ms / 1000.0
+        best = _best_index(gains)
+        self.last_plan_size = 0
+        rows = candidate_rows(kb, session)
+        cols = np.fromiter((kb.col_of.get(k, -1) for k in keys), dtype=np.int64, count=len(keys))
+        # Unknown keys have no column and can only be greedy picks
+        known = np.flatnonzero(cols >= 0)
+        sums = row_summer(kb, rows, cols[known])
+        position = {keys[i]: j for j, i in enumerate(known)}
+        skip_masks = self.compiled_skip_rules(kb)
+
+        shortlist = known[np.argsort(-gains[known], kind="stable")[:self.lookahead_width]]
+        chunk_size = max(1, min(_LOOKAHEAD_CHUNK, _LOOKAHEAD_CELLS // (2 * len(rows))))
+        best_value = -1.0
+        for start in range(0, len(shortlist), chunk_size):
+            if time.perf_counter() >= deadline:
+                break
+            chunk = shortlist[start:start + chunk_size]
+            exclude = np.zeros((len(chunk), len(known)), dtype=bool)
+            for r, i in enumerate(chunk):
+                exclude[r, position[keys[i]]] = True
+                if keys[i] in skip_masks:
+                    exclude[r] |= skip_masks[keys[i]][cols[known]]
+            values = _two_step_values(
+                session.weight_array, kb.values[np.ix_(rows, cols[chunk])].T, sums,
+                gains[chunk], exclude,
+            )
+            for i, value in zip(chunk.tolist(), values.tolist()):
+                if value > best_value + _TIE_TOLERANCE:
+                    best, best_value = i, value
+            self.last_plan_size += len(chunk)
+        return best
+
+    def _eligible(
+        self, session: GameSession, kb: KnowledgeBase, ids: np.ndarray, cols: np.ndarray,
+    ) -> np.ndarray:
+        """Mask of the attributes (ids / cols from _attribute_columns) still worth asking."""
+        known = cols >= 0
+        blocked = np.zeros(len(cols), dtype=bool)
+        blocked[known] = self.blocked_columns(session, kb)[cols[known]]
+        return ~blocked & ~np.isin(ids, session.asked_attributes)
+
+    def cache_key(self, session: GameSession, kb: KnowledgeBase) -> PathKey | None:
+        """Path-cache key for the session's next question, None when not cacheable.
+
+        The time-budgeted planner is not deterministic, so it is never cached.
+        """
+        if self.path_cache is None or self.lookahead_width > 1:
+            return None
+        return PathCache.key(session, kb)
+
+    def _select_vectorized(
+        self, session: GameSession, kb: KnowledgeBase, attributes: list[Attribute],
+    ) -> Optional[str]:
+        ids, cols = _attribute_columns(kb, attributes)
+        eligible = self._eligible(session, kb, ids, cols)
+        keys = [attributes[i].key for i in np.flatnonzero(eligible)]
+        if not keys:
+            return None
+        if self.mass_coverage is not None:
+            gains, self.last_approximation = self.compute_info_gains_approx(session, kb, keys)
+        else:
+            gains = self.compute_info_gains(session, kb, keys)
+        if self.lookahead_width > 1 and len(keys) > 1 and len(session.candidate_array) > 1:
+            return keys[self._plan(session, kb, keys, gains)]
+        return keys[_best_index(gains)]
+
+    def select_batch(
+        self,
+        sessions: list[GameSession],
+        entities: EntitySource,
+        attributes: list[Attribute],
+    ) -> list[Optional[str]]:
+        """select() for many sessions at once, scoring them in one stacked pass.
+
+        Returns the same choices as calling select() per session. Sessions
+        without fresh statistics get them from one batched matrix product
+        (see session_stats_batch), and the gains of every session × attribute
+        pair come out of one broadcast call. Only the default greedy yes/no
+        mode is batched; the other modes fall back to select() per session.
+        """
+        if not self.vectorized or self.all_answers or self.mass_coverage is not None \
+                or self.lookahead_width > 1:
+            return [self.select(s, entities, attributes) for s in sessions]
+        if not sessions:
+            return []
+
+        kb = as_knowledge_base(entities)
+        attributes_id = tuple(a.id for a in attributes)
+        keys = [self.cache_key(s, kb) for s in sessions]
+        cached = [
+            self.path_cache.get_next_key(key, attributes_id) if key is not None else None
+            for key in keys
+        ]
+        misses = [i for i, choice in enumerate(cached) if choice is None]
+        if misses:
+            computed = self._select_batch(
+                [sessions[i] for i in misses], kb, attributes,
+            )
+            for i, choice in zip(misses, computed):
+                cached[i] = choice
+                if keys[i] is not None and choice is not None:
+                    self.path_cache.put_next_key(keys[i], attributes_id, choice)
+        return cached
+
+    def _select_batch(
+        self, sessions: list[GameSession], kb: KnowledgeBase, attributes: list[Attribute],
+    ) -> list[Optional[str]]:
+        ids, cols = _attribute_columns(kb, attributes)
+        known = cols >= 0
+        stats = session_stats_batch(kb, sessions)
+        column = np.maximum(cols, 0)
+
+        def stacked(name: str) -> np.ndarray:
+            return np.stack([getattr(st, name)[column] for st in stats])
+
+        def scalars(name: str) -> np.ndarray:
+            return np.array([getattr(st, name) for st in stats])[:, None]
+
+        if kb.n_attributes:
+            gains = _binary_gains(
+                scalars("entropy"), scalars("normalizer"), stacked("yes_mass"),
+                stacked("yes_log_mass"), stacked("yes_entropy"), stacked("no_entropy"),
+            )
+        else:
+            gains = np.zeros((len(sessions), len(attributes)))
+        gains[:, ~known] = 0.0
+        gains[[st.n_candidates <= 1 for st in stats]] = 0.0
+
+        choices: list[Optional[str]] = []
+        for session, row in zip(sessions, gains):
+            eligible = np.flatnonzero(self._eligible(session, kb, ids, cols))
+            if len(eligible) == 0:
+                choices.append(None)
+            else:
+                choices.append(attributes[eligible[_best_index(row[eligible])]].key)
+        return choices
+
     def select(
         self,
         session: GameSession,
-        entities: list[Entity],
+        entities: EntitySource,
         attributes: list[Attribute],
     ) -> Optional[str]:
-        asked_set = set(session.asked_attributes)
-        attr_id_to_key = {a.id: a.key for a in attributes}
+        if self.vectorized:
+            kb = as_knowledge_base(entities)
+            path_key = self.cache_key(session, kb)
+            if path_key is None:
+                return self._select_vectorized(session, kb, attributes)
+            attributes_id = tuple(a.id for a in attributes)
+            choice = self.path_cache.get_next_key(path_key, attributes_id)
+            if choice is None:
+                choice = self._select_vectorized(session, kb, attributes)
+                if choice is not None:
+                    self.path_cache.put_next_key(path_key, attributes_id, choice)
+            return choice
 
+        asked_set = set(session.asked_attributes)
         # Get keys to skip based on related answers
         skip_keys = self.get_implied_skip_keys(session, attributes)
 
+        kb = as_knowledge_base(entities)
         best_key = None
         best_ig = -1.0
 
@@ -124,7 +656,7 @@ class QuestionPolicy:
             # Skip related attributes
             if attr.key in skip_keys:
                 continue
-            ig = self.compute_info_gain(session, entities, attr.key)
+            ig = self.compute_info_gain(session, kb, attr.key)
             if ig > best_ig:
                 best_ig = ig
                 best_key = attr.key
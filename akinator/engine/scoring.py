@@ -4,81 +4,155 @@ from __future__ import annotations
 
 import math
 
-from akinator.config import EPSILON, PRUNE_THRESHOLD
-from akinator.db.models import Answer, Entity, GameSession
+import numpy as np
 
+from akinator.config import PRUNE_THRESHOLD
+from akinator.db.models import Answer, GameSession
+from akinator.engine.knowledge_base import EntitySource, as_knowledge_base, candidate_rows
 
-# Likelihood given attribute value p and answer
-def _likelihood(p: float, answer: Answer) -> float:
-    if answer == Answer.YES:
-        L = p
-    elif answer == Answer.NO:
-        L = 1.0 - p
-    elif answer == Answer.PROBABLY_YES:
-        L = 0.5 * p + 0.25
-    elif answer == Answer.PROBABLY_NO:
-        L = 0.75 - 0.5 * p
-    else:  # DONT_KNOW
-        return 1.0
-    return max(L, EPSILON)
+
+_LOG_PRUNE_THRESHOLD = math.log(PRUNE_THRESHOLD)
+
+
+def top_indices(weights: np.ndarray, k: int) -> np.ndarray:
+    """Indices of the k largest weights, largest first.
+
+    Ties keep candidate order, as a stable sort would. argpartition finds the
+    k-th largest value, so only the entries at or above it get sorted.
+    """
+    n = len(weights)
+    k = min(k, n)
+    if k <= 0:
+        return np.empty(0, dtype=np.intp)
+    if k < n:
+        kth = weights[np.argpartition(weights, n - k)[n - k]]
+        idx = np.flatnonzero(weights >= kth)
+    else:
+        idx = np.arange(n)
+    return idx[np.lexsort((idx, -weights[idx]))][:k]
 
 
 class ScoringEngine:
+    """Bayesian scorer over a session's candidate arrays.
+
+    With log_space=True the session accumulates unnormalized log-weights and
+    is only normalized when probabilities are read (see
+    GameSession.weight_array). Pruning then compares each log-weight with the
+    maximum, which removes a subset of what the linear rule would remove.
+
+    Read-only weight arrays are shared between sessions (see
+    GameSessionManager.init_candidates) and are copied rather than updated
+    in place.
+
+    Every update drops session.stats; the question policy recomputes them
+    when it next selects (see session_stats), so scoring an answer neither
+    normalizes log-weights nor passes over the whole attribute matrix.
+    """
+
+    def __init__(self, log_space: bool = False) -> None:
+        self.log_space = log_space
 
     def update(
         self,
         session: GameSession,
-        entities: list[Entity],
+        entities: EntitySource,
         attribute_key: str,
         answer: Answer,
     ) -> None:
         if answer == Answer.DONT_KNOW:
             return
 
-        entity_map = {e.id: e for e in entities}
+        kb = as_knowledge_base(entities)
+        rows = candidate_rows(kb, session)
+        likelihood = kb.likelihood(rows, attribute_key, answer)
+        if self.log_space:
+            self._apply_log(session, rows, np.log(likelihood))
+        else:
+            self._apply_linear(session, rows, likelihood)
+        # Linear updates scale the weights in place, which the setter doesn't see
+        session.stats = None
+
+    def replay(
+        self,
+        session: GameSession,
+        entities: EntitySource,
+        answers: list[tuple[str, Answer]],
+    ) -> None:
+        """Apply a sequence of (attribute_key, answer) pairs in one batched step.
 
-        for i, cid in enumerate(session.candidate_ids):
-            entity = entity_map.get(cid)
-            p = 0.5  # default for missing attribute
-            if entity and attribute_key in entity.attributes:
-                p = entity.attributes[attribute_key]
-            session.weights[i] *= _likelihood(p, answer)
+        Equivalent to calling update() per pair, except that pruning happens
+        once at the end.
+        """
+        answers = [(key, a) for key, a in answers if a != Answer.DONT_KNOW]
+        if not answers:
+            return
+
+        kb = as_knowledge_base(entities)
+        rows = candidate_rows(kb, session)
+        log_l = np.zeros(len(rows))
+        for answer in {a for _, a in answers}:
+            keys = [key for key, a in answers if a == answer]
+            log_l += np.log(kb.likelihood_columns(rows, keys, answer)).sum(axis=1)
+
+        if self.log_space:
+            self._apply_log(session, rows, log_l)
+        elif len(log_l):
+            self._apply_linear(session, rows, np.exp(log_l - log_l.max()))
+        # Linear updates scale the weights in place, which the setter doesn't see
+        session.stats = None
+
+    def _apply_linear(self, session: GameSession, rows: np.ndarray, likelihood: np.ndarray) -> None:
+        weights = session.weight_array
+        if weights.flags.writeable:
+            weights *= likelihood
+        else:
+            # Shared (e.g. the uniform prior): this session gets its own copy now
+            weights = session.weight_array = weights * likelihood
 
         # Normalize
-        total = sum(session.weights)
+        total = weights.sum()
         if total > 0:
-            session.weights = [w / total for w in session.weights]
+            weights /= total
 
         # Prune
-        surviving_ids = []
-        surviving_weights = []
-        for cid, w in zip(session.candidate_ids, session.weights):
-            if w >= PRUNE_THRESHOLD:
-                surviving_ids.append(cid)
-                surviving_weights.append(w)
-
-        if surviving_ids:
-            session.candidate_ids = surviving_ids
-            session.weights = surviving_weights
+        keep = weights >= PRUNE_THRESHOLD
+        if keep.any() and not keep.all():
+            session.candidate_array = session.candidate_array[keep]
+            session.candidate_rows = rows[keep]
+            session.weight_array = weights = weights[keep]
             # Re-normalize after pruning
-            total = sum(session.weights)
-            session.weights = [w / total for w in session.weights]
+            weights /= weights.sum()
+
+    def _apply_log(self, session: GameSession, rows: np.ndarray, log_likelihood: np.ndarray) -> None:
+        log_weights = session.log_weights
+        if log_weights is None:
+            with np.errstate(divide="ignore"):
+                log_weights = np.log(session.weight_array)
+        if log_weights.flags.writeable:
+            log_weights += log_likelihood
+        else:
+            log_weights = log_weights + log_likelihood
+        if len(log_weights) == 0:
+            return
+
+        keep = log_weights >= log_weights.max() + _LOG_PRUNE_THRESHOLD
+        if not keep.all():
+            session.candidate_array = session.candidate_array[keep]
+            session.candidate_rows = rows[keep]
+            log_weights = log_weights[keep]
+        # Assigning marks the normalized weights stale
+        session.log_weights = log_weights
 
     def top_k(self, session: GameSession, k: int = 5) -> list[tuple[int, float]]:
-        pairs = list(zip(session.candidate_ids, session.weights))
-        pairs.sort(key=lambda x: x[1], reverse=True)
-        return pairs[:k]
+        idx = top_indices(session.weight_array, k)
+        return list(zip(session.candidate_array[idx].tolist(), session.weight_array[idx].tolist()))
 
     def max_prob(self, session: GameSession) -> tuple[int, float]:
-        best_idx = 0
-        for i, w in enumerate(session.weights):
-            if w > session.weights[best_idx]:
-                best_idx = i
-        return session.candidate_ids[best_idx], session.weights[best_idx]
+        best_idx = int(np.argmax(session.weight_array))
+        return int(session.candidate_array[best_idx]), float(session.weight_array[best_idx])
 
     def entropy(self, session: GameSession) -> float:
-        h = 0.0
-        for w in session.weights:
-            if w > 0:
-                h -= w * math.log2(w)
-        return h
+        if session.stats is not None:
+            return session.stats.entropy
+        w = session.weight_array[session.weight_array > 0]
+        return float(-(w * np.log2(w)).sum())
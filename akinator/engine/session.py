@@ -2,14 +2,39 @@
 
 from __future__ import annotations
 
+import functools
 import uuid
+from collections.abc import Sequence
 from datetime import datetime
 
+import numpy as np
+
 from akinator.config import GUESS_THRESHOLD, MAX_QUESTIONS, PRUNE_THRESHOLD, SECOND_GUESS_THRESHOLD
-from akinator.db.models import Answer, Attribute, Entity, GameMode, GameSession, QAPair
+from akinator.db.models import Answer, Attribute, GameMode, GameSession, QAPair
+from akinator.engine.knowledge_base import EntitySource, KnowledgeBase, as_knowledge_base
 from akinator.engine.scoring import ScoringEngine
 from akinator.engine.question_policy import QuestionPolicy
 
+# Prior id of a game started with uniform weights over the whole catalogue
+UNIFORM_PRIOR = "uniform"
+
+
+def uniform_prior(kb: KnowledgeBase) -> str:
+    """UNIFORM_PRIOR over `kb`'s catalogue, tagged with its version.
+
+    A game started before learning keeps the old candidate set, so it must
+    not share path-cache entries or book moves with games started after.
+    """
+    return f"{UNIFORM_PRIOR}@{kb.version}"
+
+
+@functools.lru_cache(maxsize=4)
+def uniform_weights(n: int) -> np.ndarray:
+    """Read-only uniform weights over n candidates, shared by every session that starts from them."""
+    weights = np.full(n, 1.0 / n) if n else np.empty(0)
+    weights.flags.writeable = False
+    return weights
+
 
 class GameSessionManager:
 
@@ -29,36 +54,54 @@ class GameSessionManager:
     def init_candidates(
         self,
         session: GameSession,
-        candidate_ids: list[int],
+        candidate_ids: Sequence[int] | np.ndarray,
         scores: list[float] | None = None,
+        prior: str | None = None,
     ) -> None:
-        session.candidate_ids = list(candidate_ids)
+        """Set the starting candidates and weights.
+
+        `prior` names a starting distribution shared by many games (e.g.
+        uniform_prior(kb)), which lets path caches recognise them; it must
+        identify the candidate set too. Leave it None for per-game priors
+        such as hint scores.
+
+        A read-only id array (e.g. KnowledgeBase.entity_ids) and the uniform
+        weights are shared rather than copied: the scoring engine copies
+        them on the session's first update, so starting a game is O(1).
+        """
+        if isinstance(candidate_ids, np.ndarray) and not candidate_ids.flags.writeable:
+            session.candidate_array = candidate_ids.astype(np.int64, copy=False)
+            session.candidate_rows = None
+        else:
+            session.candidate_ids = candidate_ids
+        session.prior = prior
+        n = len(session.candidate_array)
         if scores is not None:
-            total = sum(scores)
-            session.weights = [s / total for s in scores] if total > 0 else [1.0 / len(scores)] * len(scores)
+            weights = np.array(scores, dtype=np.float64)
+            total = weights.sum()
+            session.weight_array = weights / total if total > 0 else np.full(n, 1.0 / n)
         else:
-            n = len(candidate_ids)
-            session.weights = [1.0 / n] * n
+            session.weight_array = uniform_weights(n)
         session.mode = GameMode.ASKING
 
     def should_guess(self, session: GameSession) -> bool:
-        if not session.weights:
+        weights = session.weight_array
+        if len(weights) == 0:
             return False
-        max_w = max(session.weights)
+        max_w = weights.max()
         if max_w >= GUESS_THRESHOLD:
             return True
         if session.question_count >= MAX_QUESTIONS:
             return True
         # Only consider early stop after enough questions have been asked
         if session.question_count >= 5:
-            active = sum(1 for w in session.weights if w > PRUNE_THRESHOLD)
+            active = np.count_nonzero(weights > PRUNE_THRESHOLD)
             if active <= 2:
                 return True
         return False
 
     def get_guess_candidate(self, session: GameSession) -> int:
-        pairs = list(zip(session.candidate_ids, session.weights))
-        pairs.sort(key=lambda x: x[1], reverse=True)
+        pairs = self.scoring_engine.top_k(session, k=session.guess_count + 1)
         idx = min(session.guess_count, len(pairs) - 1)
         return pairs[idx][0]
 
@@ -70,10 +113,7 @@ class GameSessionManager:
         session.guess_count += 1
 
         # Check if there's a viable second candidate
-        pairs = sorted(
-            zip(session.candidate_ids, session.weights),
-            key=lambda x: x[1], reverse=True,
-        )
+        pairs = self.scoring_engine.top_k(session, k=2)
         if session.guess_count < 2 and len(pairs) >= 2:
             second_w = pairs[1][1]
             if second_w >= SECOND_GUESS_THRESHOLD:
@@ -87,11 +127,26 @@ class GameSessionManager:
     def process_answer(
         self,
         session: GameSession,
-        entities: list[Entity],
+        entities: EntitySource,
         attribute: Attribute,
         answer: Answer,
     ) -> None:
-        self.scoring_engine.update(session, entities, attribute.key, answer)
+        """Score the answer and record it in the session's history.
+
+        With a path cache on the question policy, a session that follows an
+        already-seen answer path takes the cached candidate state instead
+        of being rescored.
+        """
+        kb = as_knowledge_base(entities)
+        cache = self.question_policy.path_cache
+        key = cache.key(session, kb, (attribute.id, answer)) if cache is not None else None
+        entry = cache.get_state(key) if key is not None else None
+        if entry is not None:
+            cache.restore(entry, session, kb)
+        else:
+            self.scoring_engine.update(session, kb, attribute.key, answer)
+            if key is not None:
+                cache.put_state(key, session)
         session.question_count += 1
         session.asked_attributes.append(attribute.id)
         session.history.append(QAPair(
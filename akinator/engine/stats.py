@@ -0,0 +1,181 @@
+"""Session Statistics — cached sufficient statistics for question selection."""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Callable
+
+import numpy as np
+
+from akinator.db.models import GameSession
+from akinator.engine.knowledge_base import KnowledgeBase, candidate_rows, xlog2x
+
+
+@dataclass(frozen=True)
+class SessionStats:
+    """Weighted column sums of a session's candidates over every attribute.
+
+    With w the candidate weights, P their attribute rows and Q = 1 - P:
+
+        yes_mass     = w @ P
+        yes_log_mass = (w * log2 w) @ P
+        yes_entropy  = w @ (P * log2 P)
+        no_entropy   = w @ (Q * log2 Q)
+
+    These give the entropy of the yes and no posteriors for every attribute
+    without building a candidates × attributes temporary. Scoring only
+    drops them; they are computed when a question is next selected.
+    """
+
+    source: np.ndarray  # kb.values the stats were computed against
+    n_candidates: int
+    normalizer: float  # sum of w
+    entropy: float  # -sum of w * log2 w
+    yes_mass: np.ndarray
+    yes_log_mass: np.ndarray
+    yes_entropy: np.ndarray
+    no_entropy: np.ndarray
+
+
+# Gathering a candidate's row costs about four times what the scatter path
+# pays per knowledge-base row (measured at 100k × 84: break-even near a
+# fifth of the rows), so candidate sets below an eighth of the rows gather.
+_GATHER_FRACTION = 0.125
+
+
+def _gathers(kb: KnowledgeBase, n: int) -> bool:
+    """Whether n rows are few enough to gather rather than scatter onto every row."""
+    return n < _GATHER_FRACTION * kb.values.shape[0]
+
+
+def compute_stats(kb: KnowledgeBase, session: GameSession) -> SessionStats:
+    """Stats for the session's candidates (column sums as in row_summer())."""
+    w = session.weight_array
+    w_log_w = xlog2x(w)
+    sums = row_summer(kb, candidate_rows(kb, session))(w, w_log_w)
+    return _session_stats(kb, session, float(-w_log_w.sum()), *sums)
+
+
+ColumnSums = tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]
+
+
+def row_summer(
+    kb: KnowledgeBase, rows: np.ndarray, cols: np.ndarray | None = None,
+) -> Callable[[np.ndarray, np.ndarray], ColumnSums]:
+    """Function of (... × len(rows)) weights w and w * log2 w giving the four
+    SessionStats column sums over knowledge-base `rows` (repeats allowed),
+    restricted to `cols`.
+
+    Few rows are gathered once up front; many are summed by scattering the
+    weights onto every knowledge-base row, one product per table, so no
+    rows × attributes block is copied.
+    """
+    if _gathers(kb, len(rows)):
+        index = rows if cols is None else np.ix_(rows, cols)
+        p = kb.values[index]
+        yes_terms = kb.yes_entropy_terms[index]
+        no_terms = kb.no_entropy_terms[index]
+        return lambda w, w_log_w: (w @ p, w_log_w @ p, w @ yes_terms, w @ no_terms)
+
+    n_rows = kb.values.shape[0]
+
+    def scattered(w: np.ndarray, w_log_w: np.ndarray) -> ColumnSums:
+        # Each leading index gets its own block of n_rows bins
+        lead = w.shape[:-1]
+        n_lead = int(np.prod(lead))
+        bins = (np.arange(n_lead)[:, None] * n_rows + rows).ravel()
+        weights, weights_log = (
+            np.bincount(bins, weights=x.ravel(), minlength=n_lead * n_rows).reshape(*lead, n_rows)
+            for x in (w, w_log_w)
+        )
+        sums = _column_sums(kb, weights, weights_log)
+        return sums if cols is None else tuple(m[..., cols] for m in sums)
+
+    return scattered
+
+
+def grouped_yes_mass(
+    kb: KnowledgeBase, rows: np.ndarray, weights: np.ndarray, groups: np.ndarray, n_groups: int,
+) -> np.ndarray:
+    """(n_groups × attributes) w @ P summed separately over each group of `rows`."""
+    if _gathers(kb, len(rows)):
+        spread = np.zeros((n_groups, len(rows)))
+        spread[groups, np.arange(len(rows))] = weights
+        return spread @ kb.values[rows]
+    n_rows = kb.values.shape[0]
+    spread = np.bincount(groups * n_rows + rows, weights=weights, minlength=n_groups * n_rows)
+    return spread.reshape(n_groups, n_rows).astype(kb.values.dtype) @ kb.values
+
+
+def _row_weights(kb: KnowledgeBase, session: GameSession) -> tuple[np.ndarray, np.ndarray, float]:
+    """w and w * log2 w summed per knowledge-base row, and the entropy of w."""
+    rows = candidate_rows(kb, session)
+    w = session.weight_array
+    w_log_w = xlog2x(w)
+    n_rows = kb.values.shape[0]
+    # Unknown candidate ids share the default row, so accumulate
+    return (
+        np.bincount(rows, weights=w, minlength=n_rows),
+        np.bincount(rows, weights=w_log_w, minlength=n_rows),
+        float(-w_log_w.sum()),
+    )
+
+
+def _column_sums(
+    kb: KnowledgeBase, weights: np.ndarray, weights_log: np.ndarray,
+) -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """(... × rows) weights @ (rows × attributes) tables, for one session or a stack."""
+    # In each table's dtype: a mixed-dtype product would copy the whole table
+    values = kb.values
+    return (
+        weights.astype(values.dtype) @ values,
+        weights_log.astype(values.dtype) @ values,
+        weights.astype(kb.yes_entropy_terms.dtype, copy=False) @ kb.yes_entropy_terms,
+        weights.astype(kb.no_entropy_terms.dtype, copy=False) @ kb.no_entropy_terms,
+    )
+
+
+def _session_stats(
+    kb: KnowledgeBase, session: GameSession, entropy: float, yes_mass: np.ndarray,
+    yes_log_mass: np.ndarray, yes_entropy: np.ndarray, no_entropy: np.ndarray,
+) -> SessionStats:
+    return SessionStats(
+        source=kb.values,
+        n_candidates=len(session.weight_array),
+        normalizer=float(session.weight_array.sum()),
+        entropy=entropy,
+        yes_mass=yes_mass,
+        yes_log_mass=yes_log_mass,
+        yes_entropy=yes_entropy,
+        no_entropy=no_entropy,
+    )
+
+
+def session_stats(kb: KnowledgeBase, session: GameSession) -> SessionStats:
+    """Cached stats for the session, recomputed if its weights or the knowledge base changed."""
+    stats = session.stats
+    if stats is None or stats.source is not kb.values:
+        stats = compute_stats(kb, session)
+        session.stats = stats
+    return stats
+
+
+def session_stats_batch(kb: KnowledgeBase, sessions: list[GameSession]) -> list[SessionStats]:
+    """session_stats() for many sessions; the stale ones are computed in one stacked pass.
+
+    Each stale session's weights are scattered onto knowledge-base rows, so
+    the column sums of all of them come out of four (sessions × rows) @
+    (rows × attributes) matrix products. Sessions with few candidates gather
+    their own rows instead, as in compute_stats().
+    """
+    stale = [s for s in sessions if s.stats is None or s.stats.source is not kb.values]
+    for session in stale:
+        if _gathers(kb, len(session.weight_array)):
+            session.stats = compute_stats(kb, session)
+    stale = [s for s in stale if not _gathers(kb, len(s.weight_array))]
+    if stale:
+        weights, weights_log, entropies = zip(*(_row_weights(kb, session) for session in stale))
+        sums = _column_sums(kb, np.stack(weights), np.stack(weights_log))
+        for i, session in enumerate(stale):
+            session.stats = _session_stats(kb, session, entropies[i], *(m[i] for m in sums))
+    return [s.stats for s in sessions]
@@ -13,7 +13,7 @@ import os
 import sys
 
 from akinator.data.categories import TEMPLATES
-from akinator.db.repository import Repository
+from akinator.db.repository import IMPORT_PROFILE, Repository
 
 logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s")
 logger = logging.getLogger("generate_db")
@@ -157,23 +157,17 @@ async def generate(db_path: str) -> int:
 
     os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
 
-    repo = Repository(db_path)
+    repo = Repository(db_path, IMPORT_PROFILE)
     await repo.init_db()
 
-    # Insert attributes
-    attr_ids: dict[str, int] = {}
-    for key, q_ru, q_en, cat in ATTRIBUTES:
-        aid = await repo.add_attribute(key, q_ru, q_en, cat)
-        attr_ids[key] = aid
-
-    logger.info("Created %d attributes", len(attr_ids))
-
-    # Load and insert entities
+    # Load and validate entities
     raw_entities = _load_all_entities()
     logger.info("Total raw entities to process: %d", len(raw_entities))
 
     seen_names: set[str] = set()
-    count = 0
+    rows: list[tuple[str, str, str, str]] = []
+    entity_aliases: list[list[tuple[str, str]]] = []
+    entity_attrs: list[dict[str, float]] = []
 
     for entry in raw_entities:
         # Parse entry: (name, category, aliases) or (name, category, aliases, overrides)
@@ -197,25 +191,30 @@ async def generate(db_path: str) -> int:
             logger.warning("Unknown category '%s' for entity '%s', skipping", category, name)
             continue
 
-        lang = _detect_language(name)
-        etype = _detect_entity_type(category)
-        attrs = _resolve_attrs(category, overrides)
-
-        eid = await repo.add_entity(name, f"{category}", etype, lang)
-
-        # Add aliases
-        for alias in aliases:
-            alias_lang = _detect_language(alias)
-            await repo.add_alias(eid, alias, alias_lang)
-
-        # Add attributes
-        for attr_key, value in attrs.items():
-            if attr_key in attr_ids:
-                await repo.set_entity_attribute(eid, attr_ids[attr_key], value)
-
-        count += 1
-        if count % 500 == 0:
-            logger.info("  ... processed %d entities", count)
+        rows.append((name, f"{category}", _detect_entity_type(category), _detect_language(name)))
+        entity_aliases.append([(alias, _detect_language(alias)) for alias in aliases])
+        entity_attrs.append(_resolve_attrs(category, overrides))
+
+    # Write everything in one transaction
+    async with repo.transaction():
+        attr_ids: dict[str, int] = {}
+        for key, q_ru, q_en, cat in ATTRIBUTES:
+            attr_ids[key] = await repo.add_attribute(key, q_ru, q_en, cat)
+        logger.info("Created %d attributes", len(attr_ids))
+
+        entity_ids = await repo.add_entities_bulk(rows)
+        await repo.add_aliases_bulk(
+            (eid, alias, alias_lang)
+            for eid, aliases in zip(entity_ids, entity_aliases)
+            for alias, alias_lang in aliases
+        )
+        await repo.set_entity_attributes_bulk(
+            (eid, attr_ids[attr_key], value)
+            for eid, attrs in zip(entity_ids, entity_attrs)
+            for attr_key, value in attrs.items()
+            if attr_key in attr_ids
+        )
+    count = len(entity_ids)
 
     logger.info("Generated database with %d entities at %s", count, db_path)
     await repo.close()
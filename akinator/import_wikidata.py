@@ -23,7 +23,7 @@ import time
 import urllib.parse
 import urllib.request
 
-from akinator.db.repository import Repository
+from akinator.db.repository import IMPORT_PROFILE, Repository
 
 logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s")
 logger = logging.getLogger("wikidata_import")
@@ -454,18 +454,22 @@ async def import_people(repo: Repository, attr_ids: dict[str, int],
                 attrs.update(_occupation_attrs(_val(row, "occupations")))
 
                 lang = "ru" if (_is_cyrillic(name)) else "en"
-                eid = await repo.add_entity(name, "wikidata", "person", lang)
-
-                # Add Russian alias if both names exist and differ
-                if en_name and ru_name and en_name != ru_name:
-                    if name == en_name:
-                        await repo.add_alias(eid, ru_name, "ru")
-                    else:
-                        await repo.add_alias(eid, en_name, "en")
-
-                for attr_key, value in attrs.items():
-                    if attr_key in attr_ids:
-                        await repo.set_entity_attribute(eid, attr_ids[attr_key], value)
+                # One commit per entity
+                async with repo.transaction():
+                    eid = await repo.add_entity(name, "wikidata", "person", lang)
+
+                    # Add Russian alias if both names exist and differ
+                    if en_name and ru_name and en_name != ru_name:
+                        if name == en_name:
+                            await repo.add_alias(eid, ru_name, "ru")
+                        else:
+                            await repo.add_alias(eid, en_name, "en")
+
+                    await repo.set_entity_attributes_bulk(
+                        (eid, attr_ids[attr_key], value)
+                        for attr_key, value in attrs.items()
+                        if attr_key in attr_ids
+                    )
 
                 existing_names.add(name.lower())
                 count += 1
@@ -528,17 +532,21 @@ async def import_fictional(repo: Repository, attr_ids: dict[str, int],
                 attrs.update(_universe_attrs(_val(row, "universes"), _val(row, "medias")))
 
                 lang = "ru" if _is_cyrillic(name) else "en"
-                eid = await repo.add_entity(name, "wikidata", "character", lang)
-
-                if en_name and ru_name and en_name != ru_name:
-                    if name == en_name:
-                        await repo.add_alias(eid, ru_name, "ru")
-                    else:
-                        await repo.add_alias(eid, en_name, "en")
-
-                for attr_key, value in attrs.items():
-                    if attr_key in attr_ids:
-                        await repo.set_entity_attribute(eid, attr_ids[attr_key], value)
+                # One commit per entity
+                async with repo.transaction():
+                    eid = await repo.add_entity(name, "wikidata", "character", lang)
+
+                    if en_name and ru_name and en_name != ru_name:
+                        if name == en_name:
+                            await repo.add_alias(eid, ru_name, "ru")
+                        else:
+                            await repo.add_alias(eid, en_name, "en")
+
+                    await repo.set_entity_attributes_bulk(
+                        (eid, attr_ids[attr_key], value)
+                        for attr_key, value in attrs.items()
+                        if attr_key in attr_ids
+                    )
 
                 existing_names.add(name.lower())
                 count += 1
@@ -573,15 +581,16 @@ async def main() -> None:
         i += 1
 
     os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
-    repo = Repository(db_path)
+    repo = Repository(db_path, IMPORT_PROFILE)
     await repo.init_db()
 
     # Ensure attributes exist
     existing_attrs = await repo.get_all_attributes()
     if not existing_attrs:
         logger.info("Creating attributes...")
-        for key, q_ru, q_en, cat in ATTRIBUTES:
-            await repo.add_attribute(key, q_ru, q_en, cat)
+        async with repo.transaction():
+            for key, q_ru, q_en, cat in ATTRIBUTES:
+                await repo.add_attribute(key, q_ru, q_en, cat)
 
     attr_list = await repo.get_all_attributes()
     attr_ids = {a.key: a.id for a in attr_list}
@@ -20,7 +20,7 @@ import urllib.parse
 import urllib.request
 from pathlib import Path
 
-from akinator.db.repository import Repository
+from akinator.db.repository import IMPORT_PROFILE, Repository
 
 logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s")
 logger = logging.getLogger("wikidata_rest")
@@ -1127,19 +1127,23 @@ async def import_from_searches(
 
             # Save to database
             lang = "ru" if ru_label and not en_label else "en"
-            eid = await repo.add_entity(name, f"wikidata:{qid}", "character", lang)
-
-            # Add alias
-            if en_label and ru_label and en_label != ru_label:
-                if name == en_label:
-                    await repo.add_alias(eid, ru_label, "ru")
-                else:
-                    await repo.add_alias(eid, en_label, "en")
-
-            # Save attributes
-            for attr_key, value in attrs.items():
-                if attr_key in attr_ids:
-                    await repo.set_entity_attribute(eid, attr_ids[attr_key], value)
+            # One commit per entity
+            async with repo.transaction():
+                eid = await repo.add_entity(name, f"wikidata:{qid}", "character", lang)
+
+                # Add alias
+                if en_label and ru_label and en_label != ru_label:
+                    if name == en_label:
+                        await repo.add_alias(eid, ru_label, "ru")
+                    else:
+                        await repo.add_alias(eid, en_label, "en")
+
+                # Save attributes
+                await repo.set_entity_attributes_bulk(
+                    (eid, attr_ids[attr_key], value)
+                    for attr_key, value in attrs.items()
+                    if attr_key in attr_ids
+                )
 
             existing_names.add(name.lower())
             imported_qids.add(qid)
@@ -1211,17 +1215,20 @@ async def import_from_searches(
             )
 
             lang = "ru" if ru_label and not en_label else "en"
-            eid = await repo.add_entity(name, f"wikidata:{qid}", "character", lang)
+            async with repo.transaction():
+                eid = await repo.add_entity(name, f"wikidata:{qid}", "character", lang)
 
-            if en_label and ru_label and en_label != ru_label:
-                if name == en_label:
-                    await repo.add_alias(eid, ru_label, "ru")
-                else:
-                    await repo.add_alias(eid, en_label, "en")
+                if en_label and ru_label and en_label != ru_label:
+                    if name == en_label:
+                        await repo.add_alias(eid, ru_label, "ru")
+                    else:
+                        await repo.add_alias(eid, en_label, "en")
 
-            for attr_key, value in attrs.items():
-                if attr_key in attr_ids:
-                    await repo.set_entity_attribute(eid, attr_ids[attr_key], value)
+                await repo.set_entity_attributes_bulk(
+                    (eid, attr_ids[attr_key], value)
+                    for attr_key, value in attrs.items()
+                    if attr_key in attr_ids
+                )
 
             existing_names.add(name.lower())
             imported_qids.add(qid)
@@ -1264,15 +1271,16 @@ async def main() -> None:
         i += 1
 
     os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
-    repo = Repository(db_path)
+    repo = Repository(db_path, IMPORT_PROFILE)
     await repo.init_db()
 
     # Ensure attributes exist
     existing_attrs = await repo.get_all_attributes()
     if not existing_attrs:
         logger.info("Creating %d attributes...", len(ATTRIBUTES))
-        for key, q_ru, q_en, cat in ATTRIBUTES:
-            await repo.add_attribute(key, q_ru, q_en, cat)
+        async with repo.transaction():
+            for key, q_ru, q_en, cat in ATTRIBUTES:
+                await repo.add_attribute(key, q_ru, q_en, cat)
 
     attr_list = await repo.get_all_attributes()
     attr_ids = {a.key: a.id for a in attr_list}
@@ -6,7 +6,7 @@ import asyncio
 import os
 import logging
 
-from akinator.db.repository import Repository
+from akinator.db.repository import IMPORT_PROFILE, Repository
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger("akinator.seed")
@@ -1367,7 +1367,7 @@ ENTITIES = [
 
 async def seed() -> None:
     os.makedirs(os.path.dirname(DB_PATH) or ".", exist_ok=True)
-    repo = Repository(DB_PATH)
+    repo = Repository(DB_PATH, IMPORT_PROFILE)
     await repo.init_db()
 
     # Check if already seeded
@@ -1377,27 +1377,35 @@ async def seed() -> None:
         await repo.close()
         return
 
-    # Insert attributes
-    attr_ids: dict[str, int] = {}
-    for key, q_ru, q_en, category in ATTRIBUTES:
-        aid = await repo.add_attribute(key, q_ru, q_en, category)
-        attr_ids[key] = aid
-        logger.info("  Attribute: %s (id=%d)", key, aid)
-
-    # Insert entities
-    for name, desc, etype, lang, aliases, attrs in ENTITIES:
-        eid = await repo.add_entity(name, desc, etype, lang)
-        logger.info("  Entity: %s (id=%d)", name, eid)
+    async with repo.transaction():
+        # Insert attributes
+        attr_ids: dict[str, int] = {}
+        for key, q_ru, q_en, category in ATTRIBUTES:
+            aid = await repo.add_attribute(key, q_ru, q_en, category)
+            attr_ids[key] = aid
+            logger.info("  Attribute: %s (id=%d)", key, aid)
+
+        # Insert entities
+        entity_ids = await repo.add_entities_bulk(
+            [(name, desc, etype, lang) for name, desc, etype, lang, _, _ in ENTITIES]
+        )
+        for eid, (name, *_rest) in zip(entity_ids, ENTITIES):
+            logger.info("  Entity: %s (id=%d)", name, eid)
 
         # Add aliases
-        for alias in aliases:
-            alias_lang = "ru" if any(ord(c) > 127 for c in alias) else "en"
-            await repo.add_alias(eid, alias, alias_lang)
+        await repo.add_aliases_bulk(
+            (eid, alias, "ru" if any(ord(c) > 127 for c in alias) else "en")
+            for eid, (_, _, _, _, aliases, _) in zip(entity_ids, ENTITIES)
+            for alias in aliases
+        )
 
         # Add attribute values
-        for attr_key, value in attrs.items():
-            if attr_key in attr_ids:
-                await repo.set_entity_attribute(eid, attr_ids[attr_key], value)
+        await repo.set_entity_attributes_bulk(
+            (eid, attr_ids[attr_key], value)
+            for eid, (_, _, _, _, _, attrs) in zip(entity_ids, ENTITIES)
+            for attr_key, value in attrs.items()
+            if attr_key in attr_ids
+        )
 
     logger.info("Seeded %d attributes, %d entities.", len(ATTRIBUTES), len(ENTITIES))
     await repo.close()
@@ -33,10 +33,9 @@ async def preview_learning(repo: Repository, min_feedback: int = 3) -> None:
 
     # Get entity-attribute pairs with enough feedback
     cursor = await db.execute(
-        """SELECT entity_id, attribute_id, COUNT(*) as feedback_count
-           FROM user_feedback
-           GROUP BY entity_id, attribute_id
-           HAVING feedback_count >= ?
+        """SELECT entity_id, attribute_id, yes + prob_yes + dk + prob_no + no AS feedback_count
+           FROM feedback_counts
+           WHERE feedback_count >= ?
            ORDER BY feedback_count DESC
            LIMIT 20""",
         (min_feedback,),
@@ -96,8 +95,8 @@ async def main():
 
     # Count total feedback
     db = await repo._conn()
-    cursor = await db.execute("SELECT COUNT(*) FROM user_feedback")
-    total_feedback = (await cursor.fetchone())[0]
+    cursor = await db.execute("SELECT TOTAL(yes + prob_yes + dk + prob_no + no) FROM feedback_counts")
+    total_feedback = int((await cursor.fetchone())[0])
 
     logger.info("=" * 80)
     logger.info("User Feedback Learning System")
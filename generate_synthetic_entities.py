@@ -12,7 +12,7 @@ import asyncio
 import random
 import sys
 
-from akinator.db.repository import Repository
+from akinator.db.repository import IMPORT_PROFILE, Repository
 from akinator.generate_db import ATTRIBUTES
 
 # Entity name templates
@@ -199,15 +199,16 @@ async def generate_entities(db_path: str, count: int, people_ratio: float = 0.6)
     print(f"   {int(count * people_ratio)} people, {int(count * (1-people_ratio))} fictional")
     print()
 
-    repo = Repository(db_path)
+    repo = Repository(db_path, IMPORT_PROFILE)
     await repo.init_db()
 
     # Create attributes if needed
     existing_attrs = await repo.get_all_attributes()
     if not existing_attrs:
         print("📝 Creating attributes...")
-        for key, q_ru, q_en, cat in ATTRIBUTES:
-            await repo.add_attribute(key, q_ru, q_en, cat)
+        async with repo.transaction():
+            for key, q_ru, q_en, cat in ATTRIBUTES:
+                await repo.add_attribute(key, q_ru, q_en, cat)
 
     attr_list = await repo.get_all_attributes()
     attr_ids = {a.key: a.id for a in attr_list}
@@ -222,10 +223,14 @@ async def generate_entities(db_path: str, count: int, people_ratio: float = 0.6)
         name = generate_person_name(i)
         attrs = generate_person_attributes()
 
-        eid = await repo.add_entity(name, "synthetic", "person", "en")
-        for attr_key, value in attrs.items():
-            if attr_key in attr_ids:
-                await repo.set_entity_attribute(eid, attr_ids[attr_key], value)
+        # One commit per entity
+        async with repo.transaction():
+            eid = await repo.add_entity(name, "synthetic", "person", "en")
+            await repo.set_entity_attributes_bulk(
+                (eid, attr_ids[attr_key], value)
+                for attr_key, value in attrs.items()
+                if attr_key in attr_ids
+            )
 
         if i % 100 == 0 or i == people_count:
             print(f"  Progress: {i}/{people_count}")
@@ -236,10 +241,13 @@ async def generate_entities(db_path: str, count: int, people_ratio: float = 0.6)
         name = generate_fictional_name(i)
         attrs = generate_fictional_attributes()
 
-        eid = await repo.add_entity(name, "synthetic", "fictional", "en")
-        for attr_key, value in attrs.items():
-            if attr_key in attr_ids:
-                await repo.set_entity_attribute(eid, attr_ids[attr_key], value)
+        async with repo.transaction():
+            eid = await repo.add_entity(name, "synthetic", "fictional", "en")
+            await repo.set_entity_attributes_bulk(
+                (eid, attr_ids[attr_key], value)
+                for attr_key, value in attrs.items()
+                if attr_key in attr_ids
+            )
 
         if i % 100 == 0 or i == fictional_count:
             print(f"  Progress: {i}/{fictional_count}")
@@ -17,7 +17,7 @@ import logging
 import os
 
 from akinator.data.categories import TEMPLATES
-from akinator.db.repository import Repository
+from akinator.db.repository import IMPORT_PROFILE, Repository
 from entity_to_category_map import get_category, get_overrides
 
 logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s")
@@ -135,14 +135,15 @@ async def migrate():
     if os.path.exists(new_db_path):
         os.remove(new_db_path)
 
-    new_repo = Repository(new_db_path)
+    new_repo = Repository(new_db_path, IMPORT_PROFILE)
     await new_repo.init_db()
 
-    # Add all 62 attributes
+    # Add all 62 attributes (one commit)
     attr_ids = {}
-    for key, q_ru, q_en, cat in ATTRIBUTES_62:
-        aid = await new_repo.add_attribute(key, q_ru, q_en, cat)
-        attr_ids[key] = aid
+    async with new_repo.transaction():
+        for key, q_ru, q_en, cat in ATTRIBUTES_62:
+            aid = await new_repo.add_attribute(key, q_ru, q_en, cat)
+            attr_ids[key] = aid
 
     logger.info(f"Created {len(attr_ids)} attributes in new DB")
 
@@ -156,18 +157,6 @@ async def migrate():
             skipped += 1
             continue
 
-        # Create entity
-        new_eid = await new_repo.add_entity(
-            old_entity.name,
-            category,
-            old_entity.entity_type,
-            old_entity.language,
-        )
-
-        # Add aliases
-        for alias_text, alias_lang in entity_aliases.get(old_entity.id, []):
-            await new_repo.add_alias(new_eid, alias_text, alias_lang)
-
         # Get full attribute set from template
         template = TEMPLATES[category]
         old_attrs = all_attrs.get(old_entity.id, {})
@@ -176,17 +165,32 @@ async def migrate():
         entity_overrides = get_overrides(old_entity.name) or {}
 
         # Merge: template → old values → entity overrides
+        values = {}
         for attr_key in template.keys():
             if attr_key not in attr_ids:
                 continue
 
             # Priority: entity overrides > old values > template
             if attr_key in entity_overrides:
-                value = entity_overrides[attr_key]
+                values[attr_key] = entity_overrides[attr_key]
             else:
-                value = old_attrs.get(attr_key, template[attr_key])
-
-            await new_repo.set_entity_attribute(new_eid, attr_ids[attr_key], value)
+                values[attr_key] = old_attrs.get(attr_key, template[attr_key])
+
+        # One commit per entity
+        async with new_repo.transaction():
+            new_eid = await new_repo.add_entity(
+                old_entity.name,
+                category,
+                old_entity.entity_type,
+                old_entity.language,
+            )
+            await new_repo.add_aliases_bulk(
+                (new_eid, alias_text, alias_lang)
+                for alias_text, alias_lang in entity_aliases.get(old_entity.id, [])
+            )
+            await new_repo.set_entity_attributes_bulk(
+                (new_eid, attr_ids[key], value) for key, value in values.items()
+            )
 
         if new_eid % 50 == 0:
             logger.info(f"  ... migrated {new_eid} entities")
@@ -19,7 +19,7 @@ from datetime import datetime
 
 sys.path.insert(0, os.path.dirname(__file__))
 
-from akinator.db.repository import Repository
+from akinator.db.repository import IMPORT_PROFILE, Repository
 
 # New attributes to add (key, question_ru, question_en, category)
 NEW_ATTRIBUTES = [
@@ -315,7 +315,7 @@ async def migrate():
     shutil.copy2(db_path, backup_path)
 
     print("Connecting to database...")
-    repo = Repository(db_path)
+    repo = Repository(db_path, IMPORT_PROFILE)
     await repo.init_db()
 
     # Get existing attributes
@@ -325,11 +325,12 @@ async def migrate():
 
     # Add new attributes
     new_count = 0
-    for key, q_ru, q_en, cat in NEW_ATTRIBUTES:
-        if key not in existing_keys:
-            await repo.add_attribute(key, q_ru, q_en, cat)
-            new_count += 1
-            print(f"  Added: {key}")
+    async with repo.transaction():
+        for key, q_ru, q_en, cat in NEW_ATTRIBUTES:
+            if key not in existing_keys:
+                await repo.add_attribute(key, q_ru, q_en, cat)
+                new_count += 1
+                print(f"  Added: {key}")
 
     print(f"Added {new_count} new attributes")
 
@@ -362,9 +363,12 @@ async def migrate():
         updates = {**cat_updates, **entity_updates}
 
         if updates:
-            for key, value in updates.items():
-                if key in attr_map:
-                    await repo.set_entity_attribute(entity.id, attr_map[key], value)
+            # One commit per entity
+            await repo.set_entity_attributes_bulk(
+                (entity.id, attr_map[key], value)
+                for key, value in updates.items()
+                if key in attr_map
+            )
 
             updated += 1
             if updated % 20 == 0:
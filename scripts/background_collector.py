@@ -35,7 +35,7 @@ from typing import Optional
 # Add parent dir to path
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
-from akinator.db.repository import Repository
+from akinator.db.repository import IMPORT_PROFILE, Repository
 
 # Setup logging
 logging.basicConfig(
@@ -659,19 +659,22 @@ async def collect_batch(
             if not attrs:  # Invalid entity
                 continue
 
-            # Save entity
+            # Save entity (one commit per entity)
             lang = "ru" if ru_label and not en_label else "en"
-            eid = await repo.add_entity(name, f"wikidata:{qid}", category, lang)
+            async with repo.transaction():
+                eid = await repo.add_entity(name, f"wikidata:{qid}", category, lang)
 
-            # Add alias
-            if en_label and ru_label and en_label != ru_label:
-                alias = ru_label if name == en_label else en_label
-                await repo.add_alias(eid, alias, "ru" if name == en_label else "en")
+                # Add alias
+                if en_label and ru_label and en_label != ru_label:
+                    alias = ru_label if name == en_label else en_label
+                    await repo.add_alias(eid, alias, "ru" if name == en_label else "en")
 
-            # Save attributes
-            for attr_key, value in attrs.items():
-                if attr_key in attr_ids:
-                    await repo.set_entity_attribute(eid, attr_ids[attr_key], value)
+                # Save attributes
+                await repo.set_entity_attributes_bulk(
+                    (eid, attr_ids[attr_key], value)
+                    for attr_key, value in attrs.items()
+                    if attr_key in attr_ids
+                )
 
             existing_names.add(name.lower())
             count += 1
@@ -694,15 +697,16 @@ async def run_collector(
 
     # Initialize database
     os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
-    repo = Repository(db_path)
+    repo = Repository(db_path, IMPORT_PROFILE)
     await repo.init_db()
 
     # Ensure attributes exist
     existing_attrs = await repo.get_all_attributes()
     if not existing_attrs:
         logger.info("Creating %d attributes...", len(ATTRIBUTES))
-        for key, q_ru, q_en, cat in ATTRIBUTES:
-            await repo.add_attribute(key, q_ru, q_en, cat)
+        async with repo.transaction():
+            for key, q_ru, q_en, cat in ATTRIBUTES:
+                await repo.add_attribute(key, q_ru, q_en, cat)
 
     attr_list = await repo.get_all_attributes()
     attr_ids = {a.key: a.id for a in attr_list}
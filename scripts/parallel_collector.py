@@ -27,7 +27,7 @@ from typing import Optional
 
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
-from akinator.db.repository import Repository
+from akinator.db.repository import IMPORT_PROFILE, Repository
 
 logging.basicConfig(
     level=logging.INFO,
@@ -590,14 +590,18 @@ async def worker(
 
         # Save
         try:
-            eid = await repo.add_entity(name, f"wikidata:{qid}", category, "en")
+            # One commit per entity; other workers' writes queue behind it
+            async with repo.transaction():
+                eid = await repo.add_entity(name, f"wikidata:{qid}", category, "en")
 
-            if ru_label and ru_label != name:
-                await repo.add_alias(eid, ru_label, "ru")
+                if ru_label and ru_label != name:
+                    await repo.add_alias(eid, ru_label, "ru")
 
-            for attr_key, value in attrs.items():
-                if attr_key in attr_ids:
-                    await repo.set_entity_attribute(eid, attr_ids[attr_key], value)
+                await repo.set_entity_attributes_bulk(
+                    (eid, attr_ids[attr_key], value)
+                    for attr_key, value in attrs.items()
+                    if attr_key in attr_ids
+                )
 
             existing_names.add(name.lower())
             count += 1
@@ -620,15 +624,16 @@ async def main(db_path: str, num_workers: int):
 
     # Init DB
     os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
-    repo = Repository(db_path)
+    repo = Repository(db_path, IMPORT_PROFILE)
     await repo.init_db()
 
     # Ensure attributes
     existing_attrs = await repo.get_all_attributes()
     if not existing_attrs:
         logger.info(f"Creating {len(ATTRIBUTES)} attributes...")
-        for key, q_ru, q_en, cat in ATTRIBUTES:
-            await repo.add_attribute(key, q_ru, q_en, cat)
+        async with repo.transaction():
+            for key, q_ru, q_en, cat in ATTRIBUTES:
+                await repo.add_attribute(key, q_ru, q_en, cat)
 
     attr_list = await repo.get_all_attributes()
     attr_ids = {a.key: a.id for a in attr_list}
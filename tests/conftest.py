@@ -108,3 +108,7 @@ def tmp_db_path() -> str:
     os.close(fd)
     yield path
     os.unlink(path)
+    # Left behind by WAL-mode connections that were not closed
+    for suffix in ("-wal", "-shm"):
+        if os.path.exists(path + suffix):
+            os.unlink(path + suffix)
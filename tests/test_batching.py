@@ -0,0 +1,67 @@
+"""Tests for the micro-batcher used to group question selection.
+
+Covers:
+- Concurrent submits within the window share one batch
+- Flushing early at max_size
+- Errors reach every caller of the batch
+- Coroutine batch functions
+"""
+
+from __future__ import annotations
+
+import asyncio
+
+from akinator.bot.batching import MicroBatcher
+
+
+class TestMicroBatcher:
+    """Requests are grouped and results routed back in order."""
+
+    async def test_concurrent_submits_share_a_batch(self):
+        calls: list[list[int]] = []
+
+        def process(items: list[int]) -> list[int]:
+            calls.append(items)
+            return [x * 10 for x in items]
+
+        batcher = MicroBatcher(process, window=0.01, max_size=100)
+        results = await asyncio.gather(*(batcher.submit(i) for i in range(5)))
+        assert results == [0, 10, 20, 30, 40]
+        assert calls == [[0, 1, 2, 3, 4]]
+        assert batcher.mean_batch_size == 5
+
+    async def test_flushes_at_max_size(self):
+        calls: list[list[int]] = []
+
+        def process(items: list[int]) -> list[int]:
+            calls.append(items)
+            return items
+
+        batcher = MicroBatcher(process, window=10.0, max_size=2)
+        results = await asyncio.gather(*(batcher.submit(i) for i in range(4)))
+        assert results == [0, 1, 2, 3]
+        assert calls == [[0, 1], [2, 3]]
+
+    async def test_error_reaches_every_caller(self):
+        def process(items: list[int]) -> list[int]:
+            raise RuntimeError("boom")
+
+        batcher = MicroBatcher(process, window=0.001, max_size=10)
+        results = await asyncio.gather(
+            batcher.submit(1), batcher.submit(2), return_exceptions=True,
+        )
+        assert all(isinstance(r, RuntimeError) for r in results)
+
+    async def test_later_submits_start_a_new_batch(self):
+        batcher = MicroBatcher(lambda items: items, window=0.001, max_size=10)
+        assert await batcher.submit(1) == 1
+        assert await batcher.submit(2) == 2
+        assert batcher.batches == 2
+
+    async def test_async_process(self):
+        async def process(items: list[int]) -> list[int]:
+            await asyncio.sleep(0)
+            return [x + 1 for x in items]
+
+        batcher = MicroBatcher(process, window=0.001, max_size=10)
+        assert await asyncio.gather(batcher.submit(1), batcher.submit(2)) == [2, 3]
@@ -0,0 +1,108 @@
+"""Tests for the engine executor and event-loop lag monitor.
+
+Covers:
+- Jobs run on the worker pool, not the event loop
+- Back-pressure when max_pending jobs are in flight
+- Per-job timeouts
+- Process pool with picklable jobs, and state installed once per worker
+- Event-loop lag measurement
+"""
+
+from __future__ import annotations
+
+import asyncio
+import threading
+import time
+
+import pytest
+
+from akinator.bot.executor import EngineExecutor, LoopLagMonitor
+
+
+_state: int | None = None
+
+
+def _square(x: int) -> int:
+    return x * x
+
+
+def _set_state(value: int) -> None:
+    global _state
+    _state = value
+
+
+def _get_state() -> int | None:
+    return _state
+
+
+class TestEngineExecutor:
+    """Submitting jobs and bounding the queue."""
+
+    async def test_runs_on_worker_thread(self):
+        executor = EngineExecutor(max_workers=2)
+        name = await executor.run(lambda: threading.current_thread().name)
+        assert name.startswith("engine")
+        assert executor.completed == 1
+        executor.shutdown()
+
+    async def test_back_pressure_limits_in_flight_jobs(self):
+        executor = EngineExecutor(max_workers=4, max_pending=1)
+        release = threading.Event()
+        first = asyncio.ensure_future(executor.run(release.wait, 5))
+        second = asyncio.ensure_future(executor.run(_square, 3))
+        await asyncio.sleep(0.05)
+        assert executor.in_flight == 1
+        assert executor.waiting == 1
+        assert not second.done()
+        release.set()
+        assert await first is True
+        assert await second == 9
+        executor.shutdown()
+
+    async def test_timeout_keeps_slot_until_job_finishes(self):
+        executor = EngineExecutor(max_workers=1, max_pending=1, timeout=0.05)
+        with pytest.raises(asyncio.TimeoutError):
+            await executor.run(time.sleep, 0.2)
+        assert executor.timeouts == 1
+        assert executor.in_flight == 1
+        await asyncio.sleep(0.3)
+        assert executor.in_flight == 0
+        assert await executor.run(_square, 4) == 16
+        executor.shutdown()
+
+    async def test_job_errors_propagate(self):
+        executor = EngineExecutor()
+        with pytest.raises(ZeroDivisionError):
+            await executor.run(lambda: 1 / 0)
+        executor.shutdown()
+
+    async def test_process_pool(self):
+        executor = EngineExecutor(kind="process", max_workers=1)
+        assert await executor.run(_square, 7) == 49
+        executor.shutdown()
+
+    async def test_process_initializer(self):
+        executor = EngineExecutor(kind="process", max_workers=1)
+        executor.set_initializer(_set_state, 1)
+        assert await executor.run(_get_state) == 1
+        # New state retires the running workers
+        executor.set_initializer(_set_state, 2)
+        assert await executor.run(_get_state) == 2
+        executor.shutdown()
+
+    def test_rejects_unknown_kind(self):
+        with pytest.raises(ValueError):
+            EngineExecutor(kind="fiber")
+
+
+class TestLoopLagMonitor:
+    """Blocking the loop shows up as lag."""
+
+    async def test_measures_blocking(self):
+        monitor = LoopLagMonitor(interval=0.01, warn_after=10.0)
+        monitor.start()
+        await asyncio.sleep(0.02)
+        time.sleep(0.1)  # block the loop
+        await asyncio.sleep(0.03)
+        await monitor.stop()
+        assert monitor.max_lag >= 0.05
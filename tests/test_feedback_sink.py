@@ -0,0 +1,134 @@
+"""Tests for the Feedback Sink (write-behind feedback queue).
+
+Covers:
+- submit() queues without touching the database; depth reports the queue
+- Size and time triggers, batching into transactions of batch_size
+- close() writes what is left (graceful shutdown)
+- Failed writes are retried in order; overflow drops the oldest records
+"""
+
+from __future__ import annotations
+
+import asyncio
+
+import pytest
+
+from akinator.db.feedback_sink import FeedbackRecord, FeedbackSink
+from akinator.db.repository import Repository
+
+
+@pytest.fixture
+async def repo(tmp_db_path: str):
+    repo = Repository(tmp_db_path)
+    await repo.init_db()
+    yield repo
+    await repo.close()
+
+
+def _records(n: int, entity_id: int = 1) -> list[FeedbackRecord]:
+    return [FeedbackRecord(entity_id, j, "yes", 1.0, "en") for j in range(1, n + 1)]
+
+
+async def _count(repo: Repository) -> int:
+    async with repo._read() as db:
+        cursor = await db.execute("SELECT COUNT(*) FROM user_feedback")
+        return (await cursor.fetchone())[0]
+
+
+async def _wait_for(condition, timeout: float = 1.0) -> None:
+    for _ in range(int(timeout / 0.01)):
+        if condition():
+            return
+        await asyncio.sleep(0.01)
+    raise AssertionError("condition not met")
+
+
+class FlakyRepo:
+    """Fails the first `failures` writes, then records the batches."""
+
+    def __init__(self, failures: int = 0) -> None:
+        self.failures = failures
+        self.batches: list[list[FeedbackRecord]] = []
+
+    async def track_feedback_bulk(self, records) -> None:
+        if self.failures:
+            self.failures -= 1
+            raise RuntimeError("database is locked")
+        self.batches.append(list(records))
+
+
+class TestQueue:
+    """submit() and flush()."""
+
+    async def test_submit_does_not_write(self, repo: Repository):
+        sink = FeedbackSink(repo)
+        sink.submit(_records(4))
+        assert sink.depth == 4
+        assert await _count(repo) == 0
+        assert await sink.flush()
+        assert sink.depth == 0 and sink.written == 4
+        assert await repo.get_feedback_stats(1, 2) == {"yes": 1}
+
+    async def test_batches(self):
+        fake = FlakyRepo()
+        sink = FeedbackSink(fake, batch_size=3)
+        sink.submit(_records(7))
+        await sink.flush()
+        assert [len(b) for b in fake.batches] == [3, 3, 1]
+        assert sink.batches == 3
+
+    async def test_failed_write_retried_in_order(self):
+        fake = FlakyRepo(failures=1)
+        sink = FeedbackSink(fake, batch_size=2)
+        sink.submit(_records(3))
+        assert not await sink.flush()
+        assert sink.depth == 3 and sink.failures == 1
+        assert await sink.flush()
+        assert [r.attribute_id for b in fake.batches for r in b] == [1, 2, 3]
+
+    def test_overflow_drops_oldest(self):
+        sink = FeedbackSink(FlakyRepo(), max_pending=5)
+        sink.submit(_records(4))
+        sink.submit(_records(3, entity_id=2))
+        assert sink.depth == 5 and sink.dropped == 2
+        assert [r.entity_id for r in sink._pending] == [1, 1, 2, 2, 2]
+
+
+class TestBackgroundWrites:
+    """Triggers and shutdown."""
+
+    async def test_size_trigger(self, repo: Repository):
+        sink = FeedbackSink(repo, batch_size=5, flush_interval=60)
+        sink.start()
+        sink.submit(_records(3))
+        await asyncio.sleep(0.05)
+        assert sink.written == 0  # below the batch size, interval not reached
+        sink.submit(_records(2, entity_id=2))
+        await _wait_for(lambda: sink.written == 5)
+        await sink.close()
+
+    async def test_time_trigger(self, repo: Repository):
+        sink = FeedbackSink(repo, batch_size=100, flush_interval=0.02)
+        sink.start()
+        sink.submit(_records(2))
+        await _wait_for(lambda: sink.written == 2)
+        assert await _count(repo) == 2
+        await sink.close()
+
+    async def test_close_writes_remaining(self, repo: Repository):
+        sink = FeedbackSink(repo, batch_size=100, flush_interval=60)
+        sink.start()
+        sink.submit(_records(6))
+        await asyncio.sleep(0)
+        await sink.close()
+        assert sink.depth == 0
+        assert await _count(repo) == 6
+
+    async def test_retries_after_failure(self):
+        fake = FlakyRepo(failures=1)
+        sink = FeedbackSink(fake, batch_size=1, flush_interval=0.01)
+        sink.start()
+        sink.submit(_records(1))
+        await _wait_for(lambda: sink.written == 1)
+        assert sink.failures == 1
+        await sink.close()
@@ -3,12 +3,15 @@
 Covers:
 - /start command
 - /new command (start game)
-- Answer callback handling
+- Answer callback handling (stale taps, engine failures)
 - Guess confirmation callbacks
+- Opening book for first questions, rebuilt in the background after learning
+- Catalogue index lookups, kept in step with learning
 - /top command
 - /why command
 - /giveup command
 - /lang command
+- Session changes kept by a write-behind store across flushes
 - Error handling (no active session, etc.)
 
 Note: These tests use mocked aiogram objects and do NOT require a real Telegram connection.
@@ -16,11 +19,12 @@ Note: These tests use mocked aiogram objects and do NOT require a real Telegram
 
 from __future__ import annotations
 
+import asyncio
 from unittest.mock import AsyncMock, MagicMock, patch
 
 import pytest
 
-from akinator.db.models import Answer, GameMode, GameSession
+from akinator.db.models import Answer, GameMode, GameSession, QAPair
 
 
 class TestStartCommand:
@@ -103,6 +107,234 @@ class TestAnswerCallbacks:
         callback.answer.assert_called()
 
 
+class TestAnswerConsistency:
+    """One answer per question, and a failed engine job leaves the session as it was."""
+
+    @staticmethod
+    def _pending_session():
+        from akinator.bot import handlers
+        from akinator.engine.session import UNIFORM_PRIOR
+        from tests.conftest import SAMPLE_ATTRIBUTES
+
+        session = GameSession(session_id="pending", user_id=42, mode=GameMode.ASKING)
+        handlers._session_manager.init_candidates(
+            session, handlers.get_knowledge_base().entity_ids, prior=UNIFORM_PRIOR,
+        )
+        session.asked_attributes.append(SAMPLE_ATTRIBUTES[0].id)
+        return session
+
+    @staticmethod
+    def _callback(data: str):
+        callback = AsyncMock()
+        callback.from_user = MagicMock(id=42)
+        callback.data = data
+        return callback
+
+    @pytest.mark.asyncio
+    async def test_double_tap_answers_once(self):
+        from akinator.bot import handlers
+        from tests.conftest import SAMPLE_ATTRIBUTES, SAMPLE_ENTITIES
+
+        await handlers.set_game_data(list(SAMPLE_ENTITIES), list(SAMPLE_ATTRIBUTES))
+        try:
+            store = {42: self._pending_session()}
+            data = f"answer:yes:{SAMPLE_ATTRIBUTES[0].id}"
+            first, second = self._callback(data), self._callback(data)
+            with patch("akinator.bot.handlers.get_session_store", return_value=store):
+                await asyncio.gather(
+                    handlers.handle_answer_callback(first),
+                    handlers.handle_answer_callback(second),
+                )
+
+            session = store[42]
+            assert [qa.attribute_id for qa in session.history] == [SAMPLE_ATTRIBUTES[0].id]
+            assert session.asked_attributes[0] == SAMPLE_ATTRIBUTES[0].id
+            assert len(session.asked_attributes) == 2
+            assert session.asked_attributes[1] != SAMPLE_ATTRIBUTES[0].id
+            first.message.edit_text.assert_called_once()
+            second.message.edit_text.assert_not_called()
+            second.answer.assert_called_once_with()
+        finally:
+            await handlers.set_game_data([], [])
+
+    @pytest.mark.asyncio
+    async def test_old_question_button_is_ignored(self):
+        from akinator.bot import handlers
+        from tests.conftest import SAMPLE_ATTRIBUTES, SAMPLE_ENTITIES
+
+        await handlers.set_game_data(list(SAMPLE_ENTITIES), list(SAMPLE_ATTRIBUTES))
+        try:
+            store = {42: self._pending_session()}
+            callback = self._callback(f"answer:no:{SAMPLE_ATTRIBUTES[1].id}")
+            with patch("akinator.bot.handlers.get_session_store", return_value=store):
+                await handlers.handle_answer_callback(callback)
+
+            assert store[42].history == []
+            callback.message.edit_text.assert_not_called()
+        finally:
+            await handlers.set_game_data([], [])
+
+    @pytest.mark.asyncio
+    async def test_timeout_replies_busy_and_keeps_session(self):
+        from akinator.bot import handlers
+        from tests.conftest import SAMPLE_ATTRIBUTES, SAMPLE_ENTITIES
+
+        await handlers.set_game_data(list(SAMPLE_ENTITIES), list(SAMPLE_ATTRIBUTES))
+        try:
+            session = self._pending_session()
+            store = {42: session}
+            callback = self._callback(f"answer:yes:{SAMPLE_ATTRIBUTES[0].id}")
+            with patch("akinator.bot.handlers.get_session_store", return_value=store), \
+                 patch.object(handlers._engine_executor, "run", AsyncMock(side_effect=asyncio.TimeoutError)):
+                await handlers.handle_answer_callback(callback)
+
+            assert store[42] is session
+            assert session.asked_attributes == [SAMPLE_ATTRIBUTES[0].id]
+            assert session.history == []
+            callback.message.edit_text.assert_not_called()
+            callback.answer.assert_called_once_with(handlers._busy_text(session.language))
+
+            # Tapping again once the engine responds answers the same question
+            callback = self._callback(f"answer:yes:{SAMPLE_ATTRIBUTES[0].id}")
+            with patch("akinator.bot.handlers.get_session_store", return_value=store):
+                await handlers.handle_answer_callback(callback)
+            assert [qa.attribute_id for qa in store[42].history] == [SAMPLE_ATTRIBUTES[0].id]
+        finally:
+            await handlers.set_game_data([], [])
+
+
+class TestPersistentSessions:
+    """Changes made after an await still reach a write-behind store."""
+
+    @pytest.mark.asyncio
+    async def test_pending_question_survives_flush_mid_handler(self, tmp_db_path: str):
+        from akinator.bot import handlers
+        from akinator.db.session_store import PersistentSessionStore, SQLiteSessionBackend
+        from tests.conftest import SAMPLE_ATTRIBUTES, SAMPLE_ENTITIES
+
+        await handlers.set_game_data(list(SAMPLE_ENTITIES), list(SAMPLE_ATTRIBUTES))
+        store = PersistentSessionStore(SQLiteSessionBackend(tmp_db_path))
+        try:
+            store[42] = GameSession(session_id="flush", user_id=42, mode=GameMode.WAITING_HINT)
+            callback = AsyncMock()
+            callback.from_user = MagicMock(id=42)
+            callback.data = "hint:skip"
+
+            async def flush_meanwhile(*args, **kwargs):
+                # The background flush runs while the handler awaits Telegram
+                await store.flush()
+
+            callback.answer.side_effect = flush_meanwhile
+            with patch("akinator.bot.handlers.get_session_store", return_value=store):
+                await handlers.handle_hint_callback(callback)
+            await store.close()
+
+            restarted = PersistentSessionStore(SQLiteSessionBackend(tmp_db_path))
+            session = await restarted.aget(42)
+            await restarted.close()
+            assert session.mode == GameMode.ASKING
+            assert len(session.asked_attributes) == len(session.history) + 1
+        finally:
+            await handlers.set_game_data([], [])
+
+
+class TestOpeningBook:
+    """Game data loading builds the opening book used for first questions."""
+
+    @pytest.mark.asyncio
+    async def test_skip_hint_uses_book(self):
+        from akinator.bot import handlers
+        from tests.conftest import SAMPLE_ATTRIBUTES, SAMPLE_ENTITIES
+
+        await handlers.set_game_data(list(SAMPLE_ENTITIES), list(SAMPLE_ATTRIBUTES))
+        try:
+            book = handlers._opening_book
+            assert book is not None
+            assert book.version == handlers.get_knowledge_base().version
+
+            callback = AsyncMock()
+            callback.from_user = MagicMock(id=42)
+            callback.data = "hint:skip"
+            store = {42: GameSession(session_id="book", user_id=42, mode=GameMode.WAITING_HINT)}
+            with patch("akinator.bot.handlers.get_session_store", return_value=store):
+                await handlers.handle_hint_callback(callback)
+
+            assert book.hits == 1
+            first = next(a for a in SAMPLE_ATTRIBUTES if a.key == book.moves[()])
+            assert store[42].asked_attributes == [first.id]
+        finally:
+            await handlers.set_game_data([], [])
+
+    @pytest.mark.asyncio
+    async def test_background_rebuilds_coalesce(self):
+        from akinator.bot import handlers
+        from tests.conftest import SAMPLE_ATTRIBUTES, SAMPLE_ENTITIES
+
+        await handlers.set_game_data(list(SAMPLE_ENTITIES), list(SAMPLE_ATTRIBUTES))
+        try:
+            old_book = handlers._opening_book
+            handlers._knowledge_base = handlers._knowledge_base.with_attributes(
+                SAMPLE_ENTITIES[0].id, {SAMPLE_ATTRIBUTES[0].key: 0.0},
+            )
+            with patch.object(
+                handlers._engine_executor, "run", wraps=handlers._engine_executor.run,
+            ) as run:
+                # Three learned entities in a row, before the first rebuild starts
+                for _ in range(3):
+                    handlers._schedule_opening_book_rebuild()
+                assert handlers._opening_book is old_book
+                await handlers._opening_book_task
+
+            assert run.call_count == 1
+            assert handlers._opening_book.version == handlers.get_knowledge_base().version
+        finally:
+            await handlers.set_game_data([], [])
+
+
+class TestCatalogueIndex:
+    """Handlers look attributes and entities up by id / key, not by scanning."""
+
+    @pytest.mark.asyncio
+    async def test_lookups_after_loading(self):
+        from akinator.bot import handlers
+        from tests.conftest import SAMPLE_ATTRIBUTES, SAMPLE_ENTITIES
+
+        await handlers.set_game_data(list(SAMPLE_ENTITIES), list(SAMPLE_ATTRIBUTES))
+        try:
+            attr = SAMPLE_ATTRIBUTES[2]
+            assert handlers.get_attribute(attr.id) is attr
+            assert handlers._find_attr_by_key(attr.key) is attr
+            assert handlers.get_entity(SAMPLE_ENTITIES[0].id) is SAMPLE_ENTITIES[0]
+            assert handlers.get_attribute(9_999) is None
+        finally:
+            await handlers.set_game_data([], [])
+        assert handlers.get_entity(SAMPLE_ENTITIES[0].id) is None
+
+    @pytest.mark.asyncio
+    async def test_learned_entity_indexed(self, tmp_db_path: str):
+        from akinator.bot import handlers
+        from akinator.db.repository import Repository
+        from tests.conftest import SAMPLE_ATTRIBUTES, SAMPLE_ENTITIES
+
+        await handlers.set_game_data(list(SAMPLE_ENTITIES), list(SAMPLE_ATTRIBUTES))
+        repo = Repository(tmp_db_path)
+        await repo.init_db()
+        attr = SAMPLE_ATTRIBUTES[0]
+        session = GameSession(session_id="learn", user_id=42, mode=GameMode.LEARNING)
+        session.history.append(QAPair(attr.id, attr.key, attr.question_en, Answer.YES))
+        try:
+            with patch("akinator.bot.handlers._repo", repo):
+                assert await handlers._learn_new_entity("Newcomer", session, "en")
+            eid = (await repo.find_entity_by_name("Newcomer")).id
+            assert handlers.get_entity(eid).name == "Newcomer"
+            assert eid in handlers.get_knowledge_base().row_of
+            assert handlers.get_localized_entity_name(eid, "ru") == "Newcomer"
+            assert await repo.get_entity_attribute(eid, attr.id) == 1.0
+        finally:
+            await handlers.set_game_data([], [])
+            await repo.close()
+
+
 class TestGuessCallbacks:
     """Guess confirmation button callbacks."""
 
@@ -127,6 +359,38 @@ class TestGuessCallbacks:
 
         assert session.mode == GameMode.FINISHED
 
+    @pytest.mark.asyncio
+    async def test_correct_guess_queues_feedback(self):
+        from akinator.bot import handlers
+        from akinator.db.feedback_sink import FeedbackSink
+        from tests.conftest import SAMPLE_ATTRIBUTES, SAMPLE_ENTITIES
+
+        await handlers.set_game_data(list(SAMPLE_ENTITIES), list(SAMPLE_ATTRIBUTES))
+        repo = AsyncMock()
+        sink = FeedbackSink(repo)
+        callback = AsyncMock()
+        callback.from_user = MagicMock(id=42)
+        callback.data = "guess:correct"
+        callback.message = AsyncMock()
+        session = GameSession(
+            session_id="test", user_id=42, candidate_ids=[1], weights=[1.0], mode=GameMode.GUESSING,
+            history=[
+                QAPair(a.id, a.key, a.question_en, Answer.YES) for a in SAMPLE_ATTRIBUTES[:4]
+            ],
+        )
+        try:
+            with patch("akinator.bot.handlers.get_session_store", return_value={42: session}), \
+                 patch("akinator.bot.handlers._repo", repo), \
+                 patch("akinator.bot.handlers._feedback_sink", sink):
+                await handlers.handle_guess_callback(callback)
+            # The reply went out with the feedback still queued
+            callback.message.edit_text.assert_awaited_once()
+            repo.track_feedback_bulk.assert_not_awaited()
+            assert sink.depth == 4
+            assert [r.attribute_id for r in sink._pending] == [a.id for a in SAMPLE_ATTRIBUTES[:4]]
+        finally:
+            await handlers.set_game_data([], [])
+
     @pytest.mark.asyncio
     async def test_wrong_guess_transitions_state(self):
         from akinator.bot.handlers import handle_guess_callback
@@ -0,0 +1,165 @@
+"""Tests for the Knowledge Base (dense entity × attribute matrix).
+
+Covers:
+- Building from entities and from a raw attribute map
+- Row / column lookups with defaults for unknown ids and keys
+- Immutability and copy-on-update via with_attributes, with a new version
+- Precomputed likelihood tables per answer
+- Engines give the same results for a KnowledgeBase and an entity list
+"""
+
+from __future__ import annotations
+
+import numpy as np
+import pytest
+
+from akinator.config import EPSILON
+from akinator.db.models import Answer, Attribute, Entity, GameSession
+from akinator.engine.knowledge_base import DEFAULT_VALUE, KnowledgeBase, answer_likelihood
+from akinator.engine.question_policy import QuestionPolicy
+from akinator.engine.scoring import ScoringEngine
+
+
+class TestBuild:
+    """Constructing the matrix."""
+
+    def test_shape_and_maps(
+        self, sample_entities: list[Entity], sample_attributes: list[Attribute],
+    ):
+        kb = KnowledgeBase.from_entities(sample_entities, sample_attributes)
+        assert kb.n_entities == len(sample_entities)
+        assert kb.n_attributes == len(sample_attributes)
+        assert kb.values.dtype == np.float32
+        assert kb.row_of[sample_entities[2].id] == 2
+        assert kb.col_of["is_male"] == 1
+
+    def test_values_match_entity_dicts(
+        self, sample_entities: list[Entity], sample_attributes: list[Attribute],
+    ):
+        kb = KnowledgeBase.from_entities(sample_entities, sample_attributes)
+        for e in sample_entities:
+            for key, value in e.attributes.items():
+                assert kb.value(e.id, key) == pytest.approx(value, abs=1e-6)
+
+    def test_missing_value_mask(self):
+        kb = KnowledgeBase.build([1, 2], ["a", "b"], {1: {"a": 1.0}})
+        assert kb.known[0].tolist() == [True, False]
+        assert kb.known[1].tolist() == [False, False]
+        assert kb.value(1, "b") == DEFAULT_VALUE
+
+    def test_columns_from_entities_without_attribute_list(
+        self, sample_entities: list[Entity],
+    ):
+        kb = KnowledgeBase.from_entities(sample_entities)
+        assert set(kb.attribute_keys) == set(sample_entities[0].attributes)
+
+    def test_arrays_are_read_only(self, sample_entities: list[Entity]):
+        kb = KnowledgeBase.from_entities(sample_entities)
+        with pytest.raises(ValueError):
+            kb.values[0, 0] = 0.0
+
+
+class TestLookups:
+    """Unknown ids and keys fall back to DEFAULT_VALUE."""
+
+    def test_unknown_id_maps_to_default_row(self, sample_entities: list[Entity]):
+        kb = KnowledgeBase.from_entities(sample_entities)
+        rows = kb.rows([1, 999])
+        assert rows.tolist() == [0, kb.default_row]
+        assert kb.column(rows, "is_fictional").tolist() == [1.0, DEFAULT_VALUE]
+
+    def test_unknown_key_gives_default_column(self, sample_entities: list[Entity]):
+        kb = KnowledgeBase.from_entities(sample_entities)
+        rows = kb.rows([1, 2])
+        assert kb.column(rows, "no_such_key").tolist() == [DEFAULT_VALUE] * 2
+        block = kb.columns(rows, ["is_fictional", "no_such_key"])
+        assert block.shape == (2, 2)
+        assert block[:, 1].tolist() == [DEFAULT_VALUE] * 2
+
+
+class TestWithAttributes:
+    """Learning produces a new knowledge base, leaving the old one intact."""
+
+    def test_update_existing_entity(self, sample_entities: list[Entity]):
+        kb = KnowledgeBase.from_entities(sample_entities)
+        updated = kb.with_attributes(1, {"is_villain": 0.0})
+        assert updated.value(1, "is_villain") == 0.0
+        assert kb.value(1, "is_villain") == pytest.approx(0.9, abs=1e-6)
+
+    def test_add_new_entity(self, sample_entities: list[Entity]):
+        kb = KnowledgeBase.from_entities(sample_entities)
+        updated = kb.with_attributes(100, {"is_male": 1.0})
+        assert updated.n_entities == kb.n_entities + 1
+        assert updated.value(100, "is_male") == 1.0
+        assert updated.value(100, "is_fictional") == DEFAULT_VALUE
+        assert updated.entity_attributes(100) == {"is_male": 1.0}
+        # Default row stays at the end
+        assert updated.values[updated.default_row].tolist() == [DEFAULT_VALUE] * kb.n_attributes
+
+    def test_version_increases(self, sample_entities: list[Entity]):
+        kb = KnowledgeBase.from_entities(sample_entities)
+        updated = kb.with_attributes(1, {"is_villain": 0.0})
+        rebuilt = KnowledgeBase.from_entities(sample_entities)
+        assert kb.version < updated.version < rebuilt.version
+
+    def test_rows_of_all_entities_shared(self, sample_entities: list[Entity]):
+        kb = KnowledgeBase.from_entities(sample_entities)
+        rows = kb.rows(kb.entity_ids)
+        assert rows is kb.rows(kb.entity_ids)
+        assert rows.tolist() == kb.rows(kb.entity_ids.tolist()).tolist()
+        assert not rows.flags.writeable
+
+
+class TestLikelihoodTables:
+    """One likelihood matrix per answer, clamped at EPSILON."""
+
+    @pytest.mark.parametrize("answer", list(Answer))
+    def test_tables_match_formula(self, sample_entities: list[Entity], answer: Answer):
+        kb = KnowledgeBase.from_entities(sample_entities)
+        expected = answer_likelihood(kb.values.astype(np.float64), answer)
+        np.testing.assert_allclose(kb.likelihoods[answer], expected, rtol=1e-6)
+
+    def test_tables_are_clamped(self, sample_entities: list[Entity]):
+        kb = KnowledgeBase.from_entities(sample_entities)
+        for table in kb.likelihoods.values():
+            assert table.min() >= np.float32(EPSILON)
+
+    def test_dont_know_table_is_a_view(self, sample_entities: list[Entity]):
+        kb = KnowledgeBase.from_entities(sample_entities)
+        assert kb.likelihoods[Answer.DONT_KNOW].strides == (0, 0)
+
+    def test_unknown_key_uses_default_likelihood(self, sample_entities: list[Entity]):
+        kb = KnowledgeBase.from_entities(sample_entities)
+        rows = kb.rows([1])
+        assert kb.likelihood(rows, "no_such_key", Answer.PROBABLY_YES).tolist() == [0.5]
+
+    def test_tables_follow_with_attributes(self, sample_entities: list[Entity]):
+        kb = KnowledgeBase.from_entities(sample_entities).with_attributes(1, {"is_villain": 0.0})
+        rows = kb.rows([1])
+        assert kb.likelihood(rows, "is_villain", Answer.NO).tolist() == [1.0]
+
+
+class TestEngineEquivalence:
+    """Engines accept a KnowledgeBase wherever they accept list[Entity]."""
+
+    def test_scoring_update_matches_list(
+        self, sample_entities: list[Entity], sample_attributes: list[Attribute],
+    ):
+        kb = KnowledgeBase.from_entities(sample_entities, sample_attributes)
+        ids = [e.id for e in sample_entities]
+        from_list = GameSession(session_id="a", user_id=1, candidate_ids=ids, weights=[0.2] * 5)
+        from_kb = GameSession(session_id="b", user_id=1, candidate_ids=ids, weights=[0.2] * 5)
+        engine = ScoringEngine()
+        engine.update(from_list, sample_entities, "is_fictional", Answer.PROBABLY_YES)
+        engine.update(from_kb, kb, "is_fictional", Answer.PROBABLY_YES)
+        assert from_kb.candidate_ids == from_list.candidate_ids
+        assert from_kb.weights == pytest.approx(from_list.weights, abs=1e-6)
+
+    def test_select_matches_list(
+        self, skewed_session: GameSession, sample_entities: list[Entity],
+        sample_attributes: list[Attribute],
+    ):
+        kb = KnowledgeBase.from_entities(sample_entities, sample_attributes)
+        policy = QuestionPolicy()
+        assert policy.select(skewed_session, kb, sample_attributes) == \
+            policy.select(skewed_session, sample_entities, sample_attributes)
@@ -0,0 +1,116 @@
+"""Tests for the Opening Book (precomputed first questions).
+
+Covers:
+- Book moves match live selection along every answer path
+- Lookups miss for other knowledge-base versions, priors (games started before learning) and deep paths
+- Hit / miss counters
+"""
+
+from __future__ import annotations
+
+import pytest
+
+from akinator.db.models import Answer, Attribute, Entity, GameSession
+from akinator.engine.knowledge_base import KnowledgeBase
+from akinator.engine.opening_book import OpeningBook
+from akinator.engine.question_policy import QuestionPolicy
+from akinator.engine.scoring import ScoringEngine
+from akinator.engine.session import GameSessionManager, uniform_prior
+
+
+@pytest.fixture
+def manager() -> GameSessionManager:
+    return GameSessionManager(ScoringEngine(log_space=True), QuestionPolicy())
+
+
+@pytest.fixture
+def kb(sample_entities: list[Entity], sample_attributes: list[Attribute]) -> KnowledgeBase:
+    return KnowledgeBase.from_entities(sample_entities, sample_attributes)
+
+
+def _play(
+    manager: GameSessionManager, kb: KnowledgeBase, attributes: list[Attribute],
+    ids: list[int], path: list[tuple[str, Answer]], uniform: bool = True,
+) -> GameSession:
+    session = GameSession(session_id="live", user_id=1)
+    manager.init_candidates(session, ids, prior=uniform_prior(kb) if uniform else None)
+    by_key = {a.key: a for a in attributes}
+    for key, answer in path:
+        manager.process_answer(session, kb, by_key[key], answer)
+    return session
+
+
+class TestBuild:
+    """Every book move is what live selection would pick."""
+
+    def test_moves_match_live_selection(
+        self, manager: GameSessionManager, kb: KnowledgeBase,
+        sample_attributes: list[Attribute],
+    ):
+        ids = kb.entity_ids.tolist()
+        book = OpeningBook.build(kb, sample_attributes, manager, ids, depth=2)
+        assert len(book.moves) == 1 + len(Answer)
+        first = book.moves[()]
+        for answer in Answer:
+            session = _play(manager, kb, sample_attributes, ids, [(first, answer)])
+            assert book.lookup(session, kb) == manager.question_policy.select(
+                session, kb, sample_attributes,
+            )
+
+    def test_depth_three_covers_all_paths(
+        self, manager: GameSessionManager, kb: KnowledgeBase,
+        sample_attributes: list[Attribute],
+    ):
+        book = OpeningBook.build(kb, sample_attributes, manager, kb.entity_ids.tolist(), depth=3)
+        assert len(book.moves) == 1 + len(Answer) + len(Answer) ** 2
+        for (key_a, a), (key_b, b) in (p for p in book.moves if len(p) == 2):
+            assert key_a == book.moves[()]
+            assert key_b == book.moves[((key_a, a),)]
+
+
+class TestLookup:
+    """Out-of-book sessions fall through to normal selection."""
+
+    def _book(self, manager, kb, attributes) -> OpeningBook:
+        return OpeningBook.build(kb, attributes, manager, kb.entity_ids.tolist(), depth=2)
+
+    def test_hit_counts(self, manager, kb, sample_attributes):
+        book = self._book(manager, kb, sample_attributes)
+        session = _play(manager, kb, sample_attributes, kb.entity_ids.tolist(), [])
+        assert book.lookup(session, kb) == book.moves[()]
+        assert (book.hits, book.misses) == (1, 0)
+
+    def test_other_version_misses(self, manager, kb, sample_attributes):
+        book = self._book(manager, kb, sample_attributes)
+        learned = kb.with_attributes(1, {"is_male": 0.0})
+        assert learned.version > kb.version
+        session = _play(manager, learned, sample_attributes, kb.entity_ids.tolist(), [])
+        assert book.lookup(session, learned) is None
+        assert book.misses == 1
+
+    def test_other_prior_misses(self, manager, kb, sample_attributes):
+        book = self._book(manager, kb, sample_attributes)
+        session = _play(manager, kb, sample_attributes, kb.entity_ids.tolist(), [], uniform=False)
+        assert book.lookup(session, kb) is None
+
+    def test_game_started_before_learning_misses(self, manager, kb, sample_attributes):
+        learned = kb.with_attributes(99, {"is_male": 0.0})
+        book = OpeningBook.build(learned, sample_attributes, manager, learned.entity_ids.tolist(), depth=2)
+        session = _play(manager, kb, sample_attributes, kb.entity_ids.tolist(), [])
+        assert book.lookup(session, learned) is None
+
+    def test_deep_path_misses(self, manager, kb, sample_attributes):
+        book = self._book(manager, kb, sample_attributes)
+        first = book.moves[()]
+        second = book.moves[((first, Answer.YES),)]
+        session = _play(
+            manager, kb, sample_attributes, kb.entity_ids.tolist(),
+            [(first, Answer.YES), (second, Answer.NO)],
+        )
+        assert book.lookup(session, kb) is None
+
+    def test_pending_question_misses(self, manager, kb, sample_attributes):
+        book = self._book(manager, kb, sample_attributes)
+        session = _play(manager, kb, sample_attributes, kb.entity_ids.tolist(), [])
+        session.asked_attributes.append(sample_attributes[0].id)
+        assert book.lookup(session, kb) is None
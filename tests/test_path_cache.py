@@ -0,0 +1,185 @@
+"""Tests for the Path Cache (memoized states and choices per answer path).
+
+Covers:
+- Which sessions can be cached
+- Replayed answer paths restore the cached state instead of rescoring
+- Games started before learning don't share states with games started after
+- Memoized question choices in select / select_batch
+- LRU eviction by entry count and bytes, and invalidation on a new version
+"""
+
+from __future__ import annotations
+
+from unittest.mock import patch
+
+import numpy as np
+import pytest
+
+from akinator.db.models import Answer, Attribute, Entity, GameSession
+from akinator.engine.knowledge_base import KnowledgeBase
+from akinator.engine.path_cache import PathCache
+from akinator.engine.question_policy import QuestionPolicy
+from akinator.engine.scoring import ScoringEngine
+from akinator.engine.session import UNIFORM_PRIOR, GameSessionManager, uniform_prior
+from akinator.engine.stats import session_stats
+
+PATH = [("is_fictional", Answer.YES), ("is_male", Answer.PROBABLY_NO), ("from_movie", Answer.NO)]
+
+
+@pytest.fixture
+def kb(sample_entities: list[Entity], sample_attributes: list[Attribute]) -> KnowledgeBase:
+    return KnowledgeBase.from_entities(sample_entities, sample_attributes)
+
+
+def _manager(cache: PathCache | None, log_space: bool = True) -> GameSessionManager:
+    return GameSessionManager(ScoringEngine(log_space=log_space), QuestionPolicy(path_cache=cache))
+
+
+def _play(
+    manager: GameSessionManager, kb: KnowledgeBase, attributes: list[Attribute],
+    path: list[tuple[str, Answer]],
+) -> GameSession:
+    session = GameSession(session_id="game", user_id=1)
+    manager.init_candidates(session, kb.entity_ids.tolist(), prior=uniform_prior(kb))
+    by_key = {a.key: a for a in attributes}
+    for key, answer in path:
+        manager.process_answer(session, kb, by_key[key], answer)
+    return session
+
+
+class TestKey:
+    """Only sessions from a named prior with no pending question are cacheable."""
+
+    def test_needs_prior(self, kb: KnowledgeBase):
+        session = GameSession(session_id="s", user_id=1)
+        assert PathCache.key(session, kb) is None
+        session.prior = UNIFORM_PRIOR
+        assert PathCache.key(session, kb) == (kb.version, UNIFORM_PRIOR, ())
+
+    def test_pending_question_is_not_cacheable(self, kb: KnowledgeBase):
+        session = GameSession(session_id="s", user_id=1, asked_attributes=[1])
+        session.prior = UNIFORM_PRIOR
+        assert PathCache.key(session, kb) is None
+
+
+class TestStates:
+    """A repeated answer path skips scoring and ends in the same state."""
+
+    @pytest.mark.parametrize("log_space", [False, True])
+    def test_replay_restores_state(
+        self, kb: KnowledgeBase, sample_attributes: list[Attribute], log_space: bool,
+    ):
+        cache = PathCache()
+        manager = _manager(cache, log_space)
+        first = _play(manager, kb, sample_attributes, PATH)
+        with patch.object(manager.scoring_engine, "update") as update:
+            second = _play(manager, kb, sample_attributes, PATH)
+        update.assert_not_called()
+        assert second.candidate_ids == first.candidate_ids
+        np.testing.assert_allclose(second.weight_array, first.weight_array)
+        # Stats are left to the next selection
+        np.testing.assert_allclose(session_stats(kb, second).yes_mass, session_stats(kb, first).yes_mass)
+
+    def test_cached_weights_are_not_shared(
+        self, kb: KnowledgeBase, sample_attributes: list[Attribute],
+    ):
+        """Continuing one game must not change the state cached for its prefix."""
+        cache = PathCache()
+        manager = _manager(cache, log_space=False)
+        uncached = _play(_manager(None, log_space=False), kb, sample_attributes, PATH[:1])
+        _play(manager, kb, sample_attributes, PATH)
+        replayed = _play(manager, kb, sample_attributes, PATH[:1])
+        np.testing.assert_allclose(replayed.weight_array, uncached.weight_array)
+
+    def test_matches_uncached_game(self, kb: KnowledgeBase, sample_attributes: list[Attribute]):
+        manager = _manager(PathCache())
+        _play(manager, kb, sample_attributes, PATH)
+        cached = _play(manager, kb, sample_attributes, PATH)
+        plain = _play(_manager(None), kb, sample_attributes, PATH)
+        assert cached.candidate_ids == plain.candidate_ids
+        np.testing.assert_allclose(cached.weight_array, plain.weight_array)
+
+    def test_game_started_before_learning(self, kb: KnowledgeBase, sample_attributes: list[Attribute]):
+        manager = _manager(PathCache())
+        by_key = {a.key: a for a in sample_attributes}
+        (key, answer) = PATH[0]
+        started = _play(manager, kb, sample_attributes, [])
+        learned = kb.with_attributes(99, {key: 1.0})
+        # The old game answers first, under the learned knowledge base
+        manager.process_answer(started, learned, by_key[key], answer)
+        new = _play(manager, learned, sample_attributes, PATH[:1])
+        assert 99 not in started.candidate_ids
+        assert 99 in new.candidate_ids
+
+
+class TestChoices:
+    """select() and select_batch() reuse the memoized next question."""
+
+    def test_select_hits_on_second_call(self, kb: KnowledgeBase, sample_attributes: list[Attribute]):
+        cache = PathCache()
+        manager = _manager(cache)
+        session = _play(manager, kb, sample_attributes, PATH[:1])
+        policy = manager.question_policy
+        expected = QuestionPolicy().select(session, kb, sample_attributes)
+        assert policy.select(session, kb, sample_attributes) == expected
+        hits = cache.hits
+        assert policy.select(session, kb, sample_attributes) == expected
+        assert cache.hits == hits + 1
+
+    def test_other_attribute_list_misses(self, kb: KnowledgeBase, sample_attributes: list[Attribute]):
+        cache = PathCache()
+        policy = QuestionPolicy(path_cache=cache)
+        session = _play(_manager(None), kb, sample_attributes, [])
+        first = policy.select(session, kb, sample_attributes)
+        remaining = [a for a in sample_attributes if a.key != first]
+        assert policy.select(session, kb, remaining) != first
+
+    def test_select_batch_uses_cache(self, kb: KnowledgeBase, sample_attributes: list[Attribute]):
+        cache = PathCache()
+        policy = QuestionPolicy(path_cache=cache)
+        sessions = [_play(_manager(None), kb, sample_attributes, PATH[:n]) for n in range(3)]
+        expected = [QuestionPolicy().select(s, kb, sample_attributes) for s in sessions]
+        assert policy.select_batch(sessions, kb, sample_attributes) == expected
+        misses = cache.misses
+        assert policy.select_batch(sessions, kb, sample_attributes) == expected
+        assert cache.misses == misses
+
+    def test_planner_is_not_cached(self, kb: KnowledgeBase, sample_attributes: list[Attribute]):
+        cache = PathCache()
+        policy = QuestionPolicy(lookahead_width=3, path_cache=cache)
+        session = _play(_manager(None), kb, sample_attributes, [])
+        policy.select(session, kb, sample_attributes)
+        assert len(cache) == 0
+
+
+class TestBounds:
+    """Eviction and invalidation."""
+
+    def test_evicts_least_recently_used(self, kb: KnowledgeBase):
+        cache = PathCache(max_entries=2)
+        keys = [(kb.version, UNIFORM_PRIOR, ((i, "yes"),)) for i in range(3)]
+        cache.put_next_key(keys[0], (), "a")
+        cache.put_next_key(keys[1], (), "b")
+        cache.get(keys[0])
+        cache.put_next_key(keys[2], (), "c")
+        assert cache.get(keys[1]) is None
+        assert cache.get(keys[0]) is not None and cache.get(keys[2]) is not None
+
+    def test_byte_budget(self, kb: KnowledgeBase, sample_attributes: list[Attribute]):
+        manager = _manager(None)
+        session = _play(manager, kb, sample_attributes, [])
+        one_state = PathCache()
+        one_state.put_state((kb.version, UNIFORM_PRIOR, ()), session)
+        cache = PathCache(max_bytes=int(one_state.nbytes * 1.5))
+        cache.put_state((kb.version, UNIFORM_PRIOR, ()), session)
+        cache.put_state((kb.version, UNIFORM_PRIOR, ((1, "yes"),)), session)
+        assert len(cache) == 1
+        assert cache.nbytes <= cache.max_bytes
+
+    def test_new_version_clears(self, kb: KnowledgeBase):
+        cache = PathCache()
+        cache.put_next_key((kb.version, UNIFORM_PRIOR, ()), (), "a")
+        learned = kb.with_attributes(1, {"is_male": 0.0})
+        cache.put_next_key((learned.version, UNIFORM_PRIOR, ()), (), "b")
+        assert len(cache) == 1
+        assert cache.get((kb.version, UNIFORM_PRIOR, ())) is None
@@ -5,16 +5,25 @@ Covers:
 - Best attribute selection
 - Skipping already-asked attributes
 - Edge cases (single candidate, all same attribute values)
+- Vectorized selection matches the scalar reference
+- Expected gain over all five answers
+- Approximate selection over the top of the candidate mass
+- Two-step lookahead planner
+- Related-attribute skip rules compiled to column masks
+- Batched selection for many sessions
 """
 
 from __future__ import annotations
 
 import math
 
+import numpy as np
 import pytest
 
-from akinator.db.models import Attribute, Entity, GameMode, GameSession
-from akinator.engine.question_policy import QuestionPolicy
+from akinator.db.models import Answer, Attribute, Entity, GameMode, GameSession, QAPair
+from akinator.engine import question_policy, stats
+from akinator.engine.knowledge_base import KnowledgeBase, answer_likelihood
+from akinator.engine.question_policy import QuestionPolicy, compile_skip_rules
 from tests.conftest import SAMPLE_ATTRIBUTES, SAMPLE_ENTITIES
 
 
@@ -168,3 +177,438 @@ class TestEdgeCases:
         ig = policy.compute_info_gain(session, entities, "split_attr")
         # For 2 equal-weight candidates, perfect split → IG = 1 bit
         assert math.isclose(ig, 1.0, abs_tol=1e-6)
+
+
+def _random_catalogue(
+    n_entities: int, n_attrs: int, seed: int,
+) -> tuple[list[Entity], list[Attribute]]:
+    """Catalogue on the DB's 0.1 value grid, with some attributes missing."""
+    rng = np.random.default_rng(seed)
+    attributes = [
+        Attribute(id=j + 1, key=f"attr_{j}", question_ru="?", question_en="?",
+                  category="test")
+        for j in range(n_attrs)
+    ]
+    entities = []
+    for i in range(n_entities):
+        values = rng.integers(0, 11, size=n_attrs) / 10
+        present = rng.random(n_attrs) > 0.1
+        entities.append(Entity(
+            id=i + 1, name=f"E{i}", description="", entity_type="character",
+            language="en",
+            attributes={a.key: float(v) for a, v, ok in zip(attributes, values, present) if ok},
+        ))
+    return entities, attributes
+
+
+class TestVectorizedSelection:
+    """The batched NumPy path must agree with the per-attribute loop."""
+
+    def test_gains_match_scalar(
+        self, skewed_session: GameSession, sample_entities: list[Entity],
+        sample_attributes: list[Attribute],
+    ):
+        policy = QuestionPolicy()
+        keys = [a.key for a in sample_attributes]
+        gains = policy.compute_info_gains(skewed_session, sample_entities, keys)
+        for key, ig in zip(keys, gains):
+            expected = policy.compute_info_gain(skewed_session, sample_entities, key)
+            # The masses are summed in float32, the matrix dtype
+            assert ig == pytest.approx(expected, abs=1e-6)
+
+    @pytest.mark.parametrize("seed", range(5))
+    def test_select_matches_scalar_on_random_catalogue(self, seed: int):
+        entities, attributes = _random_catalogue(120, 30, seed)
+        rng = np.random.default_rng(seed + 100)
+        weights = rng.dirichlet(np.full(len(entities), 0.3))
+        session = GameSession(
+            session_id=f"random-{seed}", user_id=1,
+            candidate_ids=[e.id for e in entities],
+            weights=weights.tolist(),
+            asked_attributes=[attributes[0].id, attributes[5].id],
+        )
+        vectorized = QuestionPolicy(vectorized=True).select(session, entities, attributes)
+        scalar = QuestionPolicy(vectorized=False).select(session, entities, attributes)
+        assert vectorized == scalar
+
+    def test_select_ties_pick_first_attribute(self):
+        """Identical columns must resolve to the first one, like the scalar loop."""
+        attrs = [
+            Attribute(id=i, key=f"dup_{i}", question_ru="?", question_en="?", category="t")
+            for i in (1, 2, 3)
+        ]
+        entities = [
+            Entity(id=1, name="A", description="", entity_type="character",
+                   language="en", attributes={a.key: 1.0 for a in attrs}),
+            Entity(id=2, name="B", description="", entity_type="character",
+                   language="en", attributes={a.key: 0.0 for a in attrs}),
+        ]
+        session = GameSession(
+            session_id="ties", user_id=1, candidate_ids=[1, 2], weights=[0.5, 0.5],
+        )
+        assert QuestionPolicy().select(session, entities, attrs) == "dup_1"
+        assert QuestionPolicy(vectorized=False).select(session, entities, attrs) == "dup_1"
+
+    def test_single_candidate_selects_first_unasked(
+        self, sample_attributes: list[Attribute],
+    ):
+        entities = [SAMPLE_ENTITIES[0]]
+        session = GameSession(
+            session_id="single", user_id=1,
+            candidate_ids=[entities[0].id], weights=[1.0],
+            asked_attributes=[sample_attributes[0].id],
+        )
+        vectorized = QuestionPolicy().select(session, entities, sample_attributes)
+        scalar = QuestionPolicy(vectorized=False).select(session, entities, sample_attributes)
+        assert vectorized == scalar == sample_attributes[1].key
+
+
+def _five_answer_gain_reference(weights: list[float], p_values: list[float]) -> float:
+    """Brute-force expected gain over all five answers for one attribute."""
+    def entropy(ws: list[float]) -> float:
+        total = sum(ws)
+        return -sum(w / total * math.log2(w / total) for w in ws if w > 0)
+
+    masses = {
+        a: [w * float(answer_likelihood(p, a)) for w, p in zip(weights, p_values)]
+        for a in Answer
+    }
+    grand_total = sum(sum(m) for m in masses.values())
+    expected_h = sum(sum(m) / grand_total * entropy(m) for m in masses.values())
+    return max(entropy(weights) - expected_h, 0.0)
+
+
+class TestAllAnswersGain:
+    """all_answers=True models PROBABLY_YES / PROBABLY_NO / DONT_KNOW too."""
+
+    def test_matches_reference(
+        self, skewed_session: GameSession, sample_entities: list[Entity],
+        sample_attributes: list[Attribute],
+    ):
+        policy = QuestionPolicy(all_answers=True)
+        keys = [a.key for a in sample_attributes]
+        gains = policy.compute_info_gains(skewed_session, sample_entities, keys)
+        entity_map = {e.id: e for e in sample_entities}
+        for key, ig in zip(keys, gains):
+            p_values = [entity_map[cid].attributes[key] for cid in skewed_session.candidate_ids]
+            expected = _five_answer_gain_reference(skewed_session.weights, p_values)
+            assert ig == pytest.approx(expected, abs=1e-6)
+
+    def test_discounted_against_binary_gain(
+        self, uniform_session: GameSession, sample_entities: list[Entity],
+    ):
+        """Soft and don't-know answers carry less information than a clean yes/no."""
+        binary = QuestionPolicy().compute_info_gains(
+            uniform_session, sample_entities, ["is_fictional"])
+        full = QuestionPolicy(all_answers=True).compute_info_gains(
+            uniform_session, sample_entities, ["is_fictional"])
+        assert 0.0 < full[0] < binary[0]
+
+    def test_single_candidate_has_zero_gain(self, sample_attributes: list[Attribute]):
+        session = GameSession(
+            session_id="single", user_id=1, candidate_ids=[1], weights=[1.0],
+        )
+        gains = QuestionPolicy(all_answers=True).compute_info_gains(
+            session, [SAMPLE_ENTITIES[0]], [a.key for a in sample_attributes])
+        assert np.allclose(gains, 0.0)
+
+
+class TestApproximateSelection:
+    """Top-of-mass selection with bucketed remainder (mass_coverage)."""
+
+    def _session(self, entities: list[Entity], seed: int) -> GameSession:
+        rng = np.random.default_rng(seed)
+        return GameSession(
+            session_id=f"approx-{seed}", user_id=1,
+            candidate_ids=[e.id for e in entities],
+            weights=rng.dirichlet(np.full(len(entities), 0.2)).tolist(),
+        )
+
+    def test_full_coverage_is_exact(self):
+        entities, attributes = _random_catalogue(100, 20, seed=1)
+        session = self._session(entities, seed=1)
+        keys = [a.key for a in attributes]
+        policy = QuestionPolicy(mass_coverage=1.0)
+        gains, report = policy.compute_info_gains_approx(session, entities, keys)
+        exact = QuestionPolicy().compute_info_gains(session, entities, keys)
+        np.testing.assert_allclose(gains, exact, atol=1e-6)  # float32 masses
+        assert report.tail_mass == pytest.approx(0.0, abs=1e-12)
+        assert report.error_bound == pytest.approx(0.0, abs=1e-12)
+
+    @pytest.mark.parametrize("coverage", [0.5, 0.9, 0.99])
+    def test_error_within_reported_bound(self, coverage: float):
+        entities, attributes = _random_catalogue(300, 25, seed=3)
+        session = self._session(entities, seed=3)
+        keys = [a.key for a in attributes]
+        policy = QuestionPolicy(mass_coverage=coverage, remainder_buckets=4)
+        gains, report = policy.compute_info_gains_approx(session, entities, keys)
+        exact = QuestionPolicy().compute_info_gains(session, entities, keys)
+        assert np.all(gains <= exact + 1e-9)
+        assert np.all(exact - gains <= report.error_bound + 1e-9)
+        assert report.n_head < report.n_candidates
+        assert report.n_buckets <= 4
+        assert report.error_bound <= report.tail_mass + 1e-12
+
+    @pytest.mark.parametrize("fraction", [0.0, 1.0])
+    def test_gathered_and_scattered_sums_agree(self, fraction: float, monkeypatch: pytest.MonkeyPatch):
+        entities, attributes = _random_catalogue(300, 25, seed=4)
+        session = self._session(entities, seed=4)
+        keys = [a.key for a in attributes]
+        policy = QuestionPolicy(mass_coverage=0.9, remainder_buckets=4)
+        expected, _ = policy.compute_info_gains_approx(session, entities, keys)
+        # 0: head and tail scattered onto every row; 1: both gathered
+        monkeypatch.setattr(stats, "_GATHER_FRACTION", fraction)
+        gains, _ = policy.compute_info_gains_approx(session, entities, keys)
+        np.testing.assert_allclose(gains, expected, atol=1e-6)
+
+    def test_head_covers_requested_mass(self):
+        entities, attributes = _random_catalogue(200, 10, seed=5)
+        session = self._session(entities, seed=5)
+        _, report = QuestionPolicy(mass_coverage=0.9).compute_info_gains_approx(
+            session, entities, [attributes[0].key],
+        )
+        assert report.tail_mass <= 0.1 + 1e-9
+        # Smallest such set: dropping the lightest head candidate falls short
+        head = np.sort(session.weight_array)[::-1][:report.n_head]
+        assert head[:-1].sum() < 0.9
+
+    def test_select_records_report(
+        self, skewed_session: GameSession, sample_entities: list[Entity],
+        sample_attributes: list[Attribute],
+    ):
+        policy = QuestionPolicy(mass_coverage=0.999)
+        key = policy.select(skewed_session, sample_entities, sample_attributes)
+        assert key == QuestionPolicy().select(skewed_session, sample_entities, sample_attributes)
+        assert policy.last_approximation is not None
+        assert policy.last_approximation.n_candidates == len(sample_entities)
+
+    def test_rejects_all_answers(self):
+        with pytest.raises(ValueError):
+            QuestionPolicy(all_answers=True, mass_coverage=0.99)
+
+
+def _two_step_reference(
+    session: GameSession, entities: list[Entity], keys: list[str], first: str,
+) -> float:
+    """IG(first) plus the expected best follow-up gain, via the scalar path."""
+    policy = QuestionPolicy(vectorized=False)
+    p = {e.id: e.attributes.get(first, 0.5) for e in entities}
+    value = policy.compute_info_gain(session, entities, first)
+    for likelihood in (lambda x: x, lambda x: 1.0 - x):
+        posterior = [w * likelihood(p[c]) for c, w in zip(session.candidate_ids, session.weights)]
+        mass = sum(posterior)
+        if mass < 1e-12:
+            continue
+        branch = GameSession(
+            session_id="branch", user_id=1, candidate_ids=session.candidate_ids,
+            weights=[w / mass for w in posterior],
+        )
+        value += mass * max(
+            policy.compute_info_gain(branch, entities, k) for k in keys if k != first
+        )
+    return value
+
+
+class TestLookaheadPlanner:
+    """Two-ply expectimax over the greedy shortlist (lookahead_width)."""
+
+    @pytest.mark.parametrize("seed", range(3))
+    def test_matches_scalar_reference(self, seed: int):
+        entities, attributes = _random_catalogue(40, 8, seed)
+        rng = np.random.default_rng(seed + 50)
+        session = GameSession(
+            session_id=f"plan-{seed}", user_id=1,
+            candidate_ids=[e.id for e in entities],
+            weights=rng.dirichlet(np.full(len(entities), 0.5)).tolist(),
+        )
+        keys = [a.key for a in attributes]
+        values = [_two_step_reference(session, entities, keys, k) for k in keys]
+        policy = QuestionPolicy(lookahead_width=len(keys), lookahead_budget_ms=10_000)
+        chosen = policy.select(session, entities, attributes)
+        assert values[keys.index(chosen)] == pytest.approx(max(values), abs=1e-9)
+        assert policy.last_plan_size == len(keys)
+
+    def test_width_one_is_greedy(
+        self, skewed_session: GameSession, sample_entities: list[Entity],
+        sample_attributes: list[Attribute],
+    ):
+        greedy = QuestionPolicy().select(skewed_session, sample_entities, sample_attributes)
+        planner = QuestionPolicy(lookahead_width=1)
+        assert planner.select(skewed_session, sample_entities, sample_attributes) == greedy
+
+    def test_exhausted_budget_keeps_greedy_choice(self):
+        entities, attributes = _random_catalogue(60, 20, seed=9)
+        session = GameSession(
+            session_id="budget", user_id=1,
+            candidate_ids=[e.id for e in entities], weights=[1 / 60] * 60,
+        )
+        greedy = QuestionPolicy().select(session, entities, attributes)
+        policy = QuestionPolicy(lookahead_width=12, lookahead_budget_ms=0)
+        assert policy.select(session, entities, attributes) == greedy
+        assert policy.last_plan_size == 0
+
+    def test_budget_checked_between_batches(self, monkeypatch: pytest.MonkeyPatch):
+        entities, attributes = _random_catalogue(60, 20, seed=9)
+        session = GameSession(
+            session_id="budget", user_id=1,
+            candidate_ids=[e.id for e in entities], weights=[1 / 60] * 60,
+        )
+        # The deadline passes while the first batch is scored
+        ticks = iter([0.0, 0.0, 1.0])
+        monkeypatch.setattr(question_policy.time, "perf_counter", lambda: next(ticks, 1.0))
+        policy = QuestionPolicy(lookahead_width=12, lookahead_budget_ms=500)
+        policy.select(session, entities, attributes)
+        assert 0 < policy.last_plan_size < 12
+
+    @pytest.mark.parametrize("fraction", [0.0, 1.0])
+    def test_gathered_and_scattered_sums_agree(self, fraction: float, monkeypatch: pytest.MonkeyPatch):
+        entities, attributes = _random_catalogue(60, 20, seed=2)
+        rng = np.random.default_rng(2)
+        session = GameSession(
+            session_id="plan-sums", user_id=1, candidate_ids=[e.id for e in entities],
+            weights=rng.dirichlet(np.full(len(entities), 0.5)).tolist(),
+        )
+        keys = [a.key for a in attributes]
+        values = [_two_step_reference(session, entities, keys, k) for k in keys]
+        # 0: posteriors scattered onto every row; 1: candidate rows gathered
+        monkeypatch.setattr(stats, "_GATHER_FRACTION", fraction)
+        policy = QuestionPolicy(lookahead_width=len(keys), lookahead_budget_ms=10_000)
+        chosen = policy.select(session, entities, attributes)
+        assert values[keys.index(chosen)] == pytest.approx(max(values), abs=1e-6)
+
+    def test_single_candidate_skips_planning(self, sample_attributes: list[Attribute]):
+        entities = [SAMPLE_ENTITIES[0]]
+        session = GameSession(
+            session_id="single", user_id=1, candidate_ids=[entities[0].id], weights=[1.0],
+        )
+        policy = QuestionPolicy(lookahead_width=4)
+        assert policy.select(session, entities, sample_attributes) == sample_attributes[0].key
+        assert policy.last_plan_size == 0
+
+
+class TestSkipRules:
+    """Related-attribute rules compiled to column masks."""
+
+    def _attrs(self, keys: list[str]) -> list[Attribute]:
+        return [
+            Attribute(id=i + 1, key=k, question_ru="?", question_en="?", category="t")
+            for i, k in enumerate(keys)
+        ]
+
+    def _answer(self, session: GameSession, attr: Attribute) -> None:
+        session.history.append(QAPair(attr.id, attr.key, "?", Answer.YES))
+        session.asked_attributes.append(attr.id)
+
+    def test_compile_drops_unknown_keys(self):
+        masks = compile_skip_rules({"a": ["b", "zzz"], "c": []}, {"a": 0, "b": 1, "c": 2})
+        assert masks["a"].tolist() == [False, True, False]
+        assert not masks["c"].any()
+
+    def test_blocked_mask_folds_new_answers(self):
+        attrs = self._attrs(["from_book", "from_literature", "from_japan", "from_asia"])
+        entities, _ = _random_catalogue(10, 0, seed=0)
+        kb = KnowledgeBase.build([e.id for e in entities], [a.key for a in attrs], {})
+        session = GameSession(session_id="mask", user_id=1)
+        policy = QuestionPolicy()
+
+        self._answer(session, attrs[0])
+        assert policy.blocked_columns(session, kb).tolist() == [False, True, False, False]
+        assert session.blocked_count == 1
+        self._answer(session, attrs[2])
+        assert policy.blocked_columns(session, kb).tolist() == [False, True, False, True]
+        assert session.blocked_count == 2
+
+    def test_vectorized_matches_scalar_with_related_history(self):
+        keys = ["from_book", "from_literature", "from_japan", "from_asia", "era_modern",
+                "era_medieval", "era_ancient", "is_male"]
+        attrs = self._attrs(keys)
+        rng = np.random.default_rng(4)
+        entities = [
+            Entity(id=i + 1, name=f"E{i}", description="", entity_type="character", language="en",
+                   attributes={k: float(v) for k, v in zip(keys, rng.integers(0, 11, len(keys)) / 10)})
+            for i in range(30)
+        ]
+        session = GameSession(
+            session_id="related", user_id=1, candidate_ids=[e.id for e in entities],
+            weights=rng.dirichlet(np.ones(30)).tolist(),
+        )
+        for attr in (attrs[0], attrs[4]):
+            self._answer(session, attr)
+            vectorized = QuestionPolicy().select(session, entities, attrs)
+            scalar = QuestionPolicy(vectorized=False).select(session, entities, attrs)
+            assert vectorized == scalar
+            assert vectorized not in QuestionPolicy().get_implied_skip_keys(session, attrs)
+
+    def test_custom_rules(self):
+        attrs = self._attrs(["a", "b"])
+        entities = [
+            Entity(id=1, name="X", description="", entity_type="character", language="en",
+                   attributes={"a": 1.0, "b": 1.0}),
+            Entity(id=2, name="Y", description="", entity_type="character", language="en",
+                   attributes={"a": 0.0, "b": 0.0}),
+        ]
+        session = GameSession(session_id="custom", user_id=1, candidate_ids=[1, 2], weights=[0.5, 0.5])
+        session.history.append(QAPair(None, "trigger", "?", Answer.NO))
+        policy = QuestionPolicy(related_attributes={"trigger": ["a"]})
+        assert policy.select(session, entities, attrs) == "b"
+
+    def test_masks_recompiled_for_new_columns(self):
+        policy = QuestionPolicy()
+        first = KnowledgeBase.build([1], ["from_book", "from_literature"], {})
+        second = KnowledgeBase.build([1], ["from_literature", "from_book"], {})
+        assert policy.compiled_skip_rules(first)["from_book"].tolist() == [False, True]
+        assert policy.compiled_skip_rules(second)["from_book"].tolist() == [True, False]
+
+
+class TestBatchSelection:
+    """select_batch() scores many sessions at once and agrees with select()."""
+
+    def _sessions(self, entities: list[Entity], attributes: list[Attribute]) -> list[GameSession]:
+        rng = np.random.default_rng(11)
+        sessions = []
+        for i in range(6):
+            ids = [e.id for e in entities if rng.random() > 0.3]
+            sessions.append(GameSession(
+                session_id=f"batch-{i}", user_id=i, candidate_ids=ids,
+                weights=rng.dirichlet(np.full(len(ids), 0.4)).tolist(),
+                asked_attributes=[a.id for a in attributes[:i]],
+            ))
+        # Unknown candidate ids, a single candidate, and nothing left to ask
+        sessions.append(GameSession(
+            session_id="unknown", user_id=7, candidate_ids=[entities[0].id, 10_001, 10_002],
+            weights=[0.5, 0.3, 0.2],
+        ))
+        sessions.append(GameSession(
+            session_id="single", user_id=8, candidate_ids=[entities[1].id], weights=[1.0],
+        ))
+        sessions.append(GameSession(
+            session_id="done", user_id=9, candidate_ids=[entities[2].id, entities[3].id],
+            weights=[0.5, 0.5], asked_attributes=[a.id for a in attributes],
+        ))
+        return sessions
+
+    def test_matches_per_session_select(self):
+        entities, attributes = _random_catalogue(80, 20, seed=2)
+        kb = KnowledgeBase.from_entities(entities, attributes)
+        policy = QuestionPolicy()
+        expected = [policy.select(s, kb, attributes) for s in self._sessions(entities, attributes)]
+        assert policy.select_batch(self._sessions(entities, attributes), kb, attributes) == expected
+        assert expected[-1] is None
+
+    def test_stores_stats_on_sessions(self):
+        entities, attributes = _random_catalogue(30, 8, seed=6)
+        kb = KnowledgeBase.from_entities(entities, attributes)
+        sessions = self._sessions(entities, attributes)
+        QuestionPolicy().select_batch(sessions, kb, attributes)
+        assert all(s.stats is not None and s.stats.source is kb.values for s in sessions)
+
+    def test_other_modes_fall_back_to_select(
+        self, skewed_session: GameSession, sample_entities: list[Entity],
+        sample_attributes: list[Attribute],
+    ):
+        policy = QuestionPolicy(lookahead_width=3)
+        assert policy.select_batch([skewed_session], sample_entities, sample_attributes) == \
+            [policy.select(skewed_session, sample_entities, sample_attributes)]
+
+    def test_empty_batch(self, sample_entities: list[Entity], sample_attributes: list[Attribute]):
+        assert QuestionPolicy().select_batch([], sample_entities, sample_attributes) == []
@@ -8,14 +8,24 @@ Covers:
 - Alias management
 - Querying entities by type / with attributes
 - Embedding storage and retrieval
+- Transactions (commit, rollback, nesting, other tasks queue) and bulk writes
+- Connection profiles, index migrations and the query plans they give
+- Reader pool / queued writer: reads don't wait on writes, wait metrics
+- Aggregated feedback counts, raw log rotation, learning from the counts
+- Startup loading benchmark (bulk alias query vs one query per entity)
+- Write benchmark (bulk writes in one transaction vs one commit per row)
 """
 
 from __future__ import annotations
 
+import asyncio
+import sqlite3
+import time
+
 import pytest
 
 from akinator.db.models import Attribute, Entity
-from akinator.db.repository import Repository
+from akinator.db.repository import _MIGRATIONS, IMPORT_PROFILE, Repository
 
 
 class TestSchemaCreation:
@@ -186,6 +196,22 @@ class TestAliases:
         assert "Дарт Вейдер" in alias_texts
         await repo.close()
 
+    @pytest.mark.asyncio
+    async def test_get_all_aliases_matches_per_entity(self, tmp_db_path: str):
+        repo = Repository(tmp_db_path)
+        await repo.init_db()
+        e1 = await repo.add_entity("Darth Vader", "desc", "character", "en")
+        e2 = await repo.add_entity("Yoda", "desc", "character", "en")
+        e3 = await repo.add_entity("R2-D2", "desc", "character", "en")
+        await repo.add_alias(e1, "Дарт Вейдер", "ru")
+        await repo.add_alias(e2, "Йода", "ru")
+        await repo.add_alias(e1, "Anakin Skywalker", "en")
+        all_aliases = await repo.get_all_aliases()
+        assert set(all_aliases) == {e1, e2}
+        for eid in (e1, e2, e3):
+            assert all_aliases.get(eid, []) == await repo.get_aliases(eid)
+        await repo.close()
+
 
 class TestEmbeddings:
     """Embedding storage and retrieval."""
@@ -228,3 +254,460 @@ class TestEmbeddings:
         loaded = await repo.get_embedding(eid)
         assert loaded is None
         await repo.close()
+
+
+class TestTransactions:
+    """transaction() groups writes; bulk writers use it."""
+
+    @pytest.mark.asyncio
+    async def test_commit_on_exit(self, tmp_db_path: str):
+        repo = Repository(tmp_db_path)
+        await repo.init_db()
+        async with repo.transaction():
+            eid = await repo.add_entity("A", "", "person", "en")
+            await repo.add_alias(eid, "Alias", "en")
+            # Not visible to other connections until the block exits
+            with sqlite3.connect(tmp_db_path) as other:
+                assert other.execute("SELECT COUNT(*) FROM entities").fetchone()[0] == 0
+        with sqlite3.connect(tmp_db_path) as other:
+            assert other.execute("SELECT COUNT(*) FROM entity_aliases").fetchone()[0] == 1
+        await repo.close()
+
+    @pytest.mark.asyncio
+    async def test_rollback_on_error(self, tmp_db_path: str):
+        repo = Repository(tmp_db_path)
+        await repo.init_db()
+        with pytest.raises(RuntimeError):
+            async with repo.transaction():
+                await repo.add_entity("A", "", "person", "en")
+                async with repo.transaction():  # nested block joins the outer one
+                    await repo.add_entity("B", "", "person", "en")
+                raise RuntimeError
+        assert await repo.get_all_entities() == []
+        # Single writes commit on their own again afterwards
+        await repo.add_entity("C", "", "person", "en")
+        with sqlite3.connect(tmp_db_path) as other:
+            assert other.execute("SELECT name FROM entities").fetchall() == [("C",)]
+        await repo.close()
+
+    @pytest.mark.asyncio
+    async def test_other_tasks_do_not_join(self, tmp_db_path: str):
+        repo = Repository(tmp_db_path)
+        await repo.init_db()
+        inside = asyncio.Event()
+
+        async def failing():
+            async with repo.transaction():
+                await repo.add_entity("Rolled back", "", "person", "en")
+                inside.set()
+                await asyncio.sleep(0.02)
+                raise RuntimeError
+
+        task = asyncio.create_task(failing())
+        await inside.wait()
+        # Queues behind the open transaction instead of writing into it
+        await repo.add_entity("Kept", "", "person", "en")
+        with pytest.raises(RuntimeError):
+            await task
+        assert [e.name for e in await repo.get_all_entities()] == ["Kept"]
+        await repo.close()
+
+    @pytest.mark.asyncio
+    async def test_bulk_writes(self, tmp_db_path: str):
+        repo = Repository(tmp_db_path)
+        await repo.init_db()
+        aid = await repo.add_attribute("is_male", "?", "?", "identity")
+        first = await repo.add_entity("Existing", "", "person", "en")
+        ids = await repo.add_entities_bulk([
+            ("A", "a", "person", "en"), ("Б", "b", "character", "ru"), ("C", "c", "person", "en"),
+        ])
+        assert ids == [first + 1, first + 2, first + 3]
+        assert (await repo.get_entity(ids[1])).name == "Б"
+        assert await repo.add_entities_bulk([]) == []
+
+        await repo.add_aliases_bulk([(ids[0], "Alpha", "en"), (ids[0], "Альфа", "ru")])
+        assert await repo.get_aliases(ids[0]) == [("Alpha", "en"), ("Альфа", "ru")]
+
+        await repo.set_entity_attributes_bulk([(i, aid, 1.0) for i in ids])
+        await repo.set_entity_attributes_bulk([(ids[0], aid, 0.25)])  # upsert
+        assert await repo.get_entity_attribute(ids[0], aid) == 0.25
+        assert await repo.get_entity_attribute(ids[2], aid) == 1.0
+        await repo.close()
+
+    @pytest.mark.asyncio
+    async def test_bulk_ids_follow_deleted_rows(self, tmp_db_path: str):
+        """AUTOINCREMENT ids are not reused after a delete."""
+        repo = Repository(tmp_db_path)
+        await repo.init_db()
+        eid = await repo.add_entity("Gone", "", "person", "en")
+        with sqlite3.connect(tmp_db_path) as conn:
+            conn.execute("DELETE FROM entities")
+        ids = await repo.add_entities_bulk([("A", "", "person", "en"), ("B", "", "person", "en")])
+        assert ids == [eid + 1, eid + 2]
+        assert await repo.add_entity("C", "", "person", "en") == eid + 3
+        await repo.close()
+
+
+class TestPerformanceProfile:
+    """Connection PRAGMAs, migrations and indexed query plans."""
+
+    @staticmethod
+    async def _pragma(repo: Repository, name: str):
+        cursor = await (await repo._conn()).execute(f"PRAGMA {name}")
+        return (await cursor.fetchone())[0]
+
+    @pytest.mark.asyncio
+    async def test_bot_profile(self, tmp_db_path: str):
+        repo = Repository(tmp_db_path)
+        await repo.init_db()
+        assert await self._pragma(repo, "journal_mode") == "wal"
+        assert await self._pragma(repo, "synchronous") == 1  # NORMAL
+        assert await self._pragma(repo, "temp_store") == 2  # MEMORY
+        assert await self._pragma(repo, "cache_size") == -repo.profile.cache_kb
+        assert await self._pragma(repo, "mmap_size") == repo.profile.mmap_size
+        await repo.close()
+
+    @pytest.mark.asyncio
+    async def test_import_profile(self, tmp_db_path: str):
+        repo = Repository(tmp_db_path, IMPORT_PROFILE)
+        await repo.init_db()
+        assert await self._pragma(repo, "synchronous") == 0  # OFF
+        assert await self._pragma(repo, "cache_size") == -IMPORT_PROFILE.cache_kb
+        await repo.close()
+
+    @pytest.mark.asyncio
+    async def test_migrates_existing_database(self, tmp_db_path: str):
+        # A database from before the migrations: only the original feedback indexes
+        with sqlite3.connect(tmp_db_path) as conn:
+            conn.executescript("""
+                CREATE TABLE user_feedback (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT, entity_id INTEGER NOT NULL,
+                    attribute_id INTEGER NOT NULL, user_answer TEXT NOT NULL,
+                    expected_value REAL NOT NULL, timestamp TIMESTAMP, session_language TEXT NOT NULL
+                );
+                CREATE INDEX idx_feedback_entity ON user_feedback(entity_id);
+            """)
+        repo = Repository(tmp_db_path)
+        await repo.init_db()
+        await repo.init_db()  # idempotent
+        assert await self._pragma(repo, "user_version") == len(_MIGRATIONS)
+        cursor = await (await repo._conn()).execute("SELECT name FROM sqlite_master WHERE type = 'index'")
+        indexes = {r[0] for r in await cursor.fetchall()}
+        assert {"idx_entity_attributes_attribute", "idx_entities_name_lower", "idx_feedback_pair"} <= indexes
+        assert "idx_feedback_entity" not in indexes
+        await repo.close()
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("sql, index", [
+        ("SELECT * FROM entities WHERE lower(name) = lower(?)", "USING INDEX idx_entities_name_lower"),
+        (
+            "SELECT entity_id, value FROM entity_attributes WHERE attribute_id = ?",
+            "USING COVERING INDEX idx_entity_attributes_attribute",
+        ),
+        (
+            "SELECT alias, language FROM entity_aliases WHERE entity_id = ? ORDER BY id",
+            "USING INDEX idx_aliases_entity",
+        ),
+        (
+            """SELECT user_answer, COUNT(*) FROM user_feedback
+               WHERE entity_id = ? AND attribute_id = ? GROUP BY user_answer""",
+            "USING COVERING INDEX idx_feedback_pair",
+        ),
+        ("SELECT COUNT(*) FROM user_feedback WHERE entity_id = ?", "USING COVERING INDEX idx_feedback_pair"),
+        (
+            "SELECT yes, no FROM feedback_counts WHERE entity_id = ? AND attribute_id = ?",
+            "USING PRIMARY KEY (entity_id=? AND attribute_id=?)",
+        ),
+    ])
+    async def test_query_plans(self, tmp_db_path: str, sql: str, index: str):
+        repo = Repository(tmp_db_path)
+        await repo.init_db()
+        _populate(tmp_db_path, 500, 8)
+        plan = await repo.query_plan(sql, (1,) * sql.count("?"))
+        await repo.close()
+        assert any(index in step for step in plan), plan
+        assert not any(step.startswith("SCAN") for step in plan), plan
+        assert not any("TEMP B-TREE" in step for step in plan), plan
+
+    @pytest.mark.asyncio
+    async def test_find_by_name_case_insensitive(self, tmp_db_path: str):
+        repo = Repository(tmp_db_path)
+        await repo.init_db()
+        await repo.add_entity("Darth Vader", "", "character", "en")
+        assert (await repo.find_entity_by_name("darth VADER")).name == "Darth Vader"
+        assert await repo.find_entity_by_name("Vader") is None
+        await repo.close()
+
+
+class TestConnectionPool:
+    """Read-only readers beside one queued writer."""
+
+    @pytest.mark.asyncio
+    async def test_reads_proceed_during_write(self, tmp_db_path: str):
+        repo = Repository(tmp_db_path)
+        await repo.init_db()
+        await repo.add_entity("Committed", "", "person", "en")
+        inside, release = asyncio.Event(), asyncio.Event()
+
+        async def learn():
+            async with repo.transaction():
+                await repo.add_entity("Pending", "", "person", "en")
+                # The owning task reads its own uncommitted write
+                assert (await repo.find_entity_by_name("Pending")).name == "Pending"
+                inside.set()
+                await release.wait()
+
+        writer = asyncio.create_task(learn())
+        await inside.wait()
+        # Other tasks read the committed state without waiting for the writer
+        names = await asyncio.wait_for(repo.get_all_entities(), timeout=1)
+        assert [e.name for e in names] == ["Committed"]
+        release.set()
+        await writer
+        assert len(await repo.get_all_entities()) == 2
+        await repo.close()
+
+    @pytest.mark.asyncio
+    async def test_writes_queue(self, tmp_db_path: str):
+        repo = Repository(tmp_db_path)
+        await repo.init_db()
+        order: list[str] = []
+
+        async def write(name: str, hold: float):
+            async with repo.transaction():
+                order.append(name)
+                await repo.add_entity(name, "", "person", "en")
+                await asyncio.sleep(hold)
+
+        first = asyncio.create_task(write("first", 0.05))
+        await asyncio.sleep(0)
+        second = asyncio.create_task(write("second", 0))
+        await asyncio.sleep(0.01)
+        assert repo.write_waits.waiting == 1
+        await asyncio.gather(first, second)
+        assert order == ["first", "second"]
+        assert repo.write_waits.max_wait >= 0.03
+        await repo.close()
+
+    @pytest.mark.asyncio
+    async def test_reader_pool_bounded(self, tmp_db_path: str):
+        repo = Repository(tmp_db_path, readers=2)
+        await repo.init_db()
+        _populate(tmp_db_path, 50, 3)
+        results = await asyncio.gather(*(repo.get_all_entities() for _ in range(8)))
+        assert all(len(r) == 50 for r in results)
+        assert len(repo._reader_conns) == 2
+        assert repo.read_waits.acquired == 8
+        assert repo.read_waits.waiting == 0 and repo.read_waits.mean_wait >= 0
+        await repo.close()
+
+    @pytest.mark.asyncio
+    async def test_readers_are_read_only(self, tmp_db_path: str):
+        repo = Repository(tmp_db_path)
+        await repo.init_db()
+        async with repo._read() as db:
+            with pytest.raises(sqlite3.OperationalError, match="readonly"):
+                await db.execute("INSERT INTO attributes (key, question_ru, question_en) VALUES ('k', '', '')")
+        await repo.close()
+
+    @pytest.mark.asyncio
+    async def test_without_readers(self, tmp_db_path: str):
+        repo = Repository(tmp_db_path, readers=0)
+        await repo.init_db()
+        await repo.add_entity("A", "", "person", "en")
+        assert len(await repo.get_all_entities()) == 1
+        assert repo._reader_conns == [] and repo.read_waits.acquired == 0
+        await repo.close()
+
+
+class TestFeedbackCounts:
+    """Feedback is counted per (entity, attribute); the raw log is bounded."""
+
+    @staticmethod
+    def _log_ids(path: str) -> list[int]:
+        with sqlite3.connect(path) as conn:
+            return [r[0] for r in conn.execute("SELECT id FROM user_feedback ORDER BY id")]
+
+    @pytest.mark.asyncio
+    async def test_counts_accumulate(self, tmp_db_path: str):
+        repo = Repository(tmp_db_path)
+        await repo.init_db()
+        await repo.track_feedback_bulk([
+            (1, 2, "yes", 1.0, "en"), (1, 2, "yes", 1.0, "ru"), (1, 2, "probably_no", 1.0, "en"),
+            (1, 3, "dont_know", 0.0, "en"),
+        ])
+        await repo.track_feedback(1, 2, "no", 1.0)
+        assert await repo.get_feedback_stats(1, 2) == {"yes": 2, "probably_no": 1, "no": 1}
+        assert await repo.get_feedback_stats(1, 4) == {}
+        assert await repo.get_entity_feedback_count(1) == 5
+        assert await repo.get_entity_feedback_count(2) == 0
+        with sqlite3.connect(tmp_db_path) as conn:
+            assert conn.execute("SELECT COUNT(*) FROM feedback_counts").fetchone()[0] == 2
+        await repo.close()
+
+    @pytest.mark.asyncio
+    async def test_log_rotated(self, tmp_db_path: str):
+        repo = Repository(tmp_db_path, feedback_log_rows=3)
+        await repo.init_db()
+        for _ in range(2):
+            await repo.track_feedback_bulk([(1, 1, "yes", 1.0, "en")] * 4)
+        assert self._log_ids(tmp_db_path) == [6, 7, 8]
+        assert await repo.get_feedback_stats(1, 1) == {"yes": 8}
+        await repo.close()
+
+    @pytest.mark.asyncio
+    async def test_log_off(self, tmp_db_path: str):
+        repo = Repository(tmp_db_path, feedback_log_rows=0)
+        await repo.init_db()
+        await repo.track_feedback(1, 1, "no", 1.0)
+        assert self._log_ids(tmp_db_path) == []
+        assert await repo.get_feedback_stats(1, 1) == {"no": 1}
+        await repo.close()
+
+    @pytest.mark.asyncio
+    async def test_migration_backfills_log(self, tmp_db_path: str):
+        repo = Repository(tmp_db_path)
+        await repo.init_db()
+        await repo.close()
+        # A database from before the counts: only the raw log
+        with sqlite3.connect(tmp_db_path) as conn:
+            conn.executescript("DROP TABLE feedback_counts; PRAGMA user_version = 1;")
+            conn.executemany(
+                """INSERT INTO user_feedback (entity_id, attribute_id, user_answer, expected_value, session_language)
+                   VALUES (?, ?, ?, 1.0, 'en')""",
+                [(1, 1, "yes"), (1, 1, "YES"), (1, 1, "dont_know"), (2, 1, "no")],
+            )
+        repo = Repository(tmp_db_path)
+        await repo.init_db()
+        assert await repo.get_feedback_stats(1, 1) == {"yes": 2, "dont_know": 1}
+        assert await repo.get_feedback_stats(2, 1) == {"no": 1}
+        await repo.close()
+
+    @pytest.mark.asyncio
+    async def test_apply_learning(self, tmp_db_path: str):
+        repo = Repository(tmp_db_path)
+        await repo.init_db()
+        _populate(tmp_db_path, 3, 2)
+        await repo.set_entity_attributes_bulk([(i, 1, 1.0) for i in (1, 2, 3)])
+        await repo.track_feedback_bulk(
+            [(1, 1, "no", 1.0, "en")] * 3  # pulled down
+            + [(2, 1, "yes", 1.0, "en")] * 3  # already right
+            + [(3, 1, "no", 1.0, "en")] * 2  # too few samples
+            + [(9, 1, "no", 1.0, "en")] * 3  # no such entity
+        )
+        expected = await repo.calculate_learned_value(1, 1, 1.0)
+        assert expected == 0.3
+        assert await repo.apply_learning() == 1
+        assert await repo.get_entity_attribute(1, 1) == expected
+        assert await repo.get_entity_attribute(2, 1) == 1.0
+        assert await repo.get_entity_attribute(3, 1) == 1.0
+        await repo.close()
+
+
+def _populate(path: str, n_entities: int, n_attributes: int) -> None:
+    """Fill a fresh database directly (fast), with one ru and one en alias per entity."""
+    with sqlite3.connect(path) as conn:
+        conn.executemany(
+            "INSERT INTO entities (id, name, description, entity_type, language) VALUES (?, ?, '', 'person', 'en')",
+            [(i, f"Entity {i}") for i in range(1, n_entities + 1)],
+        )
+        conn.executemany(
+            "INSERT INTO attributes (id, key, question_ru, question_en) VALUES (?, ?, '?', '?')",
+            [(j, f"attr_{j}") for j in range(1, n_attributes + 1)],
+        )
+        conn.executemany(
+            "INSERT INTO entity_attributes (entity_id, attribute_id, value) VALUES (?, ?, ?)",
+            [(i, j, (i * j) % 5 / 4) for i in range(1, n_entities + 1) for j in range(1, n_attributes + 1)],
+        )
+        conn.executemany(
+            "INSERT INTO entity_aliases (entity_id, alias, language) VALUES (?, ?, ?)",
+            [(i, f"{lang} {i}", lang) for i in range(1, n_entities + 1) for lang in ("ru", "en")],
+        )
+
+
+class TestStartupBenchmark:
+    """Startup loads the catalogue with a fixed number of queries."""
+
+    N_ENTITIES = 3000
+
+    @pytest.mark.asyncio
+    async def test_bulk_aliases_beat_per_entity_queries(self, tmp_db_path: str, record_property):
+        repo = Repository(tmp_db_path)
+        await repo.init_db()
+        _populate(tmp_db_path, self.N_ENTITIES, 10)
+
+        start = time.perf_counter()
+        bulk = await repo.get_all_aliases()
+        bulk_s = time.perf_counter() - start
+
+        start = time.perf_counter()
+        per_entity = {eid: await repo.get_aliases(eid) for eid in range(1, self.N_ENTITIES + 1)}
+        per_entity_s = time.perf_counter() - start
+        await repo.close()
+
+        record_property("aliases_bulk_ms", round(bulk_s * 1000, 1))
+        record_property("aliases_per_entity_ms", round(per_entity_s * 1000, 1))
+        assert bulk == per_entity
+        assert bulk_s < per_entity_s / 5
+
+    @pytest.mark.asyncio
+    async def test_load_game_data(self, tmp_db_path: str, record_property):
+        from akinator.__main__ import load_game_data
+        from akinator.bot import handlers
+
+        repo = Repository(tmp_db_path)
+        await repo.init_db()
+        _populate(tmp_db_path, self.N_ENTITIES, 10)
+        try:
+            start = time.perf_counter()
+            await load_game_data(repo)
+            elapsed = time.perf_counter() - start
+            record_property("startup_ms", round(elapsed * 1000, 1))
+
+            assert handlers.get_knowledge_base().n_entities == self.N_ENTITIES
+            assert handlers.get_localized_entity_name(17, "ru") == "ru 17"
+            assert handlers.get_localized_entity_name(17, "en") == "en 17"
+            assert elapsed < 5.0
+        finally:
+            await handlers.set_game_data([], [])
+            await repo.close()
+
+
+class TestWriteBenchmark:
+    """Bulk writes in one transaction against one commit per row."""
+
+    N_ENTITIES = 200
+    N_ATTRIBUTES = 20
+
+    @pytest.mark.asyncio
+    async def test_bulk_build_beats_per_row_commits(self, tmp_path, record_property):
+        rows = [(f"Entity {i}", "", "person", "en") for i in range(self.N_ENTITIES)]
+
+        repo = Repository(str(tmp_path / "per_row.db"))
+        await repo.init_db()
+        start = time.perf_counter()
+        attr_ids = [await repo.add_attribute(f"a{j}", "?", "?", "c") for j in range(self.N_ATTRIBUTES)]
+        for row in rows:
+            eid = await repo.add_entity(*row)
+            await repo.add_alias(eid, row[0].lower(), "en")
+            for aid in attr_ids:
+                await repo.set_entity_attribute(eid, aid, 0.5)
+        per_row_s = time.perf_counter() - start
+        expected = await repo.get_all_entity_attributes()
+        await repo.close()
+
+        repo = Repository(str(tmp_path / "bulk.db"))
+        await repo.init_db()
+        start = time.perf_counter()
+        async with repo.transaction():
+            attr_ids = [await repo.add_attribute(f"a{j}", "?", "?", "c") for j in range(self.N_ATTRIBUTES)]
+            ids = await repo.add_entities_bulk(rows)
+            await repo.add_aliases_bulk((eid, row[0].lower(), "en") for eid, row in zip(ids, rows))
+            await repo.set_entity_attributes_bulk((eid, aid, 0.5) for eid in ids for aid in attr_ids)
+        bulk_s = time.perf_counter() - start
+        assert await repo.get_all_entity_attributes() == expected
+        await repo.close()
+
+        record_property("build_per_row_ms", round(per_row_s * 1000, 1))
+        record_property("build_bulk_ms", round(bulk_s * 1000, 1))
+        assert bulk_s < per_row_s / 5
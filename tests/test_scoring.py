@@ -7,17 +7,20 @@ Covers:
 - Smoothing (epsilon floor)
 - Pruning of low-weight candidates
 - top_k / max_prob / entropy helpers
+- Array-backed session state (in-place update, mask pruning, top-k ties)
+- Log-space scoring and batched replay
 """
 
 from __future__ import annotations
 
 import math
 
+import numpy as np
 import pytest
 
 from akinator.config import EPSILON, PRUNE_THRESHOLD
 from akinator.db.models import Answer, Entity, GameSession
-from akinator.engine.scoring import ScoringEngine
+from akinator.engine.scoring import ScoringEngine, top_indices
 
 
 class TestWeightInitialization:
@@ -244,3 +247,112 @@ class TestMissingAttributes:
         # Entity A has is_fictional=1.0 → likelihood 1.0
         # So A should have higher weight than B
         assert session.weights[0] > session.weights[1]
+
+
+class TestArrayState:
+    """Session weights and candidates live in NumPy arrays."""
+
+    def test_update_is_in_place(
+        self, uniform_session: GameSession, sample_entities: list[Entity]
+    ):
+        weights = uniform_session.weight_array
+        ScoringEngine().update(uniform_session, sample_entities, "is_male", Answer.YES)
+        assert uniform_session.weight_array is weights
+        assert uniform_session.weight_array.dtype == np.float64
+
+    def test_pruning_keeps_arrays_aligned(self, sample_entities: list[Entity]):
+        engine = ScoringEngine()
+        session = GameSession(
+            session_id="prune-arrays", user_id=1,
+            candidate_ids=[e.id for e in sample_entities],
+            weights=[0.2] * 5,
+        )
+        for _ in range(10):
+            engine.update(session, sample_entities, "from_russia", Answer.NO)
+        assert 5 not in session.candidate_ids  # Gagarin (from_russia=1.0)
+        assert len(session.candidate_array) == len(session.weight_array) == len(session.candidate_rows)
+        assert session.candidate_array.dtype == np.int64
+        assert session.candidate_rows.dtype == np.int32
+
+    def test_lists_still_read_back(self, uniform_session: GameSession):
+        assert isinstance(uniform_session.candidate_ids, list)
+        assert isinstance(uniform_session.weights, list)
+        assert uniform_session.candidate_ids == [1, 2, 3, 4, 5]
+
+    def test_top_k_ties_keep_candidate_order(self):
+        session = GameSession(
+            session_id="ties", user_id=1,
+            candidate_ids=[10, 20, 30, 40], weights=[0.1, 0.4, 0.1, 0.4],
+        )
+        assert ScoringEngine().top_k(session, k=3) == [(20, 0.4), (40, 0.4), (10, 0.1)]
+
+    @pytest.mark.parametrize("k", [1, 3, 10, 50])
+    def test_top_indices_matches_stable_sort(self, k: int):
+        rng = np.random.default_rng(k)
+        weights = rng.integers(0, 8, size=40) / 8  # many ties
+        expected = sorted(range(40), key=lambda i: weights[i], reverse=True)[:k]
+        assert top_indices(weights, k).tolist() == expected
+
+
+class TestLogSpace:
+    """Log-weight mode matches the linear scorer and normalizes lazily."""
+
+    ANSWERS = [
+        ("is_fictional", Answer.YES),
+        ("is_male", Answer.PROBABLY_NO),
+        ("from_movie", Answer.DONT_KNOW),
+        ("is_villain", Answer.NO),
+    ]
+
+    def _session(self, sample_entities: list[Entity]) -> GameSession:
+        n = len(sample_entities)
+        return GameSession(
+            session_id="log", user_id=1,
+            candidate_ids=[e.id for e in sample_entities], weights=[1.0 / n] * n,
+        )
+
+    def test_matches_linear_scoring(self, sample_entities: list[Entity]):
+        linear, logs = self._session(sample_entities), self._session(sample_entities)
+        for key, answer in self.ANSWERS:
+            ScoringEngine().update(linear, sample_entities, key, answer)
+            ScoringEngine(log_space=True).update(logs, sample_entities, key, answer)
+        assert logs.candidate_ids == linear.candidate_ids
+        assert logs.weights == pytest.approx(linear.weights, rel=1e-9)
+
+    def test_normalizes_on_read(self, sample_entities: list[Entity]):
+        session = self._session(sample_entities)
+        ScoringEngine(log_space=True).update(session, sample_entities, "is_fictional", Answer.YES)
+        assert session.log_weights is not None
+        assert session.weight_array.sum() == pytest.approx(1.0)
+        # Assigning linear weights drops the log state
+        session.weights = [0.2] * 5
+        assert session.log_weights is None
+
+    def test_long_game_does_not_underflow(self, sample_entities: list[Entity]):
+        engine = ScoringEngine(log_space=True)
+        session = self._session(sample_entities)
+        for _ in range(500):
+            engine.update(session, sample_entities, "is_male", Answer.PROBABLY_YES)
+        assert np.isfinite(session.log_weights).all()
+        assert sum(session.weights) == pytest.approx(1.0)
+        assert engine.max_prob(session)[0] in (1, 2, 3, 5)
+
+    def test_prunes_only_what_linear_would(self, sample_entities: list[Entity]):
+        linear, logs = self._session(sample_entities), self._session(sample_entities)
+        for _ in range(10):
+            ScoringEngine().update(linear, sample_entities, "from_russia", Answer.NO)
+            ScoringEngine(log_space=True).update(logs, sample_entities, "from_russia", Answer.NO)
+        assert set(linear.candidate_ids) <= set(logs.candidate_ids)
+        assert 5 not in logs.candidate_ids
+
+    @pytest.mark.parametrize("log_space", [False, True])
+    def test_replay_matches_sequential_updates(
+        self, sample_entities: list[Entity], log_space: bool,
+    ):
+        engine = ScoringEngine(log_space=log_space)
+        sequential, batched = self._session(sample_entities), self._session(sample_entities)
+        for key, answer in self.ANSWERS:
+            engine.update(sequential, sample_entities, key, answer)
+        engine.replay(batched, sample_entities, self.ANSWERS)
+        assert batched.candidate_ids == sequential.candidate_ids
+        assert batched.weights == pytest.approx(sequential.weights, rel=1e-9)
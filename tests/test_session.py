@@ -6,6 +6,7 @@ Covers:
 - Guess decision logic (threshold, max questions, few candidates)
 - Integration of scoring + question policy
 - Second guess logic
+- Shared (copy-on-write) uniform prior
 """
 
 from __future__ import annotations
@@ -14,7 +15,8 @@ import pytest
 
 from akinator.config import GUESS_THRESHOLD, MAX_QUESTIONS, SECOND_GUESS_THRESHOLD
 from akinator.db.models import Answer, Entity, GameMode, GameSession
-from akinator.engine.session import GameSessionManager
+from akinator.engine.knowledge_base import KnowledgeBase
+from akinator.engine.session import UNIFORM_PRIOR, GameSessionManager
 from akinator.engine.scoring import ScoringEngine
 from akinator.engine.question_policy import QuestionPolicy
 
@@ -271,3 +273,35 @@ class TestProcessAnswer:
             uniform_session, sample_entities, attr, Answer.YES
         )
         assert attr.id in uniform_session.asked_attributes
+
+
+class TestSharedPrior:
+    """Uniform-prior games share their starting arrays until the first answer."""
+
+    @pytest.mark.parametrize("log_space", [False, True])
+    def test_copy_on_first_update(self, sample_entities: list[Entity], log_space: bool):
+        kb = KnowledgeBase.from_entities(sample_entities)
+        manager = GameSessionManager(ScoringEngine(log_space=log_space), QuestionPolicy())
+        a = GameSession(session_id="a", user_id=1)
+        b = GameSession(session_id="b", user_id=2)
+        manager.init_candidates(a, kb.entity_ids, prior=UNIFORM_PRIOR)
+        manager.init_candidates(b, kb.entity_ids, prior=UNIFORM_PRIOR)
+        assert a.candidate_array is b.candidate_array is kb.entity_ids
+        assert a.weight_array is b.weight_array
+
+        manager.scoring_engine.update(a, kb, "is_fictional", Answer.YES)
+        assert a.weights != b.weights
+        assert b.weights == pytest.approx([1 / len(sample_entities)] * len(sample_entities))
+        assert b.candidate_array is kb.entity_ids
+
+    def test_same_result_as_owned_arrays(self, sample_entities: list[Entity]):
+        kb = KnowledgeBase.from_entities(sample_entities)
+        manager = GameSessionManager(ScoringEngine(), QuestionPolicy())
+        shared = GameSession(session_id="s", user_id=1)
+        owned = GameSession(session_id="o", user_id=1)
+        manager.init_candidates(shared, kb.entity_ids, prior=UNIFORM_PRIOR)
+        manager.init_candidates(owned, kb.entity_ids.tolist())
+        for session in (shared, owned):
+            manager.scoring_engine.update(session, kb, "is_male", Answer.PROBABLY_YES)
+        assert shared.candidate_ids == owned.candidate_ids
+        assert shared.weights == pytest.approx(owned.weights)
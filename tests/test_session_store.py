@@ -0,0 +1,385 @@
+"""Tests for the Session Store (game sessions with pluggable backends).
+
+Covers:
+- Binary encoding round-trip (weights, log-weights, history, wide ids)
+- In-memory store behaves like a dict
+- Write-behind batching, deletes and restart survival (SQLite, Redis stand-in)
+- Loads off the event loop (aget), and SQLite loads that don't wait on writes
+- TTL expiry in the backends
+- In-memory eviction (idle TTL, LRU cap), FINISHED compaction and counters
+"""
+
+from __future__ import annotations
+
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pytest
+
+from akinator.db.models import Answer, GameMode, GameSession, QAPair
+from akinator.db.session_store import (
+    MemorySessionStore,
+    PersistentSessionStore,
+    RedisSessionBackend,
+    SQLiteSessionBackend,
+    compact_session,
+    decode_session,
+    encode_session,
+    session_nbytes,
+)
+
+
+class FakeRedis:
+    """Minimal redis-py stand-in: strings with expiry, pipelines, delete."""
+
+    def __init__(self) -> None:
+        self.data: dict[str, tuple[bytes, float]] = {}
+        self.pipelines = 0
+
+    def get(self, key: str) -> bytes | None:
+        value = self.data.get(key)
+        if value is None or value[1] <= time.time():
+            return None
+        return value[0]
+
+    def set(self, key: str, value: bytes, ex: int) -> None:
+        self.data[key] = (value, time.time() + ex)
+
+    def delete(self, *keys: str) -> None:
+        for key in keys:
+            self.data.pop(key, None)
+
+    def pipeline(self) -> "FakeRedis._Pipeline":
+        self.pipelines += 1
+        return FakeRedis._Pipeline(self)
+
+    class _Pipeline:
+        def __init__(self, client: "FakeRedis") -> None:
+            self.client = client
+            self.ops: list[tuple] = []
+
+        def set(self, key: str, value: bytes, ex: int) -> None:
+            self.ops.append((key, value, ex))
+
+        def execute(self) -> None:
+            for op in self.ops:
+                self.client.set(*op)
+
+
+def _assert_same(a: GameSession, b: GameSession) -> None:
+    assert a == b
+    np.testing.assert_array_equal(a.candidate_array, b.candidate_array)
+    np.testing.assert_allclose(a.weight_array, b.weight_array)
+
+
+def _session(user_id: int = 7) -> GameSession:
+    return GameSession(
+        session_id="abc", user_id=user_id, language="en", mode=GameMode.ASKING,
+        candidate_ids=[1, 2, 3], weights=[0.5, 0.3, 0.2], prior="uniform",
+        asked_attributes=[4, 9],
+        history=[
+            QAPair(attribute_id=4, attribute_key="is_male", question_text="Male?", answer=Answer.YES),
+            QAPair(attribute_id=None, attribute_key="llm", question_text="Вымышленный?", answer=Answer.PROBABLY_NO),
+        ],
+        hint_text="a wizard", guess_count=1, question_count=2,
+    )
+
+
+@pytest.fixture
+def sqlite_backend(tmp_db_path: str):
+    backend = SQLiteSessionBackend(tmp_db_path)
+    yield backend
+    backend.close()
+
+
+class TestEncoding:
+    """encode_session() / decode_session() round-trip."""
+
+    def test_round_trip(self):
+        session = _session()
+        _assert_same(decode_session(encode_session(session)), session)
+
+    def test_log_weights_stored_as_is(self):
+        session = _session()
+        session.log_weights = np.array([-1.0, -2.5, -700.0])
+        decoded = decode_session(encode_session(session))
+        np.testing.assert_array_equal(decoded.log_weights, session.log_weights)
+
+    def test_wide_ids_and_empty_fields(self):
+        session = GameSession(session_id="x", user_id=1, candidate_ids=[2**40, 5], weights=[0.5, 0.5])
+        decoded = decode_session(encode_session(session))
+        assert decoded.candidate_ids == [2**40, 5]
+        assert decoded.hint_text is None and decoded.prior is None
+
+    def test_compact(self):
+        session = GameSession(
+            session_id="s", user_id=1, candidate_ids=list(range(500)), weights=[1 / 500] * 500,
+        )
+        # 4-byte ids + 8-byte weights plus a small header
+        assert len(encode_session(session)) < 500 * 12 + 100
+
+    def test_rejects_foreign_data(self):
+        with pytest.raises(ValueError):
+            decode_session(b"not a session record at all, sorry")
+
+
+class TestMemoryStore:
+    """MemorySessionStore is a plain mapping."""
+
+    async def test_mapping_api(self):
+        store = MemorySessionStore()
+        session = _session()
+        store[7] = session
+        assert 7 in store and store.get(7) is session and store.get(8) is None
+        assert len(store) == 1
+        del store[7]
+        assert 7 not in store
+        await store.close()
+
+
+class TestPersistentStore:
+    """Write-behind caching over a backend."""
+
+    @pytest.mark.parametrize("kind", ["sqlite", "redis"])
+    async def test_survives_restart(self, kind: str, tmp_db_path: str):
+        def backend():
+            return SQLiteSessionBackend(tmp_db_path) if kind == "sqlite" else RedisSessionBackend(redis)
+
+        redis = FakeRedis()
+        session = _session()
+        store = PersistentSessionStore(backend())
+        store[7] = session
+        await store.close()
+
+        restarted = PersistentSessionStore(backend())
+        _assert_same(restarted[7], session)
+        assert 8 not in restarted
+        await restarted.close()
+
+    async def test_in_place_changes_written_back(self, sqlite_backend: SQLiteSessionBackend):
+        store = PersistentSessionStore(sqlite_backend)
+        store[7] = _session()
+        await store.flush()
+        store.get(7).question_count = 5
+        await store.flush()
+        assert decode_session(sqlite_backend.load(7)).question_count == 5
+
+    async def test_batches_writes(self):
+        redis = FakeRedis()
+        store = PersistentSessionStore(RedisSessionBackend(redis))
+        for uid in range(20):
+            store[uid] = _session(uid)
+            store[uid].question_count += 1
+        await store.flush()
+        await store.flush()  # nothing pending
+        assert redis.pipelines == 1 and store.writes == 1
+        assert len(redis.data) == 20
+
+    async def test_delete(self, sqlite_backend: SQLiteSessionBackend):
+        store = PersistentSessionStore(sqlite_backend)
+        store[7] = _session()
+        await store.flush()
+        del store[7]
+        assert 7 not in store
+        await store.flush()
+        assert sqlite_backend.load(7) is None
+
+    async def test_background_flush(self, sqlite_backend: SQLiteSessionBackend):
+        store = PersistentSessionStore(sqlite_backend, flush_interval=0.01)
+        store.start()
+        store[7] = _session()
+        for _ in range(100):
+            if sqlite_backend.load(7) is not None:
+                break
+            await asyncio.sleep(0.01)
+        assert sqlite_backend.load(7) is not None
+        await store.close()
+
+    async def test_undecodable_record_dropped(self):
+        redis = FakeRedis()
+        redis.set("akinator:session:7", b"garbage", ex=60)
+        store = PersistentSessionStore(RedisSessionBackend(redis))
+        assert store.get(7) is None
+
+    async def test_aget_loads_in_thread(self, sqlite_backend: SQLiteSessionBackend):
+        session = _session()
+        sqlite_backend.save_many({7: encode_session(session)}, ttl=60)
+        store = PersistentSessionStore(sqlite_backend)
+        loop_thread = threading.get_ident()
+        load = sqlite_backend.load
+        threads = []
+
+        def tracking_load(user_id: int) -> bytes | None:
+            threads.append(threading.get_ident())
+            return load(user_id)
+
+        sqlite_backend.load = tracking_load
+        _assert_same(await store.aget(7), session)
+        assert await store.aget(8) is None
+        assert threads and loop_thread not in threads
+        # Now in memory: no further backend reads
+        count = len(threads)
+        assert await store.aget(7) is store.get(7)
+        assert len(threads) == count
+
+    async def test_aget_keeps_session_set_while_loading(self):
+        redis = FakeRedis()
+        redis.set("akinator:session:7", encode_session(_session()), ex=60)
+        store = PersistentSessionStore(RedisSessionBackend(redis))
+        newer = _session()
+        load = store.backend.load
+
+        def racing_load(user_id: int) -> bytes | None:
+            data = load(user_id)
+            store[user_id] = newer
+            return data
+
+        store.backend.load = racing_load
+        assert await store.aget(7) is newer
+
+
+class Clock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def _big_session(user_id: int, n: int = 1000) -> GameSession:
+    return GameSession(
+        session_id=str(user_id), user_id=user_id, mode=GameMode.ASKING,
+        candidate_ids=list(range(n)), weights=[1 / n] * n,
+    )
+
+
+class TestEviction:
+    """Idle, excess and finished sessions don't pile up in memory."""
+
+    def test_idle_ttl(self):
+        clock = Clock()
+        store = MemorySessionStore(ttl=10, clock=clock)
+        store[1] = _session(1)
+        store[2] = _session(2)
+        clock.now = 8
+        assert store.get(2) is not None  # touch
+        clock.now = 15
+        assert store.get(1) is None
+        assert 2 in store
+        assert store.evicted == 1
+
+    def test_sweep_removes_expired(self):
+        clock = Clock()
+        store = MemorySessionStore(ttl=10, clock=clock)
+        for uid in range(5):
+            clock.now = uid
+            store[uid] = _session(uid)
+        clock.now = 12.5
+        assert store.sweep() == 3
+        assert sorted(store) == [3, 4]
+        assert store.live == 2
+
+    def test_lru_cap(self):
+        store = MemorySessionStore(max_sessions=3)
+        for uid in range(3):
+            store[uid] = _session(uid)
+        store.get(0)  # most recently used now
+        store[3] = _session(3)
+        assert sorted(store) == [0, 2, 3]
+        assert store.evicted == 1
+
+    def test_finished_compacted(self):
+        store = MemorySessionStore()
+        store[1] = _big_session(1)
+        store[2] = _big_session(2)
+        store[1].mode = GameMode.FINISHED
+        before = store.nbytes
+        store.sweep()
+        assert store.compacted == 1
+        assert store[1].candidate_ids == [] and store[1].mode == GameMode.FINISHED
+        assert len(store[2].candidate_ids) == 1000
+        assert store.nbytes < before - 1000 * 12
+
+    def test_compaction_keeps_summary(self):
+        session = _session()
+        session.mode = GameMode.FINISHED
+        assert compact_session(session)
+        assert not compact_session(session)  # nothing left to free
+        assert session.question_count == 2 and len(session.history) == 2
+        assert session_nbytes(session) < 1024
+
+    def test_memory_stays_flat(self):
+        clock = Clock()
+        store = MemorySessionStore(ttl=60, max_sessions=50, clock=clock)
+        for uid in range(500):
+            clock.now = uid
+            store[uid] = _big_session(uid, 200)
+            if uid % 2:
+                store[uid].mode = GameMode.FINISHED
+            if uid % 25 == 0:
+                store.sweep()
+        store.sweep()
+        assert store.live <= 50
+        assert store.nbytes <= 50 * session_nbytes(_big_session(0, 200))
+
+    async def test_background_sweep(self):
+        store = MemorySessionStore(sweep_interval=0.01)
+        store[1] = _big_session(1)
+        store[1].mode = GameMode.FINISHED
+        store.start()
+        for _ in range(100):
+            if store.compacted:
+                break
+            await asyncio.sleep(0.01)
+        await store.close()
+        assert store.compacted == 1
+
+    async def test_persistent_releases_idle_memory(self, sqlite_backend: SQLiteSessionBackend):
+        clock = Clock()
+        store = PersistentSessionStore(sqlite_backend, memory_ttl=10, clock=clock)
+        store[1] = _session(1)
+        store[2] = _big_session(2)
+        store[2].mode = GameMode.FINISHED
+        assert store.sweep() == 0  # not written back yet
+        await store.flush()
+        assert decode_session(sqlite_backend.load(2)).candidate_ids == []
+        clock.now = 20
+        assert store.sweep() == 2
+        assert store.live == 0
+        assert store[1].session_id == "abc"  # reloaded from the backend
+
+
+class TestExpiry:
+    """Backends forget sessions idle for longer than the TTL."""
+
+    def test_sqlite(self, sqlite_backend: SQLiteSessionBackend):
+        sqlite_backend.save_many({1: b"old"}, ttl=-1)
+        sqlite_backend.save_many({2: b"new"}, ttl=60)
+        assert sqlite_backend.load(1) is None
+        assert sqlite_backend.load(2) == b"new"
+        # Expired rows are purged on the next write
+        count = sqlite_backend._conn.execute("SELECT COUNT(*) FROM sessions").fetchone()[0]
+        assert count == 1
+
+    def test_sqlite_load_skips_open_write(self, sqlite_backend: SQLiteSessionBackend):
+        sqlite_backend.save_many({1: b"old"}, ttl=60)
+        # The flusher holds its lock, mid-transaction; a load from another thread still returns
+        with ThreadPoolExecutor(1) as pool, sqlite_backend._lock:
+            sqlite_backend._conn.execute("BEGIN IMMEDIATE")
+            sqlite_backend._conn.execute("UPDATE sessions SET data = ? WHERE user_id = 1", (b"new",))
+            assert pool.submit(sqlite_backend.load, 1).result(timeout=5) == b"old"
+            sqlite_backend._conn.execute("COMMIT")
+        assert sqlite_backend.load(1) == b"new"
+
+    def test_sqlite_uses_wal(self, sqlite_backend: SQLiteSessionBackend):
+        mode = sqlite_backend._conn.execute("PRAGMA journal_mode").fetchone()[0]
+        assert mode == "wal"
+
+    def test_redis_sets_expiry(self):
+        redis = FakeRedis()
+        RedisSessionBackend(redis).save_many({1: b"x"}, ttl=30)
+        _, expires_at = redis.data["akinator:session:1"]
+        assert 25 < expires_at - time.time() <= 30
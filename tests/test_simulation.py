@@ -17,6 +17,7 @@ import pytest
 from akinator.config import MAX_QUESTIONS
 from akinator.db.models import Answer, Entity, GameMode
 from akinator.db.repository import Repository
+from akinator.engine.knowledge_base import KnowledgeBase
 from akinator.engine.session import GameSessionManager
 from akinator.engine.scoring import ScoringEngine
 from akinator.engine.question_policy import QuestionPolicy
@@ -167,6 +168,7 @@ async def simulate_entity(
 
     # Get all attributes
     all_attributes = await repo.get_all_attributes()
+    knowledge_base = KnowledgeBase.from_entities(entities_with_attrs, all_attributes)
 
     # Play the game
     questions_asked = 0
@@ -180,7 +182,7 @@ async def simulate_entity(
         if not available_attrs:
             break
 
-        best_attr_key = policy.select(session, entities_with_attrs, available_attrs)
+        best_attr_key = policy.select(session, knowledge_base, available_attrs)
         if not best_attr_key:
             break
 
@@ -191,7 +193,7 @@ async def simulate_entity(
         answer = oracle.answer_question(best_attr.key)
 
         # Update session
-        manager.process_answer(session, entities_with_attrs, best_attr, answer)
+        manager.process_answer(session, knowledge_base, best_attr, answer)
         questions_asked += 1
 
     # Get the final guess
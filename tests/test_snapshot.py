@@ -0,0 +1,267 @@
+"""Tests for the Catalogue Snapshot loader and snapshot files.
+
+Covers:
+- The knowledge base matches one built from per-entity attribute dicts
+- Values of unknown entities / attributes are ignored
+- Aliases, load report, and the read transaction being closed
+- Snapshot files round-trip, are memory-mapped and read-only
+- Catalogue changes make a file stale; stale or corrupt files fall back to SQLite
+- Databases without a stamp (a bundled copy) are stamped by their content
+"""
+
+from __future__ import annotations
+
+import mmap
+import os
+import shutil
+import sqlite3
+from contextlib import closing
+
+import numpy as np
+import pytest
+
+from akinator.db.repository import Repository
+from akinator.db.models import Answer
+from akinator.db.snapshot import (
+    SnapshotError,
+    default_snapshot_path,
+    load_catalogue,
+    load_snapshot,
+    read_snapshot_file,
+    write_snapshot_file,
+)
+from akinator.engine.knowledge_base import KnowledgeBase
+from tests.test_repository import _populate
+
+
+@pytest.fixture
+async def repo(tmp_db_path: str):
+    repo = Repository(tmp_db_path)
+    await repo.init_db()
+    yield repo
+    await repo.close()
+
+
+class TestLoadSnapshot:
+    """load_snapshot() reproduces the per-query loading path."""
+
+    async def test_matches_dict_build(self, repo: Repository, tmp_db_path: str):
+        _populate(tmp_db_path, 200, 12)
+        snapshot = await load_snapshot(repo)
+
+        entities = await repo.get_all_entities()
+        attributes = await repo.get_all_attributes()
+        expected = KnowledgeBase.build(
+            (e.id for e in entities), (a.key for a in attributes),
+            await repo.get_all_entity_attributes(),
+        )
+        kb = snapshot.knowledge_base
+        assert [e.id for e in snapshot.entities] == [e.id for e in entities]
+        assert [a.key for a in snapshot.attributes] == [a.key for a in attributes]
+        np.testing.assert_array_equal(kb.entity_ids, expected.entity_ids)
+        assert kb.attribute_keys == expected.attribute_keys
+        np.testing.assert_array_equal(kb.values, expected.values)
+        np.testing.assert_array_equal(kb.known, expected.known)
+        assert kb.row_of == expected.row_of
+
+    async def test_ignores_orphan_values(self, repo: Repository, tmp_db_path: str):
+        _populate(tmp_db_path, 3, 2)
+        with sqlite3.connect(tmp_db_path) as conn:
+            conn.execute("DELETE FROM entity_attributes WHERE entity_id = 2")
+            conn.execute("INSERT INTO entity_attributes (entity_id, attribute_id, value) VALUES (99, 1, 1.0)")
+            conn.execute("INSERT INTO entity_attributes (entity_id, attribute_id, value) VALUES (2, 77, 1.0)")
+        kb = (await load_snapshot(repo)).knowledge_base
+        assert kb.n_entities == 3
+        assert not kb.known[kb.row_of[2]].any()
+
+    async def test_aliases_and_report(self, repo: Repository, tmp_db_path: str):
+        _populate(tmp_db_path, 10, 3)
+        snapshot = await load_snapshot(repo)
+        assert snapshot.aliases[4] == [("ru 4", "ru"), ("en 4", "en")]
+        assert snapshot.kb_nbytes == snapshot.knowledge_base.nbytes > 0
+        assert snapshot.load_seconds > 0
+        assert "10 entities, 3 attributes" in snapshot.report()
+
+    async def test_transaction_closed(self, repo: Repository, tmp_db_path: str):
+        _populate(tmp_db_path, 5, 2)
+        await load_snapshot(repo)
+        assert not (await repo._conn()).in_transaction
+        # The connection still writes normally afterwards
+        await repo.add_entity("New", "desc", "person", "en")
+        assert len(await repo.get_all_entities()) == 6
+
+    async def test_empty_database(self, repo: Repository):
+        snapshot = await load_snapshot(repo)
+        assert snapshot.entities == [] and snapshot.knowledge_base.n_entities == 0
+
+
+@pytest.fixture
+def snapshot_path(tmp_db_path: str) -> str:
+    return default_snapshot_path(tmp_db_path)
+
+
+class TestCatalogueVersion:
+    """The version stamp follows catalogue changes only."""
+
+    async def test_changes_bump_version(self, repo: Repository, tmp_db_path: str):
+        _populate(tmp_db_path, 3, 2)
+        before = await repo.get_catalogue_version()
+        await repo.set_entity_attribute(1, 1, 0.25)
+        after_value = await repo.get_catalogue_version()
+        await repo.add_alias(2, "Second", "en")
+        assert len({before, after_value, await repo.get_catalogue_version()}) == 3
+
+    async def test_play_counts_do_not(self, repo: Repository, tmp_db_path: str):
+        _populate(tmp_db_path, 3, 2)
+        before = await repo.get_catalogue_version()
+        await repo.increment_play_count(1)
+        assert await repo.get_catalogue_version() == before
+
+    async def test_copies_share_the_stamp(self, repo: Repository, tmp_path):
+        await repo.add_entity("A", "", "person", "en")
+        copy_path = str(tmp_path / "copy.db")
+        with sqlite3.connect(repo.db_path) as src, sqlite3.connect(copy_path) as dst:
+            src.backup(dst)
+        copy = Repository(copy_path)
+        await copy.init_db()
+        other = Repository(str(tmp_path / "other.db"))
+        await other.init_db()
+        assert await copy.get_catalogue_version() == await repo.get_catalogue_version()
+        assert await other.get_catalogue_version() != await repo.get_catalogue_version()
+        await copy.close()
+        await other.close()
+
+    async def test_database_without_stamp_is_stamped_by_content(self, tmp_path):
+        """A bundled database copied in on every start: any edit changes the stamp."""
+        async def bundled(path: str, name: str) -> None:
+            repo = Repository(path)
+            await repo.init_db()
+            await repo.add_entity(name, "", "person", "en")
+            await repo.close()
+            with closing(sqlite3.connect(path)) as conn:
+                triggers = conn.execute("SELECT name FROM sqlite_master WHERE type = 'trigger'").fetchall()
+                for (trigger,) in triggers:
+                    conn.execute(f"DROP TRIGGER {trigger}")
+                conn.execute("DROP TABLE catalogue_meta")
+                conn.commit()
+
+        async def stamp(path: str) -> str:
+            repo = Repository(path)
+            await repo.init_db()
+            version = await repo.get_catalogue_version()
+            await repo.close()
+            return version
+
+        original, renamed = str(tmp_path / "original.db"), str(tmp_path / "renamed.db")
+        await bundled(original, "Alpha")
+        await bundled(renamed, "Bravo")  # same counts, same sizes
+        first_copy, second_copy = str(tmp_path / "a.db"), str(tmp_path / "b.db")
+        shutil.copy2(original, first_copy)
+        shutil.copy2(original, second_copy)
+        assert await stamp(first_copy) == await stamp(second_copy)
+        assert await stamp(renamed) != await stamp(first_copy)
+
+
+class TestSnapshotFile:
+    """write_snapshot_file() / read_snapshot_file()."""
+
+    async def test_round_trip(self, repo: Repository, tmp_db_path: str, snapshot_path: str):
+        _populate(tmp_db_path, 50, 6)
+        await repo.set_embedding(3, np.arange(4, dtype=np.float32))
+        version = await repo.get_catalogue_version()
+        loaded = await load_snapshot(repo)
+        write_snapshot_file(snapshot_path, loaded, version, await repo.get_all_embeddings())
+
+        mapped = read_snapshot_file(snapshot_path, version, verify=True)
+        assert mapped.source == "file"
+        assert mapped.entities == loaded.entities
+        assert mapped.attributes == loaded.attributes
+        assert mapped.aliases == loaded.aliases
+        kb, expected = mapped.knowledge_base, loaded.knowledge_base
+        assert kb.attribute_keys == expected.attribute_keys
+        assert kb.row_of == expected.row_of
+        np.testing.assert_array_equal(kb.values, expected.values)
+        np.testing.assert_array_equal(kb.known, expected.known)
+        for answer in Answer:
+            np.testing.assert_array_equal(kb.likelihoods[answer], expected.likelihoods[answer])
+        np.testing.assert_array_equal(kb.yes_entropy_terms, expected.yes_entropy_terms)
+        assert mapped.embedding_ids.tolist() == [3]
+        assert mapped.embeddings[0].tolist() == [0.0, 1.0, 2.0, 3.0]
+
+    async def test_arrays_are_mapped_read_only(self, repo: Repository, tmp_db_path: str, snapshot_path: str):
+        _populate(tmp_db_path, 20, 4)
+        write_snapshot_file(snapshot_path, await load_snapshot(repo), "v")
+        kb = read_snapshot_file(snapshot_path).knowledge_base
+        base = kb.values
+        while isinstance(base, np.ndarray):
+            base = base.base
+        assert isinstance(base.obj, mmap.mmap)  # a view of the mapping, not a copy
+        with pytest.raises(ValueError):
+            kb.values[0, 0] = 1.0
+        # Learning copies the mapped matrix
+        assert kb.with_attributes(1, {"attr_1": 0.0}).value(1, "attr_1") == 0.0
+
+    async def test_unicode_strings(self, repo: Repository, snapshot_path: str):
+        eid = await repo.add_entity("Гарри Поттер", "волшебник", "character", "ru")
+        await repo.add_alias(eid, "Гарри", "ru")
+        write_snapshot_file(snapshot_path, await load_snapshot(repo), "v")
+        mapped = read_snapshot_file(snapshot_path)
+        assert mapped.entities[0].name == "Гарри Поттер"
+        assert mapped.aliases[eid] == [("Гарри", "ru")]
+
+    async def test_stale_version_rejected(self, repo: Repository, tmp_db_path: str, snapshot_path: str):
+        _populate(tmp_db_path, 5, 2)
+        write_snapshot_file(snapshot_path, await load_snapshot(repo), "a:1")
+        with pytest.raises(SnapshotError, match="catalogue version"):
+            read_snapshot_file(snapshot_path, "a:2")
+
+    async def test_corruption_detected(self, repo: Repository, tmp_db_path: str, snapshot_path: str):
+        _populate(tmp_db_path, 20, 4)
+        write_snapshot_file(snapshot_path, await load_snapshot(repo), "v")
+        with open(snapshot_path, "r+b") as f:
+            f.seek(-100, os.SEEK_END)
+            f.write(b"\xff" * 8)
+        with pytest.raises(SnapshotError, match="checksum"):
+            read_snapshot_file(snapshot_path, verify=True)
+
+    @pytest.mark.parametrize("content", [b"", b"garbage" * 10])
+    def test_not_a_snapshot(self, snapshot_path: str, content: bytes):
+        with open(snapshot_path, "wb") as f:
+            f.write(content)
+        with pytest.raises(SnapshotError):
+            read_snapshot_file(snapshot_path)
+
+
+class TestLoadCatalogue:
+    """load_catalogue() prefers a current snapshot file."""
+
+    async def test_writes_then_maps(self, repo: Repository, tmp_db_path: str, snapshot_path: str):
+        _populate(tmp_db_path, 30, 5)
+        first = await load_catalogue(repo, snapshot_path)
+        assert first.source == "sqlite" and os.path.exists(snapshot_path)
+        second = await load_catalogue(repo, snapshot_path)
+        assert second.source == "file"
+        np.testing.assert_array_equal(second.knowledge_base.values, first.knowledge_base.values)
+
+    async def test_stale_file_reloaded(self, repo: Repository, tmp_db_path: str, snapshot_path: str):
+        _populate(tmp_db_path, 30, 5)
+        await load_catalogue(repo, snapshot_path)
+        await repo.set_entity_attribute(2, 3, 0.0)
+
+        reloaded = await load_catalogue(repo, snapshot_path)
+        assert reloaded.source == "sqlite"
+        assert reloaded.knowledge_base.value(2, "attr_3") == 0.0
+        mapped = await load_catalogue(repo, snapshot_path)
+        assert mapped.source == "file" and mapped.knowledge_base.value(2, "attr_3") == 0.0
+
+    async def test_corrupt_file_falls_back(self, repo: Repository, tmp_db_path: str, snapshot_path: str):
+        _populate(tmp_db_path, 10, 3)
+        with open(snapshot_path, "wb") as f:
+            f.write(b"garbage")
+        snapshot = await load_catalogue(repo, snapshot_path)
+        assert snapshot.source == "sqlite" and len(snapshot.entities) == 10
+
+    async def test_without_path(self, repo: Repository, tmp_db_path: str):
+        _populate(tmp_db_path, 10, 3)
+        assert (await load_catalogue(repo, None)).source == "sqlite"
+        assert not os.path.exists(default_snapshot_path(tmp_db_path))
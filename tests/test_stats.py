@@ -0,0 +1,166 @@
+"""Tests for Session Statistics (cached sufficient statistics for question selection).
+
+Covers:
+- Statistics match direct weighted sums over the candidates
+- Information gain from the statistics matches the scalar reference
+- Cache reuse across selections and invalidation on updates / learning
+- Stacked computation for many sessions
+"""
+
+from __future__ import annotations
+
+import numpy as np
+import pytest
+
+from akinator.db.models import Answer, Attribute, Entity, GameSession
+from akinator.engine import stats as stats_module
+from akinator.engine.knowledge_base import KnowledgeBase
+from akinator.engine.question_policy import QuestionPolicy
+from akinator.engine.scoring import ScoringEngine
+from akinator.engine.stats import compute_stats, session_stats, session_stats_batch
+from tests.test_question_policy import _random_catalogue
+
+
+def _random_session(entities: list[Entity], seed: int) -> GameSession:
+    rng = np.random.default_rng(seed)
+    return GameSession(
+        session_id=f"stats-{seed}", user_id=1,
+        candidate_ids=[e.id for e in entities],
+        weights=rng.dirichlet(np.full(len(entities), 0.3)).tolist(),
+    )
+
+
+def _no_bincount(*args, **kwargs):
+    raise AssertionError("small candidate sets should not scatter onto every row")
+
+
+class TestComputeStats:
+    """The cached sums equal the weighted sums they stand for."""
+
+    def test_matches_direct_sums(
+        self, skewed_session: GameSession, sample_entities: list[Entity],
+        sample_attributes: list[Attribute],
+    ):
+        kb = KnowledgeBase.from_entities(sample_entities, sample_attributes)
+        stats = compute_stats(kb, skewed_session)
+        w = np.array(skewed_session.weights)
+        p = kb.columns(kb.rows(skewed_session.candidate_ids), list(kb.attribute_keys))
+        np.testing.assert_allclose(stats.yes_mass, w @ p)
+        np.testing.assert_allclose(stats.yes_log_mass, (w * np.log2(w)) @ p)
+        assert stats.entropy == pytest.approx(-(w * np.log2(w)).sum())
+        assert stats.n_candidates == len(w)
+
+    def test_gathered_matches_scattered(self, monkeypatch: pytest.MonkeyPatch):
+        entities, attributes = _random_catalogue(200, 12, seed=5)
+        kb = KnowledgeBase.from_entities(entities, attributes)
+        # A late-game session: a few candidates, one of them unknown to the KB
+        session = GameSession(
+            session_id="late", user_id=1, candidate_ids=[entities[3].id, entities[70].id, 9_001],
+            weights=[0.5, 0.3, 0.2],
+        )
+        monkeypatch.setattr(np, "bincount", _no_bincount)
+        gathered = compute_stats(kb, session)
+        monkeypatch.undo()
+        monkeypatch.setattr(stats_module, "_GATHER_FRACTION", 0.0)
+        scattered = compute_stats(kb, session)
+        for name in ("yes_mass", "yes_log_mass", "yes_entropy", "no_entropy"):
+            np.testing.assert_allclose(getattr(gathered, name), getattr(scattered, name), atol=1e-6)
+        assert gathered.entropy == pytest.approx(scattered.entropy)
+
+    @pytest.mark.parametrize("seed", range(3))
+    def test_gains_match_scalar(self, seed: int):
+        entities, attributes = _random_catalogue(80, 20, seed)
+        kb = KnowledgeBase.from_entities(entities, attributes)
+        session = _random_session(entities, seed)
+        policy = QuestionPolicy()
+        keys = [a.key for a in attributes] + ["no_such_key"]
+        gains = policy.compute_info_gains(session, kb, keys)
+        for key, ig in zip(keys, gains):
+            # The masses are summed in float32, the matrix dtype
+            assert ig == pytest.approx(policy.compute_info_gain(session, kb, key), abs=1e-6)
+
+
+class TestCache:
+    """Stats live on the session until its weights or the knowledge base change."""
+
+    def test_reused_across_selections(
+        self, skewed_session: GameSession, sample_entities: list[Entity],
+        sample_attributes: list[Attribute],
+    ):
+        kb = KnowledgeBase.from_entities(sample_entities, sample_attributes)
+        policy = QuestionPolicy()
+        policy.select(skewed_session, kb, sample_attributes)
+        cached = skewed_session.stats
+        assert cached is not None
+        policy.select(skewed_session, kb, sample_attributes)
+        assert skewed_session.stats is cached
+
+    @pytest.mark.parametrize("log_space", [False, True])
+    def test_refreshed_by_update(self, log_space: bool):
+        entities, attributes = _random_catalogue(60, 15, seed=7)
+        kb = KnowledgeBase.from_entities(entities, attributes)
+        session = _random_session(entities, seed=7)
+        before = session_stats(kb, session)
+        ScoringEngine(log_space=log_space).update(session, kb, attributes[0].key, Answer.YES)
+        # Dropped, not recomputed: a log-space update doesn't even normalize
+        assert session.stats is None
+        if log_space:
+            assert session._weight_array is None
+        after = session_stats(kb, session)
+        assert after is not before and session.stats is after
+        w = session.weight_array
+        p = kb.columns(kb.rows(session.candidate_ids), list(kb.attribute_keys))
+        np.testing.assert_allclose(after.yes_mass, w @ p, rtol=1e-5)
+        assert after.entropy == pytest.approx(-(w * np.log2(w)).sum())
+
+    def test_dont_know_keeps_stats(
+        self, skewed_session: GameSession, sample_entities: list[Entity],
+    ):
+        kb = KnowledgeBase.from_entities(sample_entities)
+        cached = session_stats(kb, skewed_session)
+        ScoringEngine().update(skewed_session, kb, "is_fictional", Answer.DONT_KNOW)
+        assert skewed_session.stats is cached
+
+    def test_cleared_when_weights_assigned(
+        self, skewed_session: GameSession, sample_entities: list[Entity],
+    ):
+        session_stats(KnowledgeBase.from_entities(sample_entities), skewed_session)
+        skewed_session.weights = [0.2] * 5
+        assert skewed_session.stats is None
+
+    def test_recomputed_after_learning(
+        self, skewed_session: GameSession, sample_entities: list[Entity],
+    ):
+        kb = KnowledgeBase.from_entities(sample_entities)
+        cached = session_stats(kb, skewed_session)
+        learned = kb.with_attributes(sample_entities[0].id, {"is_male": 0.0})
+        stats = session_stats(learned, skewed_session)
+        assert stats is not cached
+        assert stats.source is learned.values
+
+
+class TestBatch:
+    """session_stats_batch() matches per-session stats."""
+
+    def test_matches_compute_stats(self):
+        entities, attributes = _random_catalogue(50, 12, seed=8)
+        kb = KnowledgeBase.from_entities(entities, attributes)
+        sessions = [_random_session(entities, seed) for seed in range(4)]
+        # Unknown ids share the default row
+        sessions.append(GameSession(
+            session_id="unknown", user_id=1, candidate_ids=[1, 9_001, 9_002], weights=[0.2, 0.3, 0.5],
+        ))
+        batch = session_stats_batch(kb, sessions)
+        for session, stats in zip(sessions, batch):
+            expected = compute_stats(kb, session)
+            for name in ("yes_mass", "yes_log_mass", "yes_entropy", "no_entropy"):
+                np.testing.assert_allclose(getattr(stats, name), getattr(expected, name), atol=1e-6)
+            assert stats.entropy == pytest.approx(expected.entropy)
+            assert session.stats is stats
+
+    def test_reuses_fresh_stats(self):
+        entities, attributes = _random_catalogue(20, 5, seed=1)
+        kb = KnowledgeBase.from_entities(entities, attributes)
+        session = _random_session(entities, seed=1)
+        cached = session_stats(kb, session)
+        assert session_stats_batch(kb, [session])[0] is cached